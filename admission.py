@@ -0,0 +1,216 @@
+import asyncio
+import json
+import math
+import time
+from typing import Dict, NamedTuple, Optional, Sequence
+
+from starlette.responses import JSONResponse
+
+from metrics import REGISTRY, log_event
+from shared_state import InProcessState, SharedState
+
+ADMISSIONS = REGISTRY.counter(
+    "chatbot_admission_total",
+    "Chat requests by admission outcome (admitted, rate_limited_ip, rate_limited_thread, queue_full, queue_timeout)",
+    ["outcome"],
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "chatbot_admission_wait_seconds",
+    "Time admitted chat requests waited for a free slot",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+OUTCOMES = ("admitted", "rate_limited_ip", "rate_limited_thread", "queue_full", "queue_timeout")
+
+
+class Rejection(NamedTuple):
+    status: int
+    outcome: str
+    retry_after: float
+    detail: str
+
+
+class AdmissionController:
+    """Decides which chat requests reach the LLM: rate limits first, then a concurrency cap with a bounded queue.
+
+    Every client IP and every conversation (thread_id) has a token bucket:
+    rate_per_minute tokens refill it, burst is its size, a request takes one
+    token and is turned away with 429 when its bucket is empty. The buckets
+    live in a SharedState, so with a Redis-backed state the limits hold across
+    all workers. Admitted requests then need one of max_concurrency slots,
+    which should match what the LLM can serve (per worker, like
+    LLM_MAX_CONCURRENCY). Up to max_queue requests wait for a slot, first come
+    first served, for at most queue_timeout seconds; beyond that they are shed
+    at once with 503 rather than piling up. A limit of 0 turns it off.
+    """
+
+    def __init__(self, state: Optional[SharedState] = None, ip_rate_per_minute: float = 30.0, ip_burst: float = 15.0,
+                 thread_rate_per_minute: float = 10.0, thread_burst: float = 5.0, max_concurrency: int = 32,
+                 max_queue: int = 64, queue_timeout: float = 10.0, trusted_proxies: int = 0):
+        self.state = state or InProcessState()
+        self.ip_rate = ip_rate_per_minute / 60.0
+        self.ip_burst = max(ip_burst, 1.0)
+        self.thread_rate = thread_rate_per_minute / 60.0
+        self.thread_burst = max(thread_burst, 1.0)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # Proxies in front of the app that append to X-Forwarded-For; 0 trusts none and uses the socket peer
+        self.trusted_proxies = trusted_proxies
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.active = 0
+        self.queued = 0
+
+    def client_ip(self, scope) -> str:
+        if self.trusted_proxies > 0:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                    # Entries left of the ones our own proxies appended are client-supplied and can be forged
+                    if hops:
+                        return hops[-min(self.trusted_proxies, len(hops))]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _take(self, key: str, rate: float, burst: float) -> float:
+        if self.state.distributed:
+            # A network round trip, kept off the event loop
+            return await asyncio.to_thread(self.state.take_tokens, key, rate, burst)
+        return self.state.take_tokens(key, rate, burst)
+
+    async def check_ip(self, ip: str) -> Optional[Rejection]:
+        """Take a token from the client's bucket, or say how long to back off"""
+        if self.ip_rate > 0:
+            wait = await self._take(f"admission:ip:{ip}", self.ip_rate, self.ip_burst)
+            if wait > 0:
+                return Rejection(429, "rate_limited_ip", wait, "Too many messages from this address, please slow down")
+        return None
+
+    async def check_thread(self, thread_id: Optional[str]) -> Optional[Rejection]:
+        """Take a token from the conversation's bucket, or say how long to back off"""
+        if self.thread_rate > 0 and thread_id:
+            wait = await self._take(f"admission:thread:{thread_id}", self.thread_rate, self.thread_burst)
+            if wait > 0:
+                return Rejection(429, "rate_limited_thread", wait, "Too many messages in this conversation, please slow down")
+        return None
+
+    async def acquire(self) -> Optional[Rejection]:
+        """Wait for a concurrency slot; a rejection when the queue is full or the wait times out"""
+        if self._slots is None:
+            self.active += 1
+            return None
+        if not self._slots.locked():
+            # A free slot is taken without yielding, so a burst sees the slots fill up one by one
+            await self._slots.acquire()
+            self.active += 1
+            return None
+        if self.queued >= self.max_queue:
+            return Rejection(503, "queue_full", self.queue_timeout, "The assistant is very busy right now, please try again shortly")
+        start = time.perf_counter()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            return Rejection(503, "queue_timeout", self.queue_timeout, "The assistant is very busy right now, please try again shortly")
+        finally:
+            self.queued -= 1
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start)
+        self.active += 1
+        return None
+
+    def release(self):
+        self.active -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "shared": self.state.distributed,
+            "outcomes": {outcome: ADMISSIONS.value(outcome=outcome) for outcome in OUTCOMES},
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware putting an AdmissionController in front of the chat endpoints.
+
+    Written against raw ASGI rather than as an @app.middleware function: it
+    reads the JSON body for the thread_id and replays it to the endpoint, and
+    holds the concurrency slot until a streamed reply has finished.
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths: Sequence[str] = ("/chat", "/chat/stream"),
+                 max_body_bytes: int = 64 * 1024):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller
+        ip = controller.client_ip(scope)
+        # The per-IP check needs no body, so a flood is turned away before reading it
+        rejection = await controller.check_ip(ip)
+        if rejection is not None:
+            await self._reject(rejection, ip, scope, receive, send)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) > self.max_body_bytes:
+                await JSONResponse({"detail": "Request body too large"}, status_code=413)(scope, receive, send)
+                return
+
+        rejection = await controller.check_thread(_thread_id(body)) if controller.thread_rate > 0 else None
+        if rejection is None:
+            rejection = await controller.acquire()
+        if rejection is not None:
+            await self._reject(rejection, ip, scope, receive, send)
+            return
+        ADMISSIONS.inc(outcome="admitted")
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        try:
+            await self.app(scope, replay, send)
+        finally:
+            controller.release()
+
+    @staticmethod
+    async def _reject(rejection: Rejection, ip: str, scope, receive, send):
+        ADMISSIONS.inc(outcome=rejection.outcome)
+        log_event("admission_rejected", outcome=rejection.outcome, client_ip=ip, path=scope["path"])
+        response = JSONResponse({"detail": rejection.detail}, status_code=rejection.status,
+                                headers={"Retry-After": str(max(1, math.ceil(rejection.retry_after)))})
+        await response(scope, receive, send)
+
+
+def _thread_id(body: bytes) -> Optional[str]:
+    """thread_id of a chat request body; None when missing or the shared "default" thread, left to the per-IP limit"""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    thread_id = payload.get("thread_id") if isinstance(payload, dict) else None
+    if not isinstance(thread_id, str) or thread_id in ("", "default"):
+        return None
+    return thread_id
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from slot_store import DEFAULT_REP
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+# Window numbering starts on a Monday so weekly windows line up with calendar weeks
+EPOCH = date(2024, 1, 1)
+
+
+def _parse_date(value: str) -> date:
+    """'2025-08-20' or RRULE-style '20250820'"""
+    value = value.strip()
+    return datetime.strptime(value[:8], "%Y%m%d").date() if "-" not in value else date.fromisoformat(value)
+
+
+def _parse_time(value: str) -> time:
+    return datetime.strptime(value.strip(), "%H:%M").time()
+
+
+class AvailabilityRule:
+    """Recurring working hours of one rep, described by an RRULE subset.
+
+    Supported parts: FREQ=DAILY|WEEKLY, INTERVAL, BYDAY and UNTIL. Between
+    start and end on each matching day the rep offers slots of slot_minutes
+    followed by buffer_minutes, in the rep's own time zone.
+    """
+
+    def __init__(self, rrule: str, start: str, end: str, rep: str = DEFAULT_REP, slot_minutes: int = 60,
+                 buffer_minutes: int = 0, timezone: str = "UTC", dtstart: Optional[str] = None,
+                 exdates: Iterable[str] = ()):
+        self.rep = rep
+        self.start = _parse_time(start)
+        self.end = _parse_time(end)
+        self.slot = timedelta(minutes=slot_minutes)
+        self.step = timedelta(minutes=slot_minutes + buffer_minutes)
+        self.tz = ZoneInfo(timezone)
+        self.dtstart = _parse_date(dtstart) if dtstart else EPOCH
+        self.until: Optional[date] = None
+        self.interval = 1
+        self.freq = None
+        self.weekdays = set(range(7))
+        for part in filter(None, rrule.upper().split(";")):
+            key, _, value = part.partition("=")
+            if key == "FREQ" and value in ("DAILY", "WEEKLY"):
+                self.freq = value
+            elif key == "INTERVAL":
+                self.interval = int(value)
+            elif key == "BYDAY":
+                self.weekdays = {WEEKDAYS[day] for day in value.split(",")}
+            elif key == "UNTIL":
+                self.until = _parse_date(value)
+            else:
+                raise ValueError(f"Unsupported RRULE part: {part}")
+        if self.freq is None:
+            raise ValueError(f"RRULE needs FREQ=DAILY or FREQ=WEEKLY: {rrule}")
+        self.exdates = {_parse_date(d) for d in exdates}
+
+    def occurs_on(self, day: date) -> bool:
+        if day < self.dtstart or (self.until is not None and day > self.until) or day in self.exdates:
+            return False
+        if day.weekday() not in self.weekdays:
+            return False
+        if self.freq == "DAILY":
+            return (day - self.dtstart).days % self.interval == 0
+        # Weekly: count whole weeks from the Monday of dtstart
+        weeks = (day - self.dtstart + timedelta(days=self.dtstart.weekday())).days // 7
+        return weeks % self.interval == 0
+
+    def starts_on(self, day: date) -> Iterator[datetime]:
+        """Naive local slot start times on a day"""
+        when = datetime.combine(day, self.start)
+        last = datetime.combine(day, self.end) - self.slot
+        while when <= last:
+            yield when
+            when += self.step
+
+
+class Blackout(NamedTuple):
+    """Exception to the rules: a rep (None: everyone) is away on day, all day or from start to end"""
+    day: date
+    rep: Optional[str] = None
+    start: Optional[time] = None
+    end: Optional[time] = None
+
+    def covers(self, when: datetime, rep: str) -> bool:
+        if self.rep is not None and self.rep != rep:
+            return False
+        return self.start is None or self.start <= when.time() < self.end
+
+
+class AvailabilityEngine:
+    """Generates free slots from recurring rules, lazily and one window of days at a time.
+
+    Nothing is expanded up front: a query for a date range generates only
+    the windows it overlaps and keeps the most recent ones in a small LRU
+    cache, so the next two weeks cost the same whether the rules span a
+    month or a decade. Slot times are returned as naive datetimes in the
+    calendar time zone, which is what the slot strings of the API show.
+    """
+
+    def __init__(self, rules: Iterable[AvailabilityRule], blackouts: Iterable[Blackout] = (),
+                 timezone: str = "UTC", window_days: int = 7, max_cached_windows: int = 64):
+        self.rules = list(rules)
+        self.tz = ZoneInfo(timezone)
+        self.window_days = window_days
+        self.max_cached_windows = max_cached_windows
+        # Rules are looked up per weekday so a day only checks the rules that can match it
+        self._rules_by_weekday: Dict[int, List[AvailabilityRule]] = {day: [] for day in range(7)}
+        for rule in self.rules:
+            for day in rule.weekdays:
+                self._rules_by_weekday[day].append(rule)
+        self._blackouts: Dict[date, List[Blackout]] = {}
+        for blackout in blackouts:
+            self._blackouts.setdefault(blackout.day, []).append(blackout)
+        self._lock = threading.Lock()
+        self._windows: "OrderedDict[int, List[Tuple[datetime, str]]]" = OrderedDict()
+        # Hash of the availability file it was built from (set by from_dict), so caches notice rule changes
+        self.fingerprint = ""
+
+    @classmethod
+    def from_dict(cls, config: dict, **kwargs) -> "AvailabilityEngine":
+        """Build from the availability file format, see availability.json"""
+        timezone = config.get("timezone", "UTC")
+        rules = [AvailabilityRule(**dict({"timezone": timezone}, **rule)) for rule in config.get("rules", [])]
+        blackouts = [
+            Blackout(_parse_date(item["date"]), item.get("rep"),
+                     _parse_time(item["start"]) if "start" in item else None,
+                     _parse_time(item["end"]) if "end" in item else None)
+            for item in config.get("exceptions", [])
+        ]
+        engine = cls(rules, blackouts, timezone=timezone, **kwargs)
+        engine.fingerprint = hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        return engine
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "AvailabilityEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), **kwargs)
+
+    def now(self) -> datetime:
+        """Current time in the calendar time zone, naive like the slots"""
+        return datetime.now(self.tz).replace(tzinfo=None)
+
+    def window_of(self, when: datetime) -> int:
+        return (when.date() - EPOCH).days // self.window_days
+
+    def window_start(self, window: int) -> datetime:
+        """Midnight starting a window; its slots lie in [window_start(w), window_start(w + 1))"""
+        return datetime.combine(EPOCH + timedelta(days=window * self.window_days), time.min)
+
+    def windows(self, start: datetime, end: datetime) -> range:
+        """Indexes of the windows overlapping [start, end)"""
+        return range(self.window_of(start), self.window_of(end - timedelta(microseconds=1)) + 1)
+
+    def window_slots(self, window: int) -> List[Tuple[datetime, str]]:
+        """Sorted (start, rep) slots of one window, generated on first use"""
+        with self._lock:
+            if window in self._windows:
+                self._windows.move_to_end(window)
+                return self._windows[window]
+        slots = self._generate(window)
+        with self._lock:
+            self._windows[window] = slots
+            while len(self._windows) > self.max_cached_windows:
+                self._windows.popitem(last=False)
+        return slots
+
+    def _generate(self, window: int) -> List[Tuple[datetime, str]]:
+        first = EPOCH + timedelta(days=window * self.window_days)
+        lo = datetime.combine(first, time.min)
+        hi = lo + timedelta(days=self.window_days)
+        slots = set()
+        # One extra day on each side: a rep's local day can straddle the calendar's midnight
+        for offset in range(-1, self.window_days + 1):
+            day = first + timedelta(days=offset)
+            for rule in self._rules_by_weekday[day.weekday()]:
+                if not rule.occurs_on(day):
+                    continue
+                starts = list(rule.starts_on(day))
+                if not starts:
+                    continue
+                shift = self._shift(starts[0], rule.tz)
+                # A DST change inside the working hours needs every slot converted on its own
+                exact = shift != self._shift(starts[-1], rule.tz)
+                edge = offset in (-1, 0, self.window_days - 1, self.window_days)
+                for when in starts:
+                    local = when + (self._shift(when, rule.tz) if exact else shift)
+                    if edge and not lo <= local < hi:
+                        continue
+                    if local.date() in self._blackouts and self._blacked_out(local, rule.rep):
+                        continue
+                    slots.add((local, rule.rep))
+        return sorted(slots)
+
+    def _shift(self, when: datetime, tz: ZoneInfo) -> timedelta:
+        """Offset from a rep's wall clock to the calendar's at a given moment"""
+        if tz == self.tz:
+            return timedelta(0)
+        return when.replace(tzinfo=tz).astimezone(self.tz).replace(tzinfo=None) - when
+
+    def _blacked_out(self, when: datetime, rep: str) -> bool:
+        return any(blackout.covers(when, rep) for blackout in self._blackouts[when.date()])
+
+    def slots(self, start: datetime, end: datetime, rep: Optional[str] = None) -> List[Tuple[datetime, str]]:
+        """Generated (start, rep) slots with start <= when < end, in order"""
+        result = []
+        for window in self.windows(start, end):
+            result.extend(
+                (when, slot_rep) for when, slot_rep in self.window_slots(window)
+                if start <= when < end and (rep is None or slot_rep == rep)
+            )
+        return result
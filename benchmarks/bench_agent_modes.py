@@ -0,0 +1,125 @@
+"""Compare PureReActAgent with FunctionCallingAgent: tokens, latency and parse failures per turn.
+
+Offline (default) both agents talk to fakes that return the same canned
+answers, so the numbers isolate prompt size and agent overhead. Use
+--malformed-rate to simulate ReAct format drift. With --live both agents
+call Gemini (needs GOOGLE_API_KEY and network) and the parse-failure rate
+is the real one.
+
+    python benchmarks/bench_agent_modes.py --turns 200
+    python benchmarks/bench_agent_modes.py --live --turns 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import CHAT_MESSAGES, percentile  # noqa: E402
+
+MESSAGES = CHAT_MESSAGES + ["Please book 2030-01-01 9:00 AM for Benchmark Lead"]
+
+
+def load_main():
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ["BOOKING_STORAGE"] = "memory:"
+    os.environ["BOOKINGS_CSV_EXPORT"] = ""
+    os.environ["TRANSCRIPT_LOG_DIR"] = ""
+    os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+    os.chdir(ROOT)
+    import main
+    return main
+
+
+def build_agents(main, args):
+    if args.live:
+        from function_calling import GeminiFunctionModel
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        react_llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.7, max_tokens=500)
+        function_llm = GeminiFunctionModel(main.tools, model="gemini-1.5-flash", temperature=0.7, max_output_tokens=500)
+    else:
+        from fake_llm import FakeFunctionModel, FakeLLM
+
+        react_llm = FakeLLM(latency=args.latency, jitter=args.jitter, malformed_rate=args.malformed_rate)
+        function_llm = FakeFunctionModel(latency=args.latency, jitter=args.jitter)
+    # No router, cache or session memory: every turn goes to the model
+    return {
+        "react": main.PureReActAgent(react_llm, main.tools, main.system_message.content),
+        "function_calling": main.FunctionCallingAgent(function_llm, main.tools, main.system_message.content),
+    }
+
+
+async def run_mode(main, agent, turns: int, concurrency: int):
+    tokens_before = {d: main.LLM_TOKENS.value(direction=d) for d in ("prompt", "completion")}
+    calls_before = sum(main.LLM_REQUESTS.value(mode=m) for m in ("sync", "async", "stream"))
+    failures_before = main.PARSE_FAILURES.value(agent=agent.mode)
+    # Free the benchmark slot again so booking turns behave the same in both modes
+    main.booking_service.horizon_days = None
+    main.slot_store.add_slot("2030-01-01 9:00 AM")
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def turn(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await agent.ainvoke({"input": MESSAGES[i % len(MESSAGES)]})
+            latencies.append(time.perf_counter() - start)
+        main.slot_store.release("2030-01-01 9:00 AM")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(i) for i in range(turns)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    calls = sum(main.LLM_REQUESTS.value(mode=m) for m in ("sync", "async", "stream")) - calls_before
+    return {
+        "mode": agent.mode,
+        "turns": turns,
+        "prompt_tokens_per_turn": (main.LLM_TOKENS.value(direction="prompt") - tokens_before["prompt"]) / turns,
+        "completion_tokens_per_turn": (main.LLM_TOKENS.value(direction="completion") - tokens_before["completion"]) / turns,
+        "llm_calls_per_turn": calls / turns,
+        "parse_failure_rate": (main.PARSE_FAILURES.value(agent=agent.mode) - failures_before) / turns,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "throughput_tps": turns / elapsed if elapsed else 0.0,
+    }
+
+
+async def main_async(args):
+    main = load_main()
+    agents = build_agents(main, args)
+    results = []
+    print(f"{'mode':>17} {'prompt tok':>11} {'compl tok':>10} {'calls':>6} {'parse fail':>11} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'turns/s':>9}")
+    for agent in agents.values():
+        row = await run_mode(main, agent, args.turns, args.concurrency)
+        results.append(row)
+        print(f"{row['mode']:>17} {row['prompt_tokens_per_turn']:>11.0f} {row['completion_tokens_per_turn']:>10.0f} "
+              f"{row['llm_calls_per_turn']:>6.2f} {row['parse_failure_rate']:>10.1%} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['throughput_tps']:>9.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="chat turns per mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="+/- latency jitter in seconds")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="share of fake ReAct completions that break the format")
+    parser.add_argument("--live", action="store_true", help="call Gemini instead of the fakes")
+    parser.add_argument("--json", help="write results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(parse_args()))
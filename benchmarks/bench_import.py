@@ -0,0 +1,80 @@
+"""Cold-start import budget of main.py, measured with python -X importtime.
+
+    python benchmarks/bench_import.py                      # report: total, slowest modules
+    python benchmarks/bench_import.py --budget-ms 2000     # exit 1 over budget (CI)
+    pytest benchmarks/bench_import.py                      # same check as a test
+
+The LLM stack (langchain_google_genai, google.generativeai) is loaded at
+warm-up or on the first chat, never at import; the check fails if it creeps
+back into start-up.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported until the first LLM call
+LAZY_MODULES = ("langchain_google_genai", "google.generativeai", "google.ai.generativelanguage", "langchain.agents",
+                "langchain.hub")
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "2500"))
+
+
+def import_profile(module: str = "main") -> Tuple[float, Dict[str, float]]:
+    """Import module in a fresh interpreter; total milliseconds and cumulative ms of every module"""
+    env = dict(os.environ, GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "offline-benchmark"), BOOKING_STORAGE="memory:",
+               BOOKINGS_CSV_EXPORT="", LOG_SAMPLE_RATE="0", TRANSCRIPT_LOG_DIR="", PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative_us) / 1000
+    return modules[module], modules
+
+
+def measure(runs: int = 5) -> Tuple[float, Dict[str, float]]:
+    """Median total over several runs (the first one also warms the OS file cache)"""
+    totals: List[float] = []
+    modules: Dict[str, float] = {}
+    for _ in range(runs):
+        total, modules = import_profile()
+        totals.append(total)
+    return statistics.median(totals), modules
+
+
+def test_import_time_budget():
+    total, modules = measure(runs=3)
+    eager = [name for name in LAZY_MODULES if name in modules]
+    assert not eager, f"imported at start-up: {', '.join(eager)}"
+    assert total <= DEFAULT_BUDGET_MS, f"import main took {total:.0f} ms, budget {DEFAULT_BUDGET_MS:.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest top-level imports to list")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    total, modules = measure(args.runs)
+    print(f"import main: {total:.0f} ms (median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    # Top-level packages only, their cumulative time includes everything they pull in
+    top_level = sorted(((ms, name) for name, ms in modules.items() if "." not in name and name != "main"), reverse=True)
+    for ms, name in top_level[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        print(f"FAIL: imported at start-up: {', '.join(eager)}")
+    if total > args.budget_ms:
+        print("FAIL: over budget")
+    sys.exit(1 if eager or total > args.budget_ms else 0)
+
+
+if __name__ == "__main__":
+    main()
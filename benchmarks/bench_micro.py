@@ -0,0 +1,202 @@
+"""pytest-benchmark microsuite for the hot paths of a chat turn.
+
+    pytest benchmarks/bench_micro.py --benchmark-autosave
+    pytest benchmarks/bench_micro.py --benchmark-compare --benchmark-compare-fail=mean:20%
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from admission import AdmissionController  # noqa: E402
+from availability import AvailabilityEngine, AvailabilityRule  # noqa: E402
+from calendar_widget import clear_widget_cache, generate_calendar_widget  # noqa: E402
+from lead_registry import LeadRegistry  # noqa: E402
+from lead_scoring import LeadScorer  # noqa: E402
+from live_updates import SlotEventHub  # noqa: E402
+from sessions import SessionStore  # noqa: E402
+from slot_store import SlotStore  # noqa: E402
+from static_assets import AssetStore  # noqa: E402
+from transcripts import TranscriptLog  # noqa: E402
+
+REACT_TOOL_COMPLETION = (
+    "Thought: The user wants to meet, I should show the calendar.\n"
+    "Action: get_available_slots\n"
+    "Action Input: \n"
+)
+REACT_ANSWER_COMPLETION = (
+    "Thought: This is a general question about services.\n"
+    "Action: no tool needed\n"
+    "Final Answer: AorySoft builds custom software, web and mobile apps. What challenge are you facing?"
+)
+
+
+def make_store(slots: int = 100000, reps: int = 10) -> SlotStore:
+    store = SlotStore()
+    start = datetime(2030, 1, 1, 9)
+    for i in range(slots // reps):
+        when = start + timedelta(minutes=30 * i)
+        for rep in range(reps):
+            store.add_slot(when, rep=f"rep{rep}")
+    return store
+
+
+@pytest.fixture(scope="module")
+def big_store():
+    return make_store()
+
+
+@pytest.fixture(scope="module")
+def agent():
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ["BOOKING_STORAGE"] = "memory:"
+    os.environ["BOOKINGS_CSV_EXPORT"] = ""
+    os.environ["TRANSCRIPT_LOG_DIR"] = ""
+    main = pytest.importorskip("main")
+    return main.agent_executor
+
+
+@pytest.fixture(scope="module")
+def widget_slots(big_store):
+    return big_store.free_slots(end=datetime(2030, 1, 15))[:40]
+
+
+def test_widget_cold(benchmark, widget_slots):
+    def render():
+        clear_widget_cache()
+        return generate_calendar_widget(widget_slots)
+    benchmark(render)
+
+
+def test_widget_cached(benchmark, widget_slots):
+    benchmark(generate_calendar_widget, widget_slots)
+
+
+def test_free_slots_two_week_range(benchmark, big_store):
+    benchmark(big_store.free_slots, datetime(2030, 6, 1), datetime(2030, 6, 15))
+
+
+def test_calendar_page_query(benchmark, big_store):
+    benchmark(big_store.query, datetime(2030, 6, 1), datetime(2030, 6, 15), status="all", limit=101)
+
+
+def test_live_fanout_5000_clients(benchmark):
+    hub = SlotEventHub(queue_size=1)
+    clients = [hub.subscribe() for _ in range(5000)]
+
+    def setup():
+        for queue in clients:
+            while not queue.empty():
+                queue.get_nowait()
+        hub._pending = {"2030-01-01 9:00 AM": False}
+
+    benchmark.pedantic(hub._flush, setup=setup, rounds=200)
+
+
+def make_engine(reps: int = 50) -> AvailabilityEngine:
+    """Weekday rules for reps spread over three time zones, running for years"""
+    zones = ["UTC", "America/New_York", "Europe/Berlin"]
+    rules = [
+        AvailabilityRule("FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;UNTIL=20351231", "09:00", "17:00", rep=f"rep{i}", slot_minutes=30,
+                         buffer_minutes=15, timezone=zones[i % len(zones)], dtstart="2025-01-01")
+        for i in range(reps)
+    ]
+    return AvailabilityEngine(rules, timezone="UTC")
+
+
+def test_availability_two_weeks_cold(benchmark):
+    engine = make_engine()
+    benchmark(lambda: (engine._windows.clear(), engine.slots(datetime(2030, 6, 3), datetime(2030, 6, 17))))
+
+
+def test_availability_two_weeks_cached(benchmark):
+    engine = make_engine()
+    benchmark(engine.slots, datetime(2030, 6, 3), datetime(2030, 6, 17))
+
+
+def test_book_and_release(benchmark, big_store):
+    slot = big_store.free_slots(start=datetime(2030, 3, 1), end=datetime(2030, 3, 2))[0]
+
+    def cycle():
+        big_store.book(slot, "Bench Client")
+        big_store.release(slot, client_name="Bench Client")
+    benchmark(cycle)
+
+
+def test_lead_score_turn(benchmark):
+    """Scoring runs after every chat turn and must stay well under 1 ms"""
+    store = SessionStore(scorer=LeadScorer())
+    message = "I'm the CTO of a 200 employees fintech, we need a mobile app asap, budget around $50k. Can we book a call?"
+    benchmark(store.add_turn, "bench-thread", message, "Happy to help, here is the calendar.")
+    assert store.lead_score("bench-thread")["tier"] == "hot"
+
+
+def test_static_page_response(benchmark):
+    """Serving index.html: variant lookup and ETag check only, no disk I/O or compression"""
+    assets = AssetStore()
+    assets.add("/", os.path.join(ROOT, "index.html"))
+    status, _body, headers = benchmark(assets.respond, "/", "gzip, deflate, br", None)
+    assert status == 200 and headers["Content-Encoding"] in ("gzip", "br")
+
+
+def test_admission_check(benchmark):
+    """Admission work in front of every chat request: IP and thread buckets, concurrency slot"""
+    admission = AdmissionController(ip_rate_per_minute=1e9, ip_burst=1e9, thread_rate_per_minute=1e9, thread_burst=1e9)
+    loop = asyncio.new_event_loop()
+
+    async def admit():
+        rejection = await admission.check_ip("203.0.113.7") or await admission.check_thread("bench-thread") or await admission.acquire()
+        if rejection is None:
+            admission.release()
+        return rejection
+
+    try:
+        assert benchmark(lambda: loop.run_until_complete(admit())) is None
+    finally:
+        loop.close()
+
+
+def test_transcript_record(benchmark, tmp_path):
+    """Logging a chat turn on the request path: a queue put, the writer thread does the I/O"""
+    log = TranscriptLog(str(tmp_path), max_pending=1_000_000)
+    entry = {"thread_id": "bench-thread", "message": "We need a customer portal", "response": "Happy to help!",
+             "raw": ["Thought: ...\nFinal Answer: Happy to help!"], "tool_calls": [], "latency_ms": 812.4}
+    try:
+        benchmark(lambda: log.record(dict(entry)))
+    finally:
+        log.close()
+
+
+def test_lead_lookup(benchmark):
+    """Finding a returning prospect among 50k leads: a hash lookup, not a scan of the booking log"""
+    registry = LeadRegistry()
+    registry.load({"name": f"Lead {i}", "email": f"lead{i}@company{i % 5000}.com", "phone": f"555{i:07d}",
+                   "company": f"Company {i % 5000} Inc", "selected_slot": "2026-10-19 9:00 AM", "rep": "default"}
+                  for i in range(50_000))
+    assert benchmark(registry.find, email="Lead31337@Company1337.com")[0].name == "Lead 31337"
+
+
+def test_get_available_slots_tool(benchmark, agent):
+    tool = agent.tools["get_available_slots"]
+    benchmark(tool.invoke, {})
+
+
+def test_react_parse_tool_call(benchmark, agent):
+    assert benchmark(agent._parse_action, REACT_TOOL_COMPLETION)[0] == "get_available_slots"
+
+
+def test_react_parse_final_answer(benchmark, agent):
+    def parse():
+        return agent._parse_action(REACT_ANSWER_COMPLETION) or agent._final_answer(REACT_ANSWER_COMPLETION)
+    assert "AorySoft" in benchmark(parse)["output"]
+
+
+def test_prompt_build(benchmark, agent):
+    benchmark(agent._build_prompt, "We need a CRM for our logistics company")
@@ -0,0 +1,117 @@
+"""Micro-benchmark: per-request CPU and allocations of prompt and widget rendering.
+
+Compares the old approach (re-join tools, re-format the whole prompt, rebuild the
+widget with inline CSS through += concatenation) with the precompiled templates.
+
+    python benchmarks/bench_templates.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from calendar_widget import (  # noqa: E402
+    DATE_SECTION_CLOSE,
+    DATE_SECTION_OPEN,
+    TIME_SLOT_BUTTON,
+    WIDGET_FOOTER,
+    WIDGET_HEADER,
+    clear_widget_cache,
+    generate_calendar_widget,
+)
+
+with open(os.path.join(ROOT, "static", "calendar_widget.css"), encoding="utf-8") as f:
+    WIDGET_CSS = f.read()
+
+SLOTS = [f"2025-08-{day:02d} {time}" for day in range(20, 30) for time in ("9:30 AM", "10:00 AM", "2:00 PM", "3:00 PM")]
+
+
+def legacy_widget(slots_list):
+    """The pre-template widget: inline CSS and repeated += concatenation"""
+    from datetime import datetime
+    slots_by_date = {}
+    for slot in slots_list:
+        date_part = slot.split(' ')[0]
+        time_part = ' '.join(slot.split(' ')[1:])
+        if date_part not in slots_by_date:
+            slots_by_date[date_part] = []
+        slots_by_date[date_part].append(time_part)
+    calendar_html = "\n<div>\n    <style>\n" + WIDGET_CSS + "    </style>\n" + WIDGET_HEADER
+    for date_str, times in sorted(slots_by_date.items()):
+        formatted_date = datetime.strptime(date_str, '%Y-%m-%d').strftime('%A, %B %d, %Y')
+        calendar_html += DATE_SECTION_OPEN.format(formatted_date=formatted_date)
+        for time_slot in times:
+            calendar_html += TIME_SLOT_BUTTON.format(full_slot=f"{date_str} {time_slot}", time_slot=time_slot)
+        calendar_html += DATE_SECTION_CLOSE
+    calendar_html += WIDGET_FOOTER
+    calendar_html += f"<script>console.log('Calendar widget loaded with slots:', {slots_list});</script>"
+    return calendar_html
+
+
+def measure(label, fn, iterations=2000):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    cpu_us = (time.perf_counter() - start) / iterations * 1e6
+
+    # Peak bytes allocated while serving one call, averaged
+    tracemalloc.start()
+    peaks = 0
+    for _ in range(100):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks += peak - base
+    tracemalloc.stop()
+    result = fn()
+    print(f"{label:<40} {cpu_us:9.1f} us/call   {peaks / 100 / 1024:8.1f} KiB peak alloc/call   "
+          f"output {len(result) / 1024:6.1f} KiB")
+
+
+def bench_widget():
+    print(f"Calendar widget ({len(SLOTS)} slots)")
+    measure("legacy (inline CSS, += concat)", lambda: legacy_widget(SLOTS))
+
+    def cold():
+        clear_widget_cache()
+        return generate_calendar_widget(SLOTS)
+    measure("template, cache miss", cold)
+    measure("template, cached render", lambda: generate_calendar_widget(SLOTS))
+
+
+def bench_prompt():
+    try:
+        import main
+    except ImportError as e:
+        print(f"\nPrompt benchmark skipped ({e})")
+        return
+
+    agent = main.agent_executor
+    print("\nReAct prompt")
+
+    def legacy_prompt():
+        tools_desc = "\n".join([f"- {name}: {tool.description}" for name, tool in agent.tools.items()])
+        return f"""You are AorySoft's lead generation assistant. Use ReAct reasoning to help users.
+
+SYSTEM CONTEXT:
+{agent.system_prompt}
+
+AVAILABLE TOOLS:
+{tools_desc}
+
+User: Hi there, we need a CRM for our logistics company
+
+Thought:"""
+
+    measure("legacy (full f-string per request)", legacy_prompt)
+    measure("cached static prefix", lambda: agent._build_prompt("Hi there, we need a CRM for our logistics company"))
+
+
+if __name__ == "__main__":
+    bench_widget()
+    bench_prompt()
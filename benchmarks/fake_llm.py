@@ -0,0 +1,149 @@
+"""Deterministic stand-in for ChatGoogleGenerativeAI used by the benchmarks.
+
+It answers with canned ReAct completions picked from the prompt's last user
+message and sleeps for a configurable latency, so the rest of the pipeline
+can be measured without the live API. error_rate and tail_rate simulate a
+degraded provider (503s and slow outliers) for the LLM gateway.
+"""
+import asyncio
+import json
+import random
+import time
+from typing import List, Optional, Tuple
+
+from google.api_core.exceptions import ServiceUnavailable
+
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+
+BOOKING_INPUT = {"slot": "2030-01-01 9:00 AM", "client_name": "Benchmark Lead"}
+
+# (keyword in the user message, canned completion)
+CANNED_RESPONSES: List[Tuple[str, str]] = [
+    ("book ", "They gave a time and a name.\nAction: book_meeting\nAction Input: " + json.dumps(BOOKING_INPUT) + "\n"),
+    ("meet", "I should show the calendar.\nAction: get_available_slots\nAction Input: \n"),
+    ("slot", "I should show the calendar.\nAction: get_available_slots\nAction Input: \n"),
+    ("cost", "They are asking about pricing.\nAction: no tool needed\nFinal Answer: Pricing depends on scope; "
+             "most custom apps start with a short discovery phase. What are you looking to build?"),
+    ("service", "They want an overview.\nAction: no tool needed\nFinal Answer: AorySoft builds custom software, "
+                "web and mobile apps, and enterprise systems. What challenge are you facing?"),
+]
+DEFAULT_RESPONSE = ("This is a general question.\nAction: no tool needed\nFinal Answer: Thanks for reaching out! "
+                    "Could you tell me a bit more about your business and the problems you want to solve?")
+# Completion after a tool result was fed back
+OBSERVED_RESPONSE = ("The tool answered.\nAction: no tool needed\nFinal Answer: Done! You'll get a confirmation "
+                     "email shortly. Anything else I can help with?")
+
+
+def canned_response(user_message: str, responses: List[Tuple[str, str]]) -> str:
+    lowered = user_message.lower()
+    for keyword, response in responses:
+        if keyword in lowered:
+            return response
+    return DEFAULT_RESPONSE
+
+
+class FakeLLM:
+    """Drop-in for the chat model: invoke / ainvoke / astream with simulated latency"""
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, chunk_size: int = 12,
+                 responses: Optional[List[Tuple[str, str]]] = None, seed: int = 0, malformed_rate: float = 0.0,
+                 error_rate: float = 0.0, tail_rate: float = 0.0, tail_latency: float = 5.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.responses = CANNED_RESPONSES if responses is None else responses
+        # Share of completions that drift from the ReAct format (no Action / Final Answer labels)
+        self.malformed_rate = malformed_rate
+        # Share of calls that fail like an overloaded provider, and of calls that take tail_latency
+        self.error_rate = error_rate
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _delay(self) -> float:
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise ServiceUnavailable("fake provider overloaded")
+        if self.tail_rate and self._rng.random() < self.tail_rate:
+            return self.tail_latency
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _completion(self, prompt) -> str:
+        self.calls += 1
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        # Only look at the newest user message, not the system prompt or history
+        user_message = text.rsplit("User:", 1)[-1]
+        if "\nObservation:" in user_message:
+            return OBSERVED_RESPONSE
+        response = canned_response(user_message, self.responses)
+        if self.malformed_rate and self._rng.random() < self.malformed_rate:
+            return response.replace("Final Answer:", "").replace("Action:", "Next step:")
+        return response
+
+    def invoke(self, prompt, **kwargs) -> FakeMessage:
+        time.sleep(self._delay())
+        return FakeMessage(self._completion(prompt))
+
+    async def ainvoke(self, prompt, **kwargs) -> FakeMessage:
+        await asyncio.sleep(self._delay())
+        return FakeMessage(self._completion(prompt))
+
+    async def astream(self, prompt, **kwargs):
+        delay = self._delay()
+        completion = self._completion(prompt)
+        chunks = [completion[i:i + self.chunk_size] for i in range(0, len(completion), self.chunk_size)]
+        per_chunk = delay / max(len(chunks), 1)
+        for chunk in chunks:
+            await asyncio.sleep(per_chunk)
+            yield FakeMessage(chunk)
+
+
+def to_model_turn(completion: str):
+    """Structured equivalent of a canned ReAct completion"""
+    from function_calling import ModelTurn
+
+    answer = completion.split("Final Answer:", 1)[1].strip() if "Final Answer:" in completion else ""
+    for line in completion.splitlines():
+        if line.startswith("Action:") and "no tool needed" not in line:
+            name = line.replace("Action:", "").strip()
+            raw_input = completion.split("Action Input:", 1)[1].strip() if "Action Input:" in completion else ""
+            return ModelTurn(answer, [(name, json.loads(raw_input) if raw_input else {})])
+    return ModelTurn(answer, [])
+
+
+class FakeFunctionModel(FakeLLM):
+    """Function-calling counterpart of FakeLLM: same canned answers, returned as structured tool calls"""
+
+    def _turn(self, messages):
+        self.calls += 1
+        if messages[-1]["role"] == "tool":
+            return to_model_turn(OBSERVED_RESPONSE)
+        user_message = messages[0]["text"].rsplit("User:", 1)[-1]
+        return to_model_turn(canned_response(user_message, self.responses))
+
+    def invoke(self, messages, **kwargs):
+        time.sleep(self._delay())
+        return self._turn(messages)
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(self._delay())
+        return self._turn(messages)
+
+    async def astream(self, messages, **kwargs):
+        from function_calling import ModelTurn
+
+        delay = self._delay()
+        turn = self._turn(messages)
+        if turn.tool_calls:
+            await asyncio.sleep(delay)
+            yield turn
+            return
+        chunks = [turn.text[i:i + self.chunk_size] for i in range(0, len(turn.text), self.chunk_size)]
+        per_chunk = delay / max(len(chunks), 1)
+        for chunk in chunks:
+            await asyncio.sleep(per_chunk)
+            yield ModelTurn(chunk, [])
@@ -0,0 +1,197 @@
+"""Offline load test for the chatbot API with a fake LLM.
+
+Drives /chat, /book, /save-form and /calendar in-process (httpx ASGI
+transport) at increasing concurrency and reports throughput, latency
+percentiles and RSS. No Google API key or network access is needed.
+
+    python benchmarks/load_test.py --latency 0.5 --concurrency 1 8 32 128 --requests 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from itertools import count
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CHAT_MESSAGES = [
+    "Hi there!",
+    "What services do you offer?",
+    "How much does an app cost?",
+    "Our warehouse still tracks inventory in spreadsheets",
+    "Can we meet next week?",
+    "We need a customer portal for our logistics company",
+]
+
+
+def rss_mb() -> float:
+    """Current resident set size, falling back to the peak on systems without /proc"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def load_app(args):
+    """Import the app with throwaway storage and swap in the fake LLM"""
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ["BOOKING_STORAGE"] = "memory:"
+    os.environ["BOOKINGS_CSV_EXPORT"] = ""
+    os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+    # Transcripts stay on, their writer is part of the measured path
+    os.environ.setdefault("TRANSCRIPT_LOG_DIR", tempfile.mkdtemp(prefix="leadbot-transcripts-"))
+    if not args.router:
+        os.environ["INTENT_ROUTER_THRESHOLD"] = "2"
+    if not args.admission:
+        # Every request comes from one address; measure raw capacity unless admission control is under test
+        for name in ("ADMISSION_IP_RATE_PER_MINUTE", "ADMISSION_THREAD_RATE_PER_MINUTE", "ADMISSION_MAX_CONCURRENCY"):
+            os.environ[name] = "0"
+    os.chdir(ROOT)
+
+    import main
+    from fake_llm import FakeLLM
+
+    # Keep the gateway (retries, hedging, breaker) in the path, only the provider is fake
+    main.llm_gateway.clients = [FakeLLM(latency=args.latency, jitter=args.jitter, seed=i, error_rate=args.error_rate,
+                                        tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+                                for i in range(main.LLM_POOL_SIZE)]
+    if not args.cache:
+        main.agent_executor.response_cache = None
+
+    # Plenty of future slots so booking scenarios never run dry; they lie beyond the booking horizon
+    main.booking_service.horizon_days = None
+    start = datetime(2030, 1, 1, 9)
+    for i in range(args.slots):
+        main.slot_store.add_slot(start + timedelta(minutes=30 * i))
+    return main
+
+
+def make_scenarios(main):
+    slots = iter(main.slot_store.free_slots())
+    ids = count()
+
+    def chat(i):
+        return "POST", "/chat", {"message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)], "thread_id": f"bench-{next(ids)}"}
+
+    def book(i):
+        return "POST", "/book", {"slot": next(slots), "client_name": f"Client {i}"}
+
+    def save_form(i):
+        return "POST", "/save-form", {
+            "name": f"Lead {i}", "email": f"lead{i}@example.com", "phone": "555-0100",
+            "company": "Example Co", "selected_slot": next(slots), "message": "",
+        }
+
+    def calendar(i):
+        return "GET", "/calendar", None
+
+    return {"chat": chat, "book": book, "save-form": save_form, "calendar": calendar}
+
+
+async def run_level(client, build_request, concurrency: int, total: int):
+    latencies = []
+    errors = 0
+    # Turned away by admission control (429 rate limited, 503 queue full or timed out)
+    shed = 0
+    next_index = count()
+
+    async def worker():
+        nonlocal errors, shed
+        while True:
+            i = next(next_index)
+            if i >= total:
+                return
+            method, path, body = build_request(i)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                if response.status_code in (429, 503):
+                    shed += 1
+                elif response.status_code >= 500:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "shed": shed,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "rss_mb": rss_mb(),
+    }
+
+
+async def main_async(args):
+    import httpx
+
+    app_module = load_app(args)
+    scenarios = make_scenarios(app_module)
+    results = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for name in args.scenarios:
+            print(f"\n== {name} (fake LLM latency {args.latency * 1000:.0f} ms) ==")
+            print(f"{'conc':>6} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'errors':>7} {'shed':>6} "
+                  f"{'RSS MB':>8}")
+            for concurrency in args.concurrency:
+                row = await run_level(client, scenarios[name], concurrency, args.requests)
+                row["scenario"] = name
+                results.append(row)
+                print(f"{concurrency:>6} {row['throughput_rps']:>10.1f} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} "
+                      f"{row['p99_ms']:>10.1f} {row['errors']:>7} {row['shed']:>6} {row['rss_mb']:>8.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=["chat", "book", "save-form", "calendar"],
+                        choices=["chat", "book", "save-form", "calendar"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=400, help="requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake LLM calls that fail with a 503")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="share of fake LLM calls that take --tail-latency")
+    parser.add_argument("--tail-latency", type=float, default=5.0, help="slow-outlier latency in seconds")
+    parser.add_argument("--slots", type=int, default=20000, help="extra free slots to seed")
+    parser.add_argument("--no-router", dest="router", action="store_false", help="disable the intent fast-path")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="disable the response cache")
+    parser.add_argument("--admission", action="store_true",
+                        help="keep admission control on (ADMISSION_* env vars) and count shed requests")
+    parser.add_argument("--json", help="write results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(parse_args()))
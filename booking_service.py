@@ -0,0 +1,308 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from shared_state import SharedState, claim_before, claim_key, split_claim_key
+from slot_store import SlotStore, format_slot, parse_slot
+from storage import BookingStorage, booking_record
+
+
+class BookingError(Exception):
+    """Base class for booking failures"""
+
+
+class InvalidBookingError(BookingError):
+    """The request is missing fields or names a malformed slot"""
+
+
+class SlotUnavailableError(BookingError):
+    """The slot is already taken or does not exist"""
+
+    def __init__(self, slot: str):
+        super().__init__(f"Slot {slot} is not available")
+        self.slot = slot
+
+
+class IdempotencyConflictError(BookingError):
+    """An idempotency key was reused for a different booking"""
+
+
+class BookingNotSavedError(BookingError):
+    """Storage kept failing to commit the booking; the slot was released again"""
+
+
+# Shared key of the calendar data version
+VERSION_KEY = "calendar_version"
+
+
+def next_version(current: Optional[str]) -> str:
+    """Calendar version after one more change: "<epoch>-<changes>", a new epoch when there is none yet"""
+    epoch, _, changes = (current or "").partition("-")
+    if not changes:
+        return f"{uuid.uuid4().hex[:8]}-1"
+    return f"{epoch}-{int(changes) + 1}"
+
+
+def _newer(version: str, than: Optional[str]) -> bool:
+    epoch, _, changes = version.partition("-")
+    than_epoch, _, than_changes = (than or "").partition("-")
+    return epoch != than_epoch or int(changes) > int(than_changes)
+
+
+class BookingResult(NamedTuple):
+    slot: str
+    client_name: str
+    rep: str
+    email: Optional[str] = None
+    # True when this result was replayed for a retried idempotency key
+    replayed: bool = False
+
+
+class BookingService:
+    """Structured booking API shared by /book, /save-form and the agent tools.
+
+    A booking atomically claims the slot in the slot store and queues the
+    record for storage, then waits for the commit outside the lock; if
+    storage gives up on it, the claim is undone and BookingNotSavedError is
+    raised rather than confirming a booking that was never saved. Results are remembered per idempotency key, so a
+    client retrying the same request gets the original result back instead
+    of a second booking or a spurious conflict.
+
+    With a shared state, slots are claimed there first so several workers
+    can book from the same calendar; each claim is broadcast and applied to
+    the other workers' slot stores, and idempotency results are shared too.
+
+    calendar_version changes with every claim or release. With a shared
+    state it is counted there and carried by the broadcasts, so every worker
+    reports the same version for the same calendar (it keys the /calendar
+    ETags).
+
+    Only slots between now and horizon_days ahead can be booked (None: no
+    upper limit); clock defaults to the availability engine's time zone.
+    """
+
+    def __init__(self, slot_store: SlotStore, storage: BookingStorage,
+                 idempotency_ttl_seconds: float = 24 * 3600, max_idempotency_keys: int = 10000,
+                 shared_state: Optional[SharedState] = None,
+                 on_booked: Optional[Callable[[BookingResult, Dict[str, Any]], None]] = None,
+                 horizon_days: Optional[float] = None, clock: Optional[Callable[[], datetime]] = None):
+        self.slot_store = slot_store
+        self.storage = storage
+        self.horizon_days = horizon_days
+        if clock is None:
+            clock = slot_store.availability.now if slot_store.availability is not None else datetime.now
+        self.clock = clock
+        self.idempotency_ttl_seconds = idempotency_ttl_seconds
+        self.max_idempotency_keys = max_idempotency_keys
+        self.shared_state = shared_state
+        # Called with each new (not replayed) booking and its details (with the chat's thread_id, when
+        # booked from one) once the slot is committed
+        self.on_booked = on_booked
+        self._lock = threading.Lock()
+        # key -> (request fingerprint, result, expires_at)
+        self._results: "OrderedDict[str, Tuple[str, BookingResult, float]]" = OrderedDict()
+        if shared_state is not None:
+            shared_state.subscribe(self._on_remote_change)
+            slot_store.subscribe_evictions(self._on_evicted)
+            self.calendar_version = shared_state.update(VERSION_KEY, lambda current: current or next_version(None))
+        else:
+            self.calendar_version = next_version(None)
+
+    @staticmethod
+    def _fingerprint(**fields) -> str:
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _lookup(self, idempotency_key: str) -> Optional[Tuple[str, BookingResult]]:
+        if self.shared_state is not None:
+            cached = self.shared_state.get(f"idempotency:{idempotency_key}")
+            if cached is None:
+                return None
+            cached_fingerprint, fields = json.loads(cached)
+            return cached_fingerprint, BookingResult(*fields)
+        cached = self._results.get(idempotency_key)
+        if cached is None:
+            return None
+        cached_fingerprint, result, expires_at = cached
+        if expires_at < time.monotonic():
+            del self._results[idempotency_key]
+            return None
+        return cached_fingerprint, result
+
+    def _replay(self, idempotency_key: str, fingerprint: str) -> Optional[BookingResult]:
+        cached = self._lookup(idempotency_key)
+        if cached is None:
+            return None
+        cached_fingerprint, result = cached
+        if cached_fingerprint != fingerprint:
+            raise IdempotencyConflictError(f"Idempotency key {idempotency_key} was already used for a different booking")
+        return result._replace(replayed=True)
+
+    def _remember(self, idempotency_key: str, fingerprint: str, result: BookingResult):
+        if self.shared_state is not None:
+            self.shared_state.set(f"idempotency:{idempotency_key}", json.dumps([fingerprint, list(result)]),
+                                  ttl_seconds=self.idempotency_ttl_seconds)
+            return
+        self._results[idempotency_key] = (fingerprint, result, time.monotonic() + self.idempotency_ttl_seconds)
+        while len(self._results) > self.max_idempotency_keys:
+            self._results.popitem(last=False)
+
+    def _check_bookable(self, slot: str):
+        try:
+            when = parse_slot(slot)
+        except ValueError:
+            # Not a slot at all: the claim reports it as unavailable
+            return
+        now = self.clock()
+        if when < now:
+            raise InvalidBookingError(f"Slot {slot} is in the past")
+        if self.horizon_days is not None and when >= now + timedelta(days=self.horizon_days):
+            raise InvalidBookingError(f"Slot {slot} is more than {self.horizon_days:g} days ahead")
+
+    def _claim(self, slot: str, client_name: str) -> str:
+        self._check_bookable(slot)
+        if self.shared_state is not None:
+            return self._claim_shared(slot, client_name)
+        rep = self.slot_store.book(slot, client_name)
+        if not rep:
+            raise SlotUnavailableError(slot)
+        self._bump_version()
+        return rep
+
+    def _bump_version(self) -> str:
+        if self.shared_state is None:
+            self.calendar_version = next_version(self.calendar_version)
+            return self.calendar_version
+        version = self.shared_state.update(VERSION_KEY, next_version)
+        self._adopt_version(version)
+        return version
+
+    def _adopt_version(self, version: Optional[str]):
+        # Broadcasts can arrive out of order; the version only moves forward within an epoch
+        if version and _newer(version, self.calendar_version):
+            self.calendar_version = version
+
+    def _claim_shared(self, slot: str, client_name: str) -> str:
+        for rep in self.slot_store.free_reps(slot):
+            key = claim_key(format_slot(parse_slot(slot)), rep)
+            if self.shared_state.claim(key, client_name):
+                self.slot_store.book(slot, client_name, rep=rep)
+                self.shared_state.publish({"kind": "slot", "key": key, "client_name": client_name,
+                                           "version": self._bump_version()})
+                return rep
+            # Another worker got it first and its broadcast has not arrived yet
+            holder = self.shared_state.owner(key)
+            if holder is not None:
+                self.slot_store.book(slot, holder, rep=rep)
+        raise SlotUnavailableError(slot)
+
+    def _on_remote_change(self, event: dict):
+        """Apply a slot claimed or released by another worker to the local slot store"""
+        if event.get("kind") == "slot":
+            slot, rep = split_claim_key(event["key"])
+            self.slot_store.apply_claims([(slot, rep, event["client_name"])])
+            self._adopt_version(event.get("version"))
+
+    def _on_evicted(self, cutoff: datetime):
+        # Called under the slot store lock: drop the shared claims of the evicted windows in the background
+        threading.Thread(target=self.shared_state.prune_claims, args=(cutoff,), name="claim-pruner",
+                         daemon=True).start()
+
+    def sync_shared_claims(self, persisted_claims):
+        """Startup sync: publish this worker's persisted bookings, then adopt every shared claim still kept"""
+        if self.shared_state is None:
+            return
+        cutoff = self.slot_store.retention_cutoff()
+        if cutoff is not None:
+            self.shared_state.prune_claims(cutoff)
+        claimed = False
+        for slot, rep, client_name in persisted_claims:
+            if client_name is not None and (cutoff is None or not claim_before(claim_key(slot, rep), cutoff)):
+                claimed |= self.shared_state.claim(claim_key(format_slot(parse_slot(slot)), rep), client_name)
+        if claimed:
+            self._bump_version()
+        else:
+            self._adopt_version(self.shared_state.get(VERSION_KEY))
+        self.slot_store.apply_claims(
+            (*split_claim_key(key), client_name) for key, client_name in self.shared_state.claims().items()
+        )
+
+    def book_slot(self, slot: str, client_name: str, idempotency_key: Optional[str] = None,
+                  thread_id: Optional[str] = None) -> BookingResult:
+        """Claim a slot for a client without contact details; thread_id names the chat it was booked from"""
+        if not slot or not client_name:
+            raise InvalidBookingError("Slot and client name are required")
+        fingerprint = self._fingerprint(slot=slot, client_name=client_name)
+        with self._lock:
+            if idempotency_key:
+                replayed = self._replay(idempotency_key, fingerprint)
+                if replayed is not None:
+                    return replayed
+            rep = self._claim(slot, client_name)
+            saved = self.storage.save_slot(slot, rep, client_name)
+            result = BookingResult(slot=slot, client_name=client_name, rep=rep)
+            if idempotency_key:
+                self._remember(idempotency_key, fingerprint, result)
+        self._wait_saved(saved, result, idempotency_key)
+        self._booked(result, {"name": client_name}, thread_id)
+        return result
+
+    def book_meeting(self, name: str, email: str, phone: str, company: str, selected_slot: str,
+                     message: str = "", idempotency_key: Optional[str] = None,
+                     thread_id: Optional[str] = None) -> BookingResult:
+        """Claim a slot and record the lead's full booking details"""
+        if not all([selected_slot, name, email, phone, company]):
+            raise InvalidBookingError("Missing required booking information")
+        fingerprint = self._fingerprint(name=name, email=email, phone=phone, company=company,
+                                        selected_slot=selected_slot, message=message)
+        with self._lock:
+            if idempotency_key:
+                replayed = self._replay(idempotency_key, fingerprint)
+                if replayed is not None:
+                    return replayed
+            rep = self._claim(selected_slot, name)
+            # Queued for the background writer (group-committed to storage)
+            saved = self.storage.record_booking(booking_record(name, email, phone, company, selected_slot, message,
+                                                               rep=rep))
+            result = BookingResult(slot=selected_slot, client_name=name, rep=rep, email=email)
+            if idempotency_key:
+                self._remember(idempotency_key, fingerprint, result)
+        self._wait_saved(saved, result, idempotency_key)
+        self._booked(result, {"name": name, "email": email, "phone": phone, "company": company, "message": message},
+                     thread_id)
+        return result
+
+    def _wait_saved(self, saved: Future, result: BookingResult, idempotency_key: Optional[str]):
+        try:
+            saved.result()
+        except Exception as e:
+            self._undo(result, idempotency_key)
+            raise BookingNotSavedError(f"Booking for slot {result.slot} could not be saved") from e
+
+    def _undo(self, result: BookingResult, idempotency_key: Optional[str]):
+        """Free the slot and forget the idempotency result of a booking that storage did not commit"""
+        with self._lock:
+            self.slot_store.release(result.slot, rep=result.rep, client_name=result.client_name)
+            if self.shared_state is not None:
+                key = claim_key(format_slot(parse_slot(result.slot)), result.rep)
+                if self.shared_state.release(key, result.client_name):
+                    self.shared_state.publish({"kind": "slot", "key": key, "client_name": None,
+                                               "version": self._bump_version()})
+                if idempotency_key:
+                    self.shared_state.delete(f"idempotency:{idempotency_key}")
+            else:
+                self._bump_version()
+                if idempotency_key:
+                    self._results.pop(idempotency_key, None)
+
+    def _booked(self, result: BookingResult, details: Dict[str, Any], thread_id: Optional[str]):
+        # Outside the lock: the hook only queues work, but must not hold up other bookings
+        if self.on_booked is not None:
+            if thread_id:
+                details["thread_id"] = thread_id
+            self.on_booked(result, details)
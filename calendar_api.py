@@ -0,0 +1,132 @@
+import base64
+import hashlib
+import json
+from datetime import datetime, time, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from slot_store import format_slot
+
+STATUSES = ("free", "booked", "all")
+FORMATS = ("full", "compact")
+# Sorts after every rep name: resumes a distinct-times page after all reps of a time
+_LAST_REP = "\U0010ffff"
+
+
+class CalendarQuery(NamedTuple):
+    start: datetime
+    end: datetime
+    rep: Optional[str]
+    status: str
+    time_from: Optional[time]
+    time_to: Optional[time]
+    after: Optional[Tuple[datetime, str]]
+    limit: int
+    fmt: str
+
+
+def _parse_datetime(value: str, name: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime, e.g. 2026-10-19 or 2026-10-19T09:00")
+
+
+def _parse_time_of_day(value: Optional[str], name: str) -> Optional[time]:
+    if value is None:
+        return None
+    try:
+        return time.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a 24h time, e.g. 09:00")
+
+
+def encode_cursor(when: datetime, rep: str) -> str:
+    """Opaque keyset cursor: the page resumes right after (when, rep)"""
+    return base64.urlsafe_b64encode(json.dumps([when.isoformat(), rep]).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        when, rep = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(when), rep
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_query(now: datetime, horizon_days: int, max_limit: int, start: Optional[str] = None,
+                end: Optional[str] = None, date: Optional[str] = None, rep: Optional[str] = None,
+                status: str = "all", time_from: Optional[str] = None, time_to: Optional[str] = None,
+                cursor: Optional[str] = None, limit: int = 100, fmt: str = "full",
+                max_past_days: int = 31) -> CalendarQuery:
+    """Validate the query parameters of /calendar and /slots, raises ValueError with a client-facing message.
+
+    Slots are generated for the requested range and stay in the store, so the
+    range must lie between max_past_days ago and the end of the booking
+    horizon, and span at most horizon_days.
+    """
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    # End of the horizon's last day, so "now + horizon_days" is always inside
+    latest = today + timedelta(days=horizon_days + 1)
+    if date is not None:
+        start_at = _parse_datetime(date, "date").replace(hour=0, minute=0, second=0, microsecond=0)
+        end_at = start_at + timedelta(days=1)
+    else:
+        # Default range: today through the booking horizon
+        start_at = _parse_datetime(start, "start") if start else today
+        end_at = _parse_datetime(end, "end") if end else min(start_at + timedelta(days=horizon_days), latest)
+    if end_at <= start_at:
+        raise ValueError("end must be after start")
+    if start_at < today - timedelta(days=max_past_days):
+        raise ValueError(f"start can be at most {max_past_days} days in the past")
+    if end_at > latest:
+        raise ValueError(f"end can be at most {horizon_days} days ahead")
+    if end_at - start_at > timedelta(days=horizon_days):
+        raise ValueError(f"a range can span at most {horizon_days} days")
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if not 1 <= limit <= max_limit:
+        raise ValueError(f"limit must be between 1 and {max_limit}")
+    return CalendarQuery(start_at, end_at, rep, status, _parse_time_of_day(time_from, "time_from"),
+                         _parse_time_of_day(time_to, "time_to"), decode_cursor(cursor) if cursor else None, limit, fmt)
+
+
+def query_fingerprint(query: CalendarQuery, distinct_times: bool = False) -> str:
+    """Short hash of a resolved query (the default range already pinned to dates), part of the page ETag"""
+    return hashlib.sha256(repr((tuple(query), distinct_times)).encode("utf-8")).hexdigest()[:12]
+
+
+def next_cursor(rows: List[Tuple[datetime, str, bool]], limit: int, distinct_times: bool = False) -> Optional[str]:
+    """Cursor of the page after rows, which were queried with limit + 1 to detect a next page"""
+    if len(rows) <= limit:
+        return None
+    when, rep, _booked = rows[limit - 1]
+    return encode_cursor(when, _LAST_REP if distinct_times else rep)
+
+
+def render_calendar(rows: List[Tuple[datetime, str, bool]], version: str, cursor: Optional[str], fmt: str) -> dict:
+    """Calendar page without client names.
+
+    full:    {"slots": [{"slot", "date", "time", "rep", "booked"}, ...]}
+    compact: {"reps": [...], "slots": [["2026-10-19 9:00 AM", rep index, 0 | 1], ...]}
+    """
+    if fmt == "compact":
+        reps = {}
+        slots = [[format_slot(when), reps.setdefault(rep, len(reps)), int(booked)] for when, rep, booked in rows]
+        return {"version": version, "reps": list(reps), "slots": slots, "next_cursor": cursor}
+    slots = []
+    for when, rep, booked in rows:
+        slot = format_slot(when)
+        date_part, _, time_part = slot.partition(" ")
+        slots.append({"slot": slot, "date": date_part, "time": time_part, "rep": rep, "booked": booked})
+    return {"version": version, "slots": slots, "next_cursor": cursor}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check, weak comparison as HTTP caches do for GET"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
@@ -0,0 +1,113 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+# Widget CSS ships once as a cacheable static asset instead of inline in every chat bubble
+WIDGET_CSS_PATH = "/static/calendar_widget.css"
+
+# Static parts of the widget, built once at import time
+WIDGET_HEADER = f"""
+<div style="max-width: 800px; margin: 20px auto; font-family: 'Segoe UI', Arial, sans-serif;">
+    <link rel="stylesheet" href="{WIDGET_CSS_PATH}">
+
+    <div class="aorysoft-calendar">
+        <div class="calendar-header">
+            <div class="calendar-title">🚀 Schedule Your AorySoft Meeting</div>
+            <div class="calendar-subtitle">Select your preferred date and time below</div>
+        </div>
+
+        <div class="calendar-dates">
+"""
+
+WIDGET_FOOTER = """
+        </div>
+
+        <div class="calendar-footer">
+            💡 Click any time slot above to book your meeting instantly!
+        </div>
+
+        <div id="bookingForm" class="booking-form">
+            <div class="selected-slot" id="selectedSlotDisplay"></div>
+            <form onsubmit="submitBooking(event)">
+                <div class="form-row">
+                    <div class="form-group">
+                        <label for="clientName">Full Name *</label>
+                        <input type="text" id="clientName" name="name" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="clientEmail">Email *</label>
+                        <input type="email" id="clientEmail" name="email" required>
+                    </div>
+                </div>
+                <div class="form-row">
+                    <div class="form-group">
+                        <label for="clientPhone">Phone *</label>
+                        <input type="tel" id="clientPhone" name="phone" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="clientCompany">Company *</label>
+                        <input type="text" id="clientCompany" name="company" required>
+                    </div>
+                </div>
+                <div class="form-group">
+                    <label for="clientMessage">Project Details (Optional)</label>
+                    <textarea id="clientMessage" name="message" rows="3" placeholder="Tell us about your project and challenges..."></textarea>
+                </div>
+                <button type="submit" class="submit-btn">🚀 Confirm Meeting</button>
+            </form>
+        </div>
+    </div>
+</div>
+"""
+
+DATE_SECTION_OPEN = """
+            <div class="date-section">
+                <div class="date-header">{formatted_date}</div>
+                <div class="time-slots">
+"""
+
+TIME_SLOT_BUTTON = """
+                    <button class="time-slot" data-slot="{full_slot}" onclick="selectTimeSlot('{full_slot}', this)">
+                        {time_slot}
+                    </button>
+"""
+
+DATE_SECTION_CLOSE = """
+                </div>
+            </div>
+"""
+
+
+@lru_cache(maxsize=1024)
+def _format_date(date_str: str) -> str:
+    # Format date for display
+    return datetime.strptime(date_str, '%Y-%m-%d').strftime('%A, %B %d, %Y')
+
+
+@lru_cache(maxsize=128)
+def _render_widget(slots: Tuple[str, ...]) -> str:
+    """Render the widget for a slot list; cached until the free slots change"""
+    # Parse slots and organize by date
+    slots_by_date = {}
+    for slot in slots:
+        date_part, _, time_part = slot.partition(' ')  # "2025-08-20", "10:00 AM"
+        slots_by_date.setdefault(date_part, []).append(time_part)
+
+    parts = [WIDGET_HEADER]
+    for date_str, times in sorted(slots_by_date.items()):
+        parts.append(DATE_SECTION_OPEN.format(formatted_date=_format_date(date_str)))
+        for time_slot in times:
+            parts.append(TIME_SLOT_BUTTON.format(full_slot=f"{date_str} {time_slot}", time_slot=time_slot))
+        parts.append(DATE_SECTION_CLOSE)
+    parts.append(WIDGET_FOOTER)
+    return "".join(parts)
+
+
+def generate_calendar_widget(slots_list: Iterable[str]) -> str:
+    """Generate a beautiful interactive calendar widget HTML"""
+    return _render_widget(tuple(slots_list))
+
+
+def clear_widget_cache():
+    """Drop cached renders (benchmarks use this to measure cold renders)"""
+    _render_widget.cache_clear()
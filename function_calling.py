@@ -0,0 +1,105 @@
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# The Gemini SDK takes about a second to import, so it is only loaded once a model is built or called
+
+# (tool name, arguments) requested by the model
+ToolCall = Tuple[str, Dict[str, Any]]
+
+# JSON schema types of langchain tool args -> Gemini schema types
+_SCHEMA_TYPES = {
+    "string": "STRING",
+    "integer": "INTEGER",
+    "number": "NUMBER",
+    "boolean": "BOOLEAN",
+    "array": "ARRAY",
+    "object": "OBJECT",
+}
+
+
+class ModelTurn(NamedTuple):
+    """One model response: visible text and/or structured tool calls"""
+    text: str
+    tool_calls: List[ToolCall]
+
+
+def tool_declaration(tool) -> Dict[str, Any]:
+    """Gemini FunctionDeclaration for a langchain @tool, built from its argument schema"""
+    description = tool.description
+    # @tool prefixes the docstring with the Python signature, the schema already carries it
+    if description.startswith(f"{tool.name}("):
+        description = description.split(" - ", 1)[-1]
+    declaration = {"name": tool.name, "description": description}
+    if tool.args:
+        properties = {
+            name: {"type_": _SCHEMA_TYPES.get(spec.get("type"), "STRING"), "description": spec.get("title", name)}
+            for name, spec in tool.args.items()
+        }
+        declaration["parameters"] = {"type_": "OBJECT", "properties": properties, "required": list(properties)}
+    return declaration
+
+
+def to_contents(messages: List[Dict[str, Any]]) -> List["glm.Content"]:
+    """Convert the agent's neutral message list to Gemini contents.
+
+    Messages are {"role": "user", "text"}, {"role": "model", "text", "tool_calls"}
+    or {"role": "tool", "name", "result"}.
+    """
+    import google.ai.generativelanguage as glm
+
+    contents = []
+    for message in messages:
+        if message["role"] == "tool":
+            part = glm.Part(function_response=glm.FunctionResponse(
+                name=message["name"], response={"result": message["result"]}))
+            contents.append(glm.Content(role="function", parts=[part]))
+            continue
+        parts = []
+        if message.get("text"):
+            parts.append(glm.Part(text=message["text"]))
+        for name, args in message.get("tool_calls", ()):
+            parts.append(glm.Part(function_call=glm.FunctionCall(name=name, args=args)))
+        contents.append(glm.Content(role=message["role"], parts=parts))
+    return contents
+
+
+def to_model_turn(parts) -> ModelTurn:
+    texts = []
+    tool_calls = []
+    for part in parts:
+        if "function_call" in part:
+            call = type(part.function_call).to_dict(part.function_call)
+            tool_calls.append((call["name"], call.get("args") or {}))
+        elif part.text:
+            texts.append(part.text)
+    return ModelTurn("".join(texts), tool_calls)
+
+
+class GeminiFunctionModel:
+    """Gemini called through its native function-calling API with the agent's @tool schemas"""
+
+    def __init__(self, tools, model: str = "gemini-1.5-flash", temperature: float = 0.7,
+                 max_output_tokens: int = 500, api_key: Optional[str] = None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or os.environ.get("GOOGLE_API_KEY"))
+        self.declarations = [tool_declaration(tool) for tool in tools]
+        self.client = genai.GenerativeModel(
+            model_name=model,
+            generation_config={"temperature": temperature, "max_output_tokens": max_output_tokens},
+            tools=[{"function_declarations": self.declarations}],
+        )
+
+    def invoke(self, messages: List[Dict[str, Any]]) -> ModelTurn:
+        response = self.client.generate_content(to_contents(messages))
+        return to_model_turn(response.parts)
+
+    async def ainvoke(self, messages: List[Dict[str, Any]]) -> ModelTurn:
+        response = await self.client.generate_content_async(to_contents(messages))
+        return to_model_turn(response.parts)
+
+    async def astream(self, messages: List[Dict[str, Any]]):
+        """Yield partial ModelTurns; tool calls arrive whole in a single chunk"""
+        response = await self.client.generate_content_async(to_contents(messages), stream=True)
+        async for chunk in response:
+            yield to_model_turn(chunk.parts)
@@ -0,0 +1,118 @@
+import re
+import threading
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Optional, Pattern, Tuple
+
+SCHEDULE_MEETING = "schedule_meeting"
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    confidence: float
+
+
+class IntentRouter(ABC):
+    """Base pre-router: decide an intent without the LLM, or return None to fall back to it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def classify(self, message: str) -> Optional[IntentMatch]:
+        ...
+
+    def route(self, message: str) -> Optional[IntentMatch]:
+        match = self.classify(message)
+        with self._lock:
+            if match is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return match
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# The visitor asking for something themselves: "can we", "I'd like to", "let's", "please", or an opening imperative.
+# Without it "patients can book an appointment" would be a meeting request.
+_REQUEST = (r"(^\W*|\b(can|could|may) (we|i|you)( please)? |\b(i|we)('d| would)? (want|like|love|need) to "
+            r"|\blet'?s |\bplease |\bhelp me )")
+
+# "talk" only counts with a call as its object: "let's talk about pricing" is a question for the LLM
+_TALK_ON_A_CALL = r"talk (on|over) (a |the )?(call|phone|video call|zoom)"
+
+# (pattern, weight) cues for an explicit meeting request
+MEETING_CUES: List[Tuple[str, float]] = [
+    # Direct triggers from the system prompt
+    (r"\bcan we (meet|schedule|have a call|" + _TALK_ON_A_CALL + r")\b", 1.0),
+    (_REQUEST + r"(schedule|book|set up|arrange) (a |an )?(meeting|call|demo|consultation|appointment)\b", 1.0),
+    (r"\bi('d| would)? (want|like|love) to (meet|talk to (someone|you)|schedule|book)\b", 1.0),
+    (r"\blet'?s (meet|schedule|set up a call|" + _TALK_ON_A_CALL + r")\b", 1.0),
+    # Asking which slots are open, not describing an app that shows them
+    (r"\b(what|which|any|show( me)?|do you have)\b.{0,20}\b(available|open|free) (time )?slots?\b", 0.9),
+    (r"\b(what|which|any|when)\b.{0,20}\b(slots?|times?)\b.{0,20}\bavailable\b", 0.9),
+    (r"\bwhen are you (available|free)\b", 0.9),
+]
+
+# Weaker cues: they back up a partial match but are capped below any routing threshold, so mentioning
+# "call" and "calendar" in a project description never routes on its own
+WEAK_MEETING_CUES: List[Tuple[str, float]] = [
+    (r"\b(meeting|call|demo|appointment)\b", 0.4),
+    (r"\b(schedule|book|calendar)\b", 0.4),
+]
+WEAK_CUE_CAP = 0.5
+
+# Cues that mean the visitor is not asking to meet right now
+NEGATION_CUES: List[Tuple[str, float]] = [
+    (r"\b(don'?t|do not|not ready|no need|rather not|won'?t)\b.{0,30}\b(meet|call|schedule|book)", -1.0),
+    (r"\b(cancel|reschedule)\b", -1.0),
+]
+
+
+class KeywordIntentRouter(IntentRouter):
+    """Compiled regex scorer for obvious scheduling requests"""
+
+    def __init__(self, threshold: float = 0.8, cues=None, negations=None, weak_cues=None,
+                 weak_cap: float = WEAK_CUE_CAP):
+        super().__init__()
+        self.threshold = threshold
+        self.weak_cap = weak_cap
+        self._cues: List[Tuple[Pattern, float]] = [
+            (re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in (cues or MEETING_CUES)
+        ]
+        self._weak_cues: List[Tuple[Pattern, float]] = [
+            (re.compile(pattern, re.IGNORECASE), weight)
+            for pattern, weight in (WEAK_MEETING_CUES if weak_cues is None else weak_cues)
+        ]
+        self._negations: List[Tuple[Pattern, float]] = [
+            (re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in (negations or NEGATION_CUES)
+        ]
+
+    def score(self, message: str) -> float:
+        score = 0.0
+        for pattern, weight in self._cues:
+            if pattern.search(message):
+                score += weight
+        score += min(sum(weight for pattern, weight in self._weak_cues if pattern.search(message)), self.weak_cap)
+        for pattern, weight in self._negations:
+            if pattern.search(message):
+                score += weight
+        return max(0.0, min(score, 1.0))
+
+    def classify(self, message: str) -> Optional[IntentMatch]:
+        # Long messages usually carry context the LLM should read
+        if len(message) > 300:
+            return None
+        confidence = self.score(message)
+        if confidence >= self.threshold:
+            return IntentMatch(SCHEDULE_MEETING, confidence)
+        return None
@@ -0,0 +1,314 @@
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Set
+
+from metrics import REGISTRY, log_event
+
+JOBS = REGISTRY.counter("chatbot_jobs_total", "Background jobs finished, by outcome (ok, retry, dead)", ["type", "outcome"])
+JOB_SECONDS = REGISTRY.histogram(
+    "chatbot_job_seconds",
+    "Background job run time",
+    ["type"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+class Job(NamedTuple):
+    id: str
+    type: str
+    payload: Dict[str, Any]
+    attempts: int = 0
+    last_error: Optional[str] = None
+
+
+class JobStore(ABC):
+    """Persistence of pending jobs and dead letters; the base class keeps nothing durable"""
+
+    def save(self, job: Job):
+        """Record a job that is queued or waiting for a retry"""
+
+    def delete(self, job_id: str):
+        """Forget a job that finished"""
+
+    def recover(self, older_than_seconds: float) -> List[Job]:
+        """Take over pending jobs nobody touched recently (left behind by a crashed or stopped worker)"""
+        return []
+
+    @abstractmethod
+    def dead_letter(self, job: Job, error: str):
+        ...
+
+    @abstractmethod
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        ...
+
+    def close(self):
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """Default store: jobs live only in the queue, the newest dead letters are kept in memory"""
+
+    def __init__(self, max_dead_letters: int = 1000):
+        self._dead: Deque[Dict[str, Any]] = deque(maxlen=max_dead_letters)
+
+    def dead_letter(self, job, error):
+        self._dead.append({"id": job.id, "type": job.type, "payload": job.payload, "attempts": job.attempts,
+                           "error": error, "failed_at": time.time()})
+
+    def dead_letters(self, limit=100):
+        return list(self._dead)[-limit:][::-1]
+
+
+class SQLiteJobStore(JobStore):
+    """Durable store: pending jobs survive a restart and are picked up again, dead letters are kept"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS dead_letters (
+            id TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            attempts INTEGER NOT NULL,
+            error TEXT NOT NULL,
+            failed_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = "jobs.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def save(self, job):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, type, payload, attempts, last_error, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET attempts = excluded.attempts, last_error = excluded.last_error, "
+                "updated_at = excluded.updated_at",
+                (job.id, job.type, json.dumps(job.payload), job.attempts, job.last_error, time.time()),
+            )
+
+    def delete(self, job_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def recover(self, older_than_seconds):
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, type, payload, attempts, last_error FROM jobs WHERE updated_at < ?",
+                (now - older_than_seconds,),
+            ).fetchall()
+            # Touch them so another worker starting at the same time leaves them alone
+            self._conn.executemany("UPDATE jobs SET updated_at = ? WHERE id = ?", [(now, row[0]) for row in rows])
+        return [Job(id, type_, json.loads(payload), attempts, last_error) for id, type_, payload, attempts, last_error in rows]
+
+    def dead_letter(self, job, error):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dead_letters (id, type, payload, attempts, error, failed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, job.type, json.dumps(job.payload), job.attempts, error, time.time()),
+            )
+
+    def dead_letters(self, limit=100):
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT id, type, payload, attempts, error, failed_at FROM dead_letters ORDER BY failed_at DESC LIMIT ?",
+                (limit,),
+            )
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor]
+        for row in rows:
+            row["payload"] = json.loads(row["payload"])
+        return rows
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_store(url: str) -> JobStore:
+    """Build a job store from a URL: 'memory:' (default) or 'sqlite:jobs.db'"""
+    scheme, _, location = url.partition(":")
+    if scheme == "memory":
+        return MemoryJobStore()
+    if scheme == "sqlite":
+        return SQLiteJobStore(location or "jobs.db")
+    raise ValueError(f"Unknown job store backend: {url}")
+
+
+class _JobType(NamedTuple):
+    handler: Callable
+    concurrency: int
+    max_attempts: int
+    timeout: float
+
+
+class JobQueue:
+    """In-process queue for side effects that must not hold up a request (emails, CRM pushes).
+
+    Each job type has its own queue and a fixed number of workers, which is
+    its concurrency limit. A failed job is retried with exponential backoff
+    and full jitter; after max_attempts it goes to the store's dead letters.
+    Handlers may be coroutines or plain functions (run in a thread) and get
+    the job payload. Delivery is at least once, so handlers should tolerate
+    a repeat after a crash.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, backoff_base: float = 2.0, backoff_max: float = 300.0):
+        self.store = store or MemoryJobStore()
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._types: Dict[str, _JobType] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        # Jobs enqueued before start()
+        self._backlog: List[Job] = []
+        self._running: Dict[str, int] = {}
+        # Retries waiting out their backoff
+        self._delayed: Dict[str, asyncio.TimerHandle] = {}
+        # Ids of jobs this queue holds, so recovery does not adopt them a second time
+        self._owned: Set[str] = set()
+
+    def register(self, job_type: str, handler: Callable, concurrency: int = 1, max_attempts: int = 5,
+                 timeout: float = 30.0):
+        self._types[job_type] = _JobType(handler, concurrency, max_attempts, timeout)
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any]) -> str:
+        """Queue a job from any thread, returns its id"""
+        if job_type not in self._types:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job = Job(uuid.uuid4().hex, job_type, payload)
+        self.store.save(job)
+        self._submit(job)
+        return job.id
+
+    def _submit(self, job: Job):
+        with self._lock:
+            self._owned.add(job.id)
+            if self._loop is None:
+                self._backlog.append(job)
+                return
+        self._loop.call_soon_threadsafe(self._queues[job.type].put_nowait, job)
+
+    async def start(self, recover_after_seconds: Optional[float] = None):
+        """Start the workers on the running loop and pick up jobs a previous run or another worker left behind"""
+        for job_type, spec in self._types.items():
+            self._queues[job_type] = asyncio.Queue()
+            self._running[job_type] = 0
+            self._workers.extend(asyncio.create_task(self._work(job_type)) for _ in range(spec.concurrency))
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            backlog, self._backlog = self._backlog, []
+        for job in backlog:
+            self._queues[job.type].put_nowait(job)
+        # Jobs younger than the longest backoff may still belong to a live worker
+        grace = self.backoff_max + 60 if recover_after_seconds is None else recover_after_seconds
+        self._recover(grace)
+        self._workers.append(asyncio.create_task(self._sweep(grace)))
+
+    def _recover(self, grace: float):
+        for job in self.store.recover(grace):
+            if job.type in self._types and job.id not in self._owned:
+                self._owned.add(job.id)
+                self._queues[job.type].put_nowait(job)
+
+    async def _sweep(self, grace: float):
+        """Keep adopting jobs of workers that died while this one runs"""
+        while True:
+            await asyncio.sleep(min(max(grace, 1), 60))
+            self._recover(grace)
+
+    async def stop(self, timeout: float = 10.0):
+        """Let queued jobs finish for up to timeout seconds; anything left stays in a durable store"""
+        queues = [queue.join() for queue in self._queues.values()]
+        try:
+            await asyncio.wait_for(asyncio.gather(*queues), timeout)
+        except asyncio.TimeoutError:
+            log_event("jobs_stop_timeout", level=logging.WARNING, sample_rate=1.0, pending=self.pending())
+        for handle in self._delayed.values():
+            handle.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        self.store.close()
+
+    async def _work(self, job_type: str):
+        queue = self._queues[job_type]
+        spec = self._types[job_type]
+        while True:
+            job = await queue.get()
+            self._running[job_type] += 1
+            start = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(spec.handler):
+                    await asyncio.wait_for(spec.handler(job.payload), spec.timeout)
+                else:
+                    await asyncio.wait_for(asyncio.to_thread(spec.handler, job.payload), spec.timeout)
+            except Exception as e:
+                self._failed(job._replace(attempts=job.attempts + 1, last_error=f"{type(e).__name__}: {e}"), spec)
+            else:
+                self.store.delete(job.id)
+                self._owned.discard(job.id)
+                JOBS.inc(type=job_type, outcome="ok")
+            finally:
+                JOB_SECONDS.observe(time.perf_counter() - start, type=job_type)
+                self._running[job_type] -= 1
+                queue.task_done()
+
+    def _failed(self, job: Job, spec: _JobType):
+        if job.attempts >= spec.max_attempts:
+            JOBS.inc(type=job.type, outcome="dead")
+            log_event("job_dead_letter", level=logging.ERROR, sample_rate=1.0, job_type=job.type, job_id=job.id,
+                      attempts=job.attempts, error=job.last_error)
+            self.store.dead_letter(job, job.last_error)
+            self._owned.discard(job.id)
+            return
+        JOBS.inc(type=job.type, outcome="retry")
+        self.store.save(job)
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1)))
+        self._delayed[job.id] = self._loop.call_later(delay, self._retry, job)
+
+    def _retry(self, job: Job):
+        self._delayed.pop(job.id, None)
+        self._queues[job.type].put_nowait(job)
+
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values()) + len(self._delayed) + len(self._backlog)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "types": {
+                job_type: {
+                    "queued": self._queues[job_type].qsize() if job_type in self._queues else 0,
+                    "running": self._running.get(job_type, 0),
+                    "concurrency": spec.concurrency,
+                    "ok": JOBS.value(type=job_type, outcome="ok"),
+                    "retries": JOBS.value(type=job_type, outcome="retry"),
+                    "dead": JOBS.value(type=job_type, outcome="dead"),
+                }
+                for job_type, spec in self._types.items()
+            },
+            "waiting_retry": len(self._delayed),
+        }
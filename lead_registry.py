@@ -0,0 +1,264 @@
+import hashlib
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from shared_state import SharedState
+
+_NON_DIGIT = re.compile(r"\D")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+# Dropped from the end of company names, so "Acme Corp." and "ACME Corporation" are one company
+_LEGAL_SUFFIXES = frozenset({"inc", "incorporated", "llc", "llp", "ltd", "limited", "corp", "corporation", "co",
+                             "company", "gmbh", "plc", "sa", "ag", "bv", "pty", "srl", "group", "holdings"})
+_GMAIL_DOMAINS = ("gmail.com", "googlemail.com")
+
+
+def normalize_email(email: str) -> Optional[str]:
+    """Lowercased address without a +tag (and without dots for Gmail), None if it is not an address"""
+    local, at, domain = (email or "").strip().lower().rpartition("@")
+    if not at or not local or "." not in domain:
+        return None
+    local = local.split("+", 1)[0]
+    if domain in _GMAIL_DOMAINS:
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}"
+
+
+def normalize_phone(phone: str) -> Optional[str]:
+    """Digits only, compared on the last 10 so "+1 (555) 010-0199" and "555.010.0199" match; None if too short"""
+    digits = _NON_DIGIT.sub("", phone or "")
+    if len(digits) < 7:
+        return None
+    return digits[-10:]
+
+
+def normalize_company(company: str) -> str:
+    """Lowercase, no punctuation, no legal form ("Inc", "GmbH", ...) and no leading "the" """
+    words = _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", (company or "").lower())).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    while len(words) > 1 and words[-1] in _LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def _trigrams(company_key: str) -> FrozenSet[str]:
+    padded = f"  {company_key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def company_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the character trigrams of two normalized company names"""
+    if a == b:
+        return 1.0
+    ta, tb = _trigrams(a), _trigrams(b)
+    return len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+
+
+class Lead(NamedTuple):
+    id: str
+    name: str
+    email: str
+    phone: str
+    company: str
+    # Normalized keys of every address and number the lead has used
+    emails: Tuple[str, ...]
+    phones: Tuple[str, ...]
+    # (slot, rep) of each booking
+    bookings: Tuple[Tuple[str, str], ...]
+    submissions: int
+    first_seen: str
+    last_seen: str
+    message: str = ""
+
+
+class LeadRegistry:
+    """One record per prospect across all bookings, found by email, phone or company in constant time.
+
+    Submissions are matched to an existing lead by normalized email, or by
+    normalized phone when the name agrees as well (or, without an email, the
+    company fuzzily does), since a switchboard number is shared by a whole
+    office. A match is merged into the lead; anything else starts a new one.
+    The indexes are plain dicts rebuilt from the booking log at startup. With
+    a shared state each recorded submission is broadcast, so every worker's
+    registry stays complete.
+    """
+
+    def __init__(self, company_similarity: float = 0.7, shared_state: Optional[SharedState] = None,
+                 max_company_postings: int = 1000):
+        self.company_similarity = company_similarity
+        self.shared_state = shared_state
+        # Trigrams shared by more companies than this carry no signal and are skipped in fuzzy lookups
+        self.max_company_postings = max_company_postings
+        self._lock = threading.Lock()
+        self._leads: Dict[str, Lead] = {}
+        self._by_email: Dict[str, str] = {}
+        self._by_phone: Dict[str, Set[str]] = defaultdict(set)
+        self._by_company: Dict[str, Set[str]] = defaultdict(set)
+        # trigram -> normalized company names, for fuzzy company lookups
+        self._company_trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self.merged = 0
+        if shared_state is not None:
+            shared_state.subscribe(self._on_remote_change)
+
+    def load(self, bookings: Iterable[Dict[str, Any]]) -> int:
+        """Rebuild the indexes from stored booking records, oldest first; returns the number of leads"""
+        for booking in bookings:
+            self._record(booking)
+        return len(self._leads)
+
+    def record(self, details: Dict[str, Any]) -> Optional[Tuple[Lead, bool]]:
+        """Merge one submission (name, email, phone, company, selected_slot, rep, message) into the registry.
+
+        Returns the lead and whether it already existed, or None when the
+        submission has neither a usable email nor phone.
+        """
+        # Stamped here so every worker's copy of the lead agrees on when it was seen
+        details = dict(details, timestamp=details.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        recorded = self._record(details)
+        if recorded is not None and self.shared_state is not None and self.shared_state.distributed:
+            self.shared_state.publish({"kind": "lead", "details": details})
+        return recorded
+
+    def _on_remote_change(self, event: dict):
+        if event.get("kind") == "lead":
+            self._record(event["details"])
+
+    def _match(self, email_key: Optional[str], phone_key: Optional[str], company_key: str,
+               name: str) -> Optional[str]:
+        if email_key is not None and email_key in self._by_email:
+            return self._by_email[email_key]
+        if phone_key is None:
+            return None
+        # A new address with a known number is the same person only if the name agrees; a submission
+        # without an address also matches on the company
+        for lead_id in sorted(self._by_phone.get(phone_key, ())):
+            lead = self._leads[lead_id]
+            if name and _normalize_name(name) == _normalize_name(lead.name):
+                return lead_id
+            if (email_key is None and company_key
+                    and company_similarity(company_key, normalize_company(lead.company)) >= self.company_similarity):
+                return lead_id
+        return None
+
+    def _record(self, details: Dict[str, Any]) -> Optional[Tuple[Lead, bool]]:
+        email, phone = details.get("email") or "", details.get("phone") or ""
+        email_key, phone_key = normalize_email(email), normalize_phone(phone)
+        if email_key is None and phone_key is None:
+            return None
+        name, company = details.get("name") or "", details.get("company") or ""
+        company_key = normalize_company(company)
+        seen = details.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        slot = details.get("selected_slot") or details.get("slot")
+        booking = (slot, details.get("rep") or "default") if slot else None
+        message = details.get("message") or ""
+
+        with self._lock:
+            lead_id = self._match(email_key, phone_key, company_key, name)
+            existing = self._leads.get(lead_id) if lead_id is not None else None
+            if existing is None:
+                # Stable across restarts: replaying the same bookings gives the same ids
+                lead_id = base_id = "lead_" + hashlib.sha256((email_key or phone_key).encode("utf-8")).hexdigest()[:12]
+                while lead_id in self._leads:
+                    # Someone else already came with this number
+                    lead_id = f"{base_id}-{len(self._leads)}"
+                lead = Lead(lead_id, name, email, phone, company, (), (), (), 0, seen, seen)
+            else:
+                self.merged += 1
+                if company_key and existing.company and normalize_company(existing.company) != company_key:
+                    self._unindex_company(lead_id, normalize_company(existing.company))
+                # The latest submission's contact details win, earlier addresses and numbers keep matching
+                lead = existing._replace(name=name or existing.name, email=email or existing.email,
+                                         phone=phone or existing.phone, company=company or existing.company)
+            lead = lead._replace(
+                emails=lead.emails + ((email_key,) if email_key and email_key not in lead.emails else ()),
+                phones=lead.phones + ((phone_key,) if phone_key and phone_key not in lead.phones else ()),
+                bookings=lead.bookings + ((booking,) if booking and booking not in lead.bookings else ()),
+                submissions=lead.submissions + 1,
+                last_seen=seen,
+                message=message or lead.message,
+            )
+            self._leads[lead_id] = lead
+            if email_key:
+                self._by_email[email_key] = lead_id
+            if phone_key:
+                self._by_phone[phone_key].add(lead_id)
+            if company_key:
+                self._index_company(lead_id, company_key)
+        return lead, existing is not None
+
+    def _index_company(self, lead_id: str, company_key: str):
+        if not self._by_company[company_key]:
+            for trigram in _trigrams(company_key):
+                self._company_trigrams[trigram].add(company_key)
+        self._by_company[company_key].add(lead_id)
+
+    def _unindex_company(self, lead_id: str, company_key: str):
+        ids = self._by_company.get(company_key)
+        if ids is None:
+            return
+        ids.discard(lead_id)
+        if not ids:
+            del self._by_company[company_key]
+            for trigram in _trigrams(company_key):
+                self._company_trigrams[trigram].discard(company_key)
+
+    def get(self, lead_id: str) -> Optional[Lead]:
+        return self._leads.get(lead_id)
+
+    def find(self, email: Optional[str] = None, phone: Optional[str] = None) -> List[Lead]:
+        """Leads with this email or phone (normalized first); a phone can belong to several people"""
+        with self._lock:
+            ids: List[str] = []
+            email_key = normalize_email(email) if email else None
+            if email_key and email_key in self._by_email:
+                ids.append(self._by_email[email_key])
+            phone_key = normalize_phone(phone) if phone else None
+            if phone_key:
+                ids.extend(lead_id for lead_id in sorted(self._by_phone.get(phone_key, ())) if lead_id not in ids)
+            return [self._leads[lead_id] for lead_id in ids]
+
+    def by_company(self, company: str, limit: int = 50) -> List[Lead]:
+        """Leads of a company: exact normalized name first, then similar names (typos, word order), best first"""
+        company_key = normalize_company(company)
+        if not company_key:
+            return []
+        with self._lock:
+            ranked = [(1.0, company_key)] if company_key in self._by_company else []
+            if len(self._by_company.get(company_key, ())) < limit:
+                shared: Dict[str, int] = defaultdict(int)
+                for trigram in _trigrams(company_key):
+                    postings = self._company_trigrams.get(trigram, ())
+                    if len(postings) <= self.max_company_postings:
+                        for candidate in postings:
+                            shared[candidate] += 1
+                size = len(_trigrams(company_key))
+                for candidate, overlap in shared.items():
+                    if candidate == company_key:
+                        continue
+                    similarity = overlap / (size + len(_trigrams(candidate)) - overlap)
+                    if similarity >= self.company_similarity:
+                        ranked.append((similarity, candidate))
+                ranked.sort(reverse=True)
+            leads = []
+            for _similarity, candidate in ranked:
+                leads.extend(self._leads[lead_id] for lead_id in sorted(self._by_company[candidate]))
+                if len(leads) >= limit:
+                    break
+            return leads[:limit]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leads": len(self._leads),
+            "emails": len(self._by_email),
+            "phones": len(self._by_phone),
+            "companies": len(self._by_company),
+            "merged_submissions": self.merged,
+        }
@@ -0,0 +1,179 @@
+import math
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+# Counted cues, matched against the visitor's message in a single pass (group name = feature)
+CUES = {
+    "meeting_intent": r"book|schedul\w*|meet(?:ing)?|call|demo|consultation|talk to|appointment",
+    "buying_intent": r"pric\w*|quote|cost\w*|proposal|estimate|hire|hiring|outsourc\w*|build (?:us|me|an?)|need (?:an?|some)|"
+                     r"looking for|interested in|partner(?:ship)?|contract",
+    "budget": r"budget\w*|invest\w*|spend|afford|funding|funded",
+    "timeline": r"asap|urgent\w*|deadline|right away|this (?:week|month|quarter)|next (?:week|month)|launch\w*|"
+                r"by (?:q[1-4]|january|february|march|april|may|june|july|august|september|october|november|december)",
+    "decision_maker": r"ceo|cto|cfo|coo|founder|co-founder|owner|vp|director|head of|president|managing partner|i decide",
+    "negative": r"just (?:browsing|looking|curious)|student|homework|not interested|no budget|job (?:opening|application)|"
+                r"internship|unsubscribe|spam|free of charge",
+}
+_SIZE_WORDS = {"enterprise": 1000, "corporation": 500, "mid-size": 200, "midsize": 200, "startup": 10, "solo": 1,
+               "freelancer": 1}
+_CUE = re.compile(
+    r"\b(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in CUES.items())
+    + r"|(?P<size_word>" + "|".join(_SIZE_WORDS) + r"))\b"
+)
+_DIGIT = re.compile(r"\d")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+_BUDGET_AMOUNT = re.compile(r"(?:\$\s?|usd\s?)(\d[\d,]*(?:\.\d+)?)\s?([km])?\b|\b(\d[\d,]*(?:\.\d+)?)\s?([km])?\s?(?:usd|dollars)\b")
+_COMPANY_SIZE = re.compile(
+    r"\b(\d[\d,]*)\+?\s*(?:employees|people|staff|engineers|developers|person|member)\b|\bteam of (\d[\d,]*)\b"
+)
+# Phrase in the bot's own reply when the calendar was shown; bookings are marked by the BookingService hook
+_CALENDAR_SHOWN = "Showed the meeting calendar"
+_MULTIPLIERS = {"k": 1_000, "m": 1_000_000, None: 1, "": 1}
+
+
+def _number(value: str, suffix: Optional[str] = None) -> float:
+    return float(value.replace(",", "")) * _MULTIPLIERS[suffix]
+
+
+class LeadFeatures:
+    """Running feature vector of one conversation, updated a turn at a time"""
+
+    __slots__ = ("turns", "meeting_intent", "buying_intent", "budget", "timeline", "decision_maker", "negative",
+                 "budget_amount", "company_size", "contact_shared", "calendar_shown", "booked", "score")
+
+    COUNTS = ("turns", "meeting_intent", "buying_intent", "budget", "timeline", "decision_maker", "negative")
+
+    def __init__(self):
+        for name in self.COUNTS:
+            setattr(self, name, 0)
+        # Largest figures mentioned so far, 0 when never mentioned
+        self.budget_amount = 0.0
+        self.company_size = 0
+        self.contact_shared = False
+        self.calendar_shown = False
+        self.booked = False
+        self.score = 0.0
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, fields: dict) -> "LeadFeatures":
+        features = cls()
+        for name, value in fields.items():
+            if name in cls.__slots__:
+                setattr(features, name, value)
+        return features
+
+
+class LeadScorer:
+    """Rule-based lead qualification, cheap enough to run after every chat turn.
+
+    Each turn only scans the new messages, in one regex pass, and adds to
+    the thread's feature vector, so the cost does not grow with the
+    conversation (about 60 microseconds per turn in bench_micro.py, session
+    update included). The score is a weighted sum of the features, with
+    repeated cues capped so one enthusiastic message cannot make a lead hot,
+    saturating towards 100. A booking is not read from the text: the
+    BookingService hook marks it with mark_booked. Change WEIGHTS or the cues and run a bulk
+    re-score to apply them to stored conversations.
+    """
+
+    WEIGHTS = {
+        "meeting_intent": 8.0,
+        "buying_intent": 10.0,
+        "budget": 8.0,
+        "timeline": 8.0,
+        "decision_maker": 12.0,
+        "negative": -20.0,
+        "engagement": 3.0,
+        "contact_shared": 12.0,
+        "calendar_shown": 5.0,
+        "booked": 30.0,
+        "budget_amount": 10.0,
+        "company_size": 8.0,
+    }
+    # Repeats of a cue stop counting after this many
+    CUE_CAP = 2
+    ENGAGEMENT_CAP = 5
+    HOT = 70.0
+    WARM = 40.0
+
+    # Raw total that maps to about 63: a booked lead who shared contact details lands around 70 (hot)
+    SCALE = 66.0
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = dict(self.WEIGHTS, **(weights or {}))
+
+    def update(self, features: LeadFeatures, user_message: str, bot_message: str = "") -> float:
+        """Fold one exchange into the features and return the new score"""
+        text = user_message.lower()
+        features.turns += 1
+        for match in _CUE.finditer(text):
+            name = match.lastgroup
+            if name == "size_word":
+                features.company_size = max(features.company_size, _SIZE_WORDS[match.group(0)])
+            else:
+                setattr(features, name, getattr(features, name) + 1)
+        # The figure patterns only run when the message can contain a match
+        if "$" in text or "usd" in text or "dollar" in text:
+            features.budget += text.count("$")
+            for match in _BUDGET_AMOUNT.finditer(text):
+                amount = _number(match.group(1), match.group(2)) if match.group(1) else _number(match.group(3), match.group(4))
+                features.budget_amount = max(features.budget_amount, amount)
+        if _DIGIT.search(text):
+            for match in _COMPANY_SIZE.finditer(text):
+                features.company_size = max(features.company_size, int(_number(match.group(1) or match.group(2))))
+            if not features.contact_shared and _PHONE.search(text):
+                features.contact_shared = True
+        if not features.contact_shared and "@" in text and _EMAIL.search(text):
+            features.contact_shared = True
+        if _CALENDAR_SHOWN in bot_message:
+            features.calendar_shown = True
+        features.score = self.score(features)
+        return features.score
+
+    def mark_booked(self, features: LeadFeatures) -> float:
+        """Record that the conversation's visitor booked a meeting and return the new score"""
+        features.booked = True
+        features.score = self.score(features)
+        return features.score
+
+    def score(self, features: LeadFeatures) -> float:
+        w = self.weights
+        total = sum(w[name] * min(getattr(features, name), self.CUE_CAP) for name in CUES)
+        total += w["engagement"] * min(features.turns, self.ENGAGEMENT_CAP)
+        total += w["contact_shared"] * features.contact_shared
+        total += w["calendar_shown"] * features.calendar_shown
+        total += w["booked"] * features.booked
+        # Size and budget count in steps: a five-figure budget or a 50+ person company is a strong signal
+        if features.budget_amount:
+            total += w["budget_amount"] * (1.0 if features.budget_amount >= 10_000 else 0.5)
+        if features.company_size:
+            total += w["company_size"] * (1.0 if features.company_size >= 50 else 0.5)
+        return round(100.0 * (1.0 - math.exp(-max(total, 0.0) / self.SCALE)), 1)
+
+    def tier(self, score: float) -> str:
+        if score >= self.HOT:
+            return "hot"
+        if score >= self.WARM:
+            return "warm"
+        return "cold"
+
+    def rescore(self, features: LeadFeatures, exchanges: Iterable[Tuple[str, str]]) -> LeadFeatures:
+        """Features re-extracted from a conversation's stored (user, assistant) exchanges.
+
+        Sessions keep only their recent turns verbatim, so facts the text no
+        longer shows (the turn count, a calendar shown in a turn folded into
+        the summary) are carried over from the old features, as is the
+        booking, which never comes from the text.
+        """
+        rebuilt = LeadFeatures()
+        for user_message, bot_message in exchanges:
+            self.update(rebuilt, user_message, bot_message)
+        rebuilt.turns = max(rebuilt.turns, features.turns)
+        rebuilt.calendar_shown = rebuilt.calendar_shown or features.calendar_shown
+        rebuilt.booked = features.booked
+        rebuilt.score = self.score(rebuilt)
+        return rebuilt
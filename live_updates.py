@@ -0,0 +1,76 @@
+import asyncio
+import json
+import threading
+from typing import Dict, Optional, Set
+
+from metrics import REGISTRY
+
+LIVE_MESSAGES = REGISTRY.counter("chatbot_live_messages_total", "Slot update messages queued for connected widgets")
+LIVE_RESYNCS = REGISTRY.counter("chatbot_live_resyncs_total", "Widgets that fell behind and were sent a full resync")
+
+# Queued instead of a delta when a client fell behind: send it the full state again
+RESYNC = None
+
+
+class SlotEventHub:
+    """Fans slot availability changes out to every connected calendar widget.
+
+    Changes may come from any thread (booking endpoints, agent tools, the
+    shared-state listener). They are coalesced for batch_interval seconds,
+    encoded once and queued to each client, so a burst of bookings costs one
+    JSON encode and one small message per tab. A tab whose queue is full is
+    not waited on: its backlog is dropped and it gets a resync instead.
+    """
+
+    def __init__(self, batch_interval: float = 0.05, queue_size: int = 32):
+        self.batch_interval = batch_interval
+        self.queue_size = queue_size
+        self._clients: Set[asyncio.Queue] = set()
+        self._lock = threading.Lock()
+        # slot -> still bookable, latest change wins
+        self._pending: Dict[str, bool] = {}
+        self._flush_scheduled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Event loop the client queues live on, set at startup"""
+        self._loop = loop
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(self.queue_size)
+        self._clients.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._clients.discard(queue)
+
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def publish(self, slot: str, available: bool):
+        """Record a change; safe to call from any thread"""
+        if self._loop is None or not self._clients:
+            return
+        with self._lock:
+            self._pending[slot] = available
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._loop.call_soon_threadsafe(self._loop.call_later, self.batch_interval, self._flush)
+
+    def _flush(self):
+        with self._lock:
+            changes, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        if not changes:
+            return
+        message = json.dumps({"type": "slots", "changes": [[slot, available] for slot, available in changes.items()]})
+        for queue in list(self._clients):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                LIVE_RESYNCS.inc()
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+        LIVE_MESSAGES.inc(len(self._clients))
@@ -0,0 +1,476 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, List, NamedTuple, Optional, Sequence, Tuple
+
+from metrics import REGISTRY, log_event
+from sessions import estimate_tokens
+
+LLM_ATTEMPTS = REGISTRY.counter("chatbot_llm_attempts_total", "Provider calls made by the LLM gateway", ["client", "outcome"])
+LLM_RETRIES = REGISTRY.counter("chatbot_llm_retries_total", "LLM calls retried after a failure", ["error"])
+LLM_HEDGES = REGISTRY.counter("chatbot_llm_hedges_total", "Hedged duplicate LLM requests", ["outcome"])
+LLM_FALLBACKS = REGISTRY.counter("chatbot_llm_fallbacks_total", "Calls answered by the fallback path", ["reason"])
+LLM_BREAKER_TRIPS = REGISTRY.counter("chatbot_llm_breaker_trips_total", "Times the LLM circuit breaker opened")
+LLM_RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "chatbot_llm_rate_limit_wait_seconds",
+    "Time spent waiting for the LLM quota token bucket",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+def default_non_retryable() -> Tuple[type, ...]:
+    """Client-side errors: retrying (or tripping the breaker) cannot help.
+
+    Resolved on the first failure, so start-up does not import google.api_core.
+    """
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        ValueError,
+        TypeError,
+        google_exceptions.InvalidArgument,
+        google_exceptions.PermissionDenied,
+        google_exceptions.Unauthenticated,
+        google_exceptions.NotFound,
+    )
+
+
+class LLMUnavailableError(Exception):
+    """The provider is degraded (breaker open or retries exhausted) and no fallback client answered"""
+
+
+class TokenBucket:
+    """Classic token bucket: refills at rate per second up to capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount tokens are available (0 if they are now)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # Never ask for more than a full bucket, or the request could wait forever
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+
+class QuotaLimiter:
+    """Requests-per-minute and tokens-per-minute buckets matched to the provider quota (0 disables one)"""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self._lock = threading.Lock()
+        self._buckets = []
+        if requests_per_minute:
+            self._buckets.append(("requests", TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60))))
+        if tokens_per_minute:
+            # A second's worth of burst, but always room for one large prompt
+            self._buckets.append(("tokens", TokenBucket(tokens_per_minute / 60, max(8192.0, tokens_per_minute / 60))))
+
+    def try_acquire(self, tokens: int) -> float:
+        """Take one request and its tokens if all buckets allow, else return the wait in seconds"""
+        with self._lock:
+            costs = [(bucket, 1 if kind == "requests" else tokens) for kind, bucket in self._buckets]
+            wait = max((bucket.wait_time(cost) for bucket, cost in costs), default=0.0)
+            if wait == 0:
+                for bucket, cost in costs:
+                    bucket.tokens -= min(cost, bucket.capacity)
+            return wait
+
+    async def acquire(self, tokens: int):
+        start = time.perf_counter()
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                break
+            await asyncio.sleep(wait)
+        LLM_RATE_LIMIT_WAIT.observe(time.perf_counter() - start)
+
+    def acquire_sync(self, tokens: int):
+        start = time.perf_counter()
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                break
+            time.sleep(wait)
+        LLM_RATE_LIMIT_WAIT.observe(time.perf_counter() - start)
+
+
+class BreakerPermit(NamedTuple):
+    """Granted by CircuitBreaker.allow(); probe numbers the half-open probe it holds, 0 for an ordinary call"""
+    probe: int = 0
+
+
+_CALL = BreakerPermit()
+
+
+class CircuitBreaker:
+    """Opens when, within window_seconds, at least failure_threshold calls failed and they are
+    failure_ratio of all calls; after recovery_seconds a single probe call may close it again"""
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_threshold: int = 5, failure_ratio: float = 0.5, window_seconds: float = 30,
+                 recovery_seconds: float = 20):
+        self.failure_threshold = failure_threshold
+        self.failure_ratio = failure_ratio
+        self.window_seconds = window_seconds
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self._lock = threading.Lock()
+        # (timestamp, failed) of recent calls
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._probes = 0
+
+    def allow(self) -> Optional[BreakerPermit]:
+        """Permit for one call, None while open; a call ending without a verdict hands it back to release()"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return _CALL
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self._opened_at >= self.recovery_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # A probe that never reported back (e.g. its thread hung) is given up after recovery_seconds
+            if self.state == self.HALF_OPEN and (not self._probe_in_flight
+                                                 or now - self._probe_started >= self.recovery_seconds):
+                # Let a single probe through to test the provider
+                self._probe_in_flight = True
+                self._probe_started = now
+                self._probes += 1
+                return BreakerPermit(self._probes)
+            return None
+
+    def release(self, permit: Optional[BreakerPermit]):
+        """A call ended without a verdict (cancelled, or a client error); if it held the probe, another may go"""
+        if permit is None or not permit.probe:
+            return
+        with self._lock:
+            if self.state == self.HALF_OPEN and permit.probe == self._probes:
+                self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                self._reset()
+            self._record(time.monotonic(), False)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self._open(now)
+                return
+            self._record(now, True)
+            if (self.state == self.CLOSED and self._failures >= self.failure_threshold
+                    and self._failures >= self.failure_ratio * len(self._calls)):
+                self._open(now)
+
+    def _record(self, now: float, failed: bool):
+        self._calls.append((now, failed))
+        self._failures += failed
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._failures -= self._calls.popleft()[1]
+
+    def _reset(self):
+        self._calls.clear()
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._reset()
+        LLM_BREAKER_TRIPS.inc()
+        log_event("llm_breaker_open", level=logging.WARNING, sample_rate=1.0)
+
+    def state_value(self) -> int:
+        return {self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[self.state]
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to pick the hedging deadline"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _error_name(error: BaseException) -> str:
+    return "timeout" if isinstance(error, asyncio.TimeoutError) else type(error).__name__
+
+
+class LLMGateway:
+    """Resilient front for the chat model clients, with the same invoke/ainvoke/astream interface.
+
+    Calls go round-robin over a pool of clients, wait for the quota limiter,
+    time out after timeout_seconds (sync calls run on a pool of
+    sync_workers threads, so a hung provider cannot pin the caller's
+    thread) and are retried with exponential backoff
+    and full jitter. An async call still running past the observed p95
+    latency gets a hedged duplicate on the next client; the first answer
+    wins. A circuit breaker stops calling a degraded provider and sends
+    traffic to the fallback client (e.g. a cheaper model), or raises
+    LLMUnavailableError so the agent can answer without the LLM.
+
+    Without clients, the loader builds them (clients, fallback_client) on
+    the first call or an explicit load(), which keeps the provider SDK
+    import out of the worker's start-up.
+    """
+
+    def __init__(self, clients: Sequence = (), fallback_client=None, limiter: Optional[QuotaLimiter] = None,
+                 breaker: Optional[CircuitBreaker] = None, max_retries: int = 2, backoff_base: float = 0.5,
+                 backoff_max: float = 8.0, timeout_seconds: float = 15.0, hedge: bool = True,
+                 hedge_percentile: float = 95, hedge_min_delay: float = 0.5,
+                 non_retryable: Optional[Sequence[type]] = None,
+                 loader: Optional[Callable[[], Tuple[Sequence, Any]]] = None, sync_workers: int = 32):
+        if not clients and loader is None:
+            raise ValueError("LLMGateway needs at least one client or a loader")
+        self.clients: List = list(clients)
+        self.loader = loader
+        self._load_lock = threading.Lock()
+        self.fallback_client = fallback_client
+        self.limiter = limiter or QuotaLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout_seconds = timeout_seconds
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        # None: default_non_retryable() on the first failure
+        self.non_retryable = tuple(non_retryable) if non_retryable is not None else None
+        self.latency = LatencyTracker()
+        self._next = 0
+        self._sync_pool = ThreadPoolExecutor(max_workers=sync_workers, thread_name_prefix="llm-sync")
+        REGISTRY.gauge_callback("chatbot_llm_breaker_state", "LLM circuit breaker (0 closed, 1 half-open, 2 open)",
+                                self.breaker.state_value)
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.clients)
+
+    def load(self):
+        """Build the clients with the loader, once; concurrent callers wait for the first"""
+        with self._load_lock:
+            if self.clients:
+                return
+            clients, fallback_client = self.loader()
+            if self.fallback_client is None:
+                self.fallback_client = fallback_client
+            self.clients = list(clients)
+
+    async def aload(self):
+        if not self.clients:
+            await asyncio.to_thread(self.load)
+
+    # Helpers
+    def _pick(self):
+        idx = self._next % len(self.clients)
+        self._next += 1
+        return idx, self.clients[idx]
+
+    @staticmethod
+    def _cost(prompt) -> int:
+        return estimate_tokens(prompt if isinstance(prompt, str) else json.dumps(prompt, default=str))
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying workers from synchronising on the provider
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p = self.latency.percentile(self.hedge_percentile)
+        return None if p is None else max(self.hedge_min_delay, p)
+
+    def _retry_permit(self, error: BaseException, attempt: int) -> Optional[BreakerPermit]:
+        """Record a failed attempt, the permit for a retry or None; client errors are re-raised as they are"""
+        if self.non_retryable is None:
+            self.non_retryable = default_non_retryable()
+        if isinstance(error, self.non_retryable):
+            raise error
+        self.breaker.record_failure()
+        permit = self.breaker.allow() if attempt < self.max_retries else None
+        if permit is not None:
+            LLM_RETRIES.inc(error=_error_name(error))
+            return permit
+        log_event("llm_gateway_error", level=logging.ERROR, sample_rate=1.0, error=_error_name(error),
+                  attempts=attempt + 1)
+        return None
+
+    # Async path
+    async def _acall(self, idx: int, client, prompt):
+        start = time.perf_counter()
+        try:
+            response = await client.ainvoke(prompt)
+        except Exception:
+            LLM_ATTEMPTS.inc(client=idx, outcome="error")
+            raise
+        self.latency.observe(time.perf_counter() - start)
+        LLM_ATTEMPTS.inc(client=idx, outcome="ok")
+        return response
+
+    async def _hedged(self, prompt, cost: int):
+        primary = asyncio.ensure_future(self._acall(*self._pick(), prompt))
+        pending = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                # Only hedge when the quota has room, a duplicate must never push us into throttling
+                if not done and self.limiter.try_acquire(cost) == 0:
+                    LLM_HEDGES.inc(outcome="launched")
+                    pending.add(asyncio.ensure_future(self._acall(*self._pick(), prompt)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            LLM_HEDGES.inc(outcome="won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _afallback(self, prompt, reason: str):
+        LLM_FALLBACKS.inc(reason=reason)
+        if self.fallback_client is None:
+            raise LLMUnavailableError(reason)
+        try:
+            return await asyncio.wait_for(self.fallback_client.ainvoke(prompt), self.timeout_seconds)
+        except Exception as e:
+            raise LLMUnavailableError(f"{reason}, fallback failed: {e}") from e
+
+    async def ainvoke(self, prompt, **kwargs):
+        await self.aload()
+        permit = self.breaker.allow()
+        if permit is None:
+            return await self._afallback(prompt, "breaker_open")
+        cost = self._cost(prompt)
+        attempt = 0
+        try:
+            while True:
+                await self.limiter.acquire(cost)
+                try:
+                    response = await asyncio.wait_for(self._hedged(prompt, cost), self.timeout_seconds)
+                    self.breaker.record_success()
+                    return response
+                except Exception as e:
+                    permit = self._retry_permit(e, attempt)
+                    if permit is None:
+                        return await self._afallback(prompt, "exhausted")
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+        finally:
+            # Cancelled (turn deadline, client gone) or a re-raised client error: never leave a probe in flight
+            self.breaker.release(permit)
+
+    async def astream(self, prompt, **kwargs):
+        """Stream from one client; retried only while nothing has been yielded yet"""
+        await self.aload()
+        permit = self.breaker.allow()
+        if permit is None:
+            yield await self._afallback(prompt, "breaker_open")
+            return
+        cost = self._cost(prompt)
+        attempt = 0
+        try:
+            while True:
+                await self.limiter.acquire(cost)
+                idx, client = self._pick()
+                started = False
+                try:
+                    async for chunk in client.astream(prompt):
+                        started = True
+                        yield chunk
+                    LLM_ATTEMPTS.inc(client=idx, outcome="ok")
+                    self.breaker.record_success()
+                    return
+                except Exception as e:
+                    LLM_ATTEMPTS.inc(client=idx, outcome="error")
+                    if started:
+                        # Half an answer is already out, a retry would repeat it
+                        self.breaker.record_failure()
+                        raise
+                    permit = self._retry_permit(e, attempt)
+                    if permit is None:
+                        yield await self._afallback(prompt, "exhausted")
+                        return
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+        finally:
+            # Also runs when the reader stops early (SSE client disconnected)
+            self.breaker.release(permit)
+
+    # Sync path (no hedging: a blocked thread cannot be raced)
+    def invoke(self, prompt, **kwargs):
+        if not self.clients:
+            self.load()
+        permit = self.breaker.allow()
+        if permit is None:
+            return self._fallback(prompt, "breaker_open")
+        cost = self._cost(prompt)
+        attempt = 0
+        try:
+            while True:
+                self.limiter.acquire_sync(cost)
+                idx, client = self._pick()
+                try:
+                    response = self._call_sync(client, prompt)
+                    LLM_ATTEMPTS.inc(client=idx, outcome="ok")
+                    self.breaker.record_success()
+                    return response
+                except Exception as e:
+                    LLM_ATTEMPTS.inc(client=idx, outcome="error")
+                    permit = self._retry_permit(e, attempt)
+                    if permit is None:
+                        return self._fallback(prompt, "exhausted")
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+        finally:
+            self.breaker.release(permit)
+
+    def _call_sync(self, client, prompt):
+        # A call still running at the timeout is left to its pool thread; the caller gets a TimeoutError
+        future = self._sync_pool.submit(client.invoke, prompt)
+        try:
+            return future.result(timeout=self.timeout_seconds)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def _fallback(self, prompt, reason: str):
+        LLM_FALLBACKS.inc(reason=reason)
+        if self.fallback_client is None:
+            raise LLMUnavailableError(reason)
+        try:
+            return self._call_sync(self.fallback_client, prompt)
+        except Exception as e:
+            raise LLMUnavailableError(f"{reason}, fallback failed: {e}") from e
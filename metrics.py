@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            state[idx] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(_label_key(self.labelnames, labels))
+            return int(sum(state[:-1])) if state else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += state[len(self.buckets)]
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackGauge:
+    """Gauge read from a callback at scrape time, e.g. cache sizes owned by other components.
+
+    A callback returning None has nothing to report and the gauge is left out of the scrape.
+    """
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, callback: Callable[[], float]) -> CallbackGauge:
+        with self._lock:
+            # Callbacks are replaced, so a re-created component reports its own state
+            gauge = self._metrics[name] = CallbackGauge(name, documentation, callback)
+            return gauge
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Chat pipeline instrumentation shared across modules
+STAGE_SECONDS = REGISTRY.histogram(
+    "chatbot_stage_seconds",
+    "Latency of each chat pipeline stage",
+    ["stage"],
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "chatbot_http_request_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+)
+LLM_REQUESTS = REGISTRY.counter("chatbot_llm_requests_total", "LLM calls made", ["mode"])
+LLM_ERRORS = REGISTRY.counter("chatbot_llm_errors_total", "LLM calls that raised", ["mode"])
+LLM_TOKENS = REGISTRY.counter(
+    "chatbot_llm_tokens_total",
+    "Estimated LLM tokens (prompt ~ chars/4)",
+    ["direction"],
+)
+TOOL_CALLS = REGISTRY.counter("chatbot_tool_calls_total", "Agent tool executions", ["tool"])
+PARSE_FAILURES = REGISTRY.counter(
+    "chatbot_react_parse_failures_total",
+    "Completions with neither a tool call nor a Final Answer",
+    ["agent"],
+)
+REACT_STEPS = REGISTRY.histogram(
+    "chatbot_react_steps",
+    "LLM calls made per ReAct turn",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10),
+)
+REACT_LIMITS = REGISTRY.counter(
+    "chatbot_react_limits_total",
+    "ReAct turns cut short by the step, token or deadline budget",
+    ["limit"],
+)
+TOOL_MEMO_HITS = REGISTRY.counter(
+    "chatbot_tool_memo_hits_total",
+    "Repeated tool calls answered from the per-turn memo",
+    ["tool"],
+)
+
+
+def stage_timer(stage: str):
+    """Context manager timing one pipeline stage"""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+# Structured, sampled logging
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+logger = logging.getLogger("leadbot")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, sample_rate: Optional[float] = None, **fields):
+    """Emit one JSON log line; debug-style events are sampled to keep logging off the hot path"""
+    rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate < 1.0 and random.random() >= rate:
+        return
+    if not logger.isEnabledFor(level):
+        return
+    record = {"ts": round(time.time(), 3), "event": event}
+    record.update(fields)
+    logger.log(level, json.dumps(record, default=str))
@@ -0,0 +1,150 @@
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+# Mersenne prime used for the MinHash permutations
+_PRIME = (1 << 61) - 1
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", message.lower())).strip()
+
+
+def shingles(normalized: str) -> FrozenSet[str]:
+    """Word unigrams and bigrams of a normalized message"""
+    words = normalized.split()
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+class _Entry:
+    __slots__ = ("answer", "shingles", "signature", "expires_at")
+
+    def __init__(self, answer: str, shingle_set: FrozenSet[str], signature: Tuple[int, ...], expires_at: float):
+        self.answer = answer
+        self.shingles = shingle_set
+        self.signature = signature
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Answer cache for repeated visitor questions, with near-duplicate matching.
+
+    Exact matches are looked up by normalized text. Near-duplicates are found
+    through a MinHash/LSH index over word shingles and confirmed with the real
+    Jaccard similarity. Entries expire after a TTL and the least recently used
+    ones are evicted once the cache is full.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600,
+                 similarity: float = 0.8, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # (band index, band hash) -> normalized keys
+        self._buckets: Dict[Tuple[int, int], Set[str]] = defaultdict(set)
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _signature(self, shingle_set: FrozenSet[str]) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingle_set] or [0]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    def _bands(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, hash(signature[band * self.rows:(band + 1) * self.rows])
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        for band_key in self._bands(entry.signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _near_match(self, shingle_set: FrozenSet[str], signature: Tuple[int, ...], now: float) -> Optional[str]:
+        candidates: Set[str] = set()
+        for band_key in self._bands(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        best_key, best_score = None, self.similarity
+        for key in candidates:
+            entry = self._entries[key]
+            if entry.expires_at < now:
+                continue
+            union = len(shingle_set | entry.shingles)
+            score = len(shingle_set & entry.shingles) / union if union else 0.0
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def get(self, message: str) -> Optional[str]:
+        """Cached answer for this message or a near-duplicate of it"""
+        key = normalize_message(message)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at < now:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                shingle_set = shingles(key)
+                match = self._near_match(shingle_set, self._signature(shingle_set), now) if shingle_set else None
+                if match is None:
+                    self.misses += 1
+                    return None
+                key, entry = match, self._entries[match]
+                self.near_hits += 1
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.answer
+
+    def put(self, message: str, answer: str):
+        key = normalize_message(message)
+        if not key:
+            return
+        shingle_set = shingles(key)
+        signature = self._signature(shingle_set)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(answer, shingle_set, signature, time.monotonic() + self.ttl_seconds)
+            for band_key in self._bands(signature):
+                self._buckets[band_key].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
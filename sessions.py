@@ -0,0 +1,348 @@
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from lead_scoring import LeadFeatures, LeadScorer
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting"""
+    return len(text) // 4 + 1
+
+
+class Session:
+    __slots__ = ("turns", "summary", "tokens", "size", "last_access", "lead")
+
+    def __init__(self):
+        # (role, text) pairs, oldest first
+        self.turns: Deque[Tuple[str, str]] = deque()
+        self.summary = ""
+        self.tokens = 0
+        self.size = 0
+        self.last_access = time.monotonic()
+        # Lead qualification features, kept up to date turn by turn when scoring is on
+        self.lead: Optional[LeadFeatures] = None
+
+    def to_json(self) -> str:
+        return json.dumps({"turns": list(self.turns), "summary": self.summary, "tokens": self.tokens, "size": self.size,
+                           "lead": self.lead.to_dict() if self.lead is not None else None})
+
+    @classmethod
+    def from_json(cls, data: str) -> "Session":
+        fields = json.loads(data)
+        session = cls()
+        session.turns.extend(tuple(turn) for turn in fields["turns"])
+        session.summary = fields["summary"]
+        session.tokens = fields["tokens"]
+        session.size = fields["size"]
+        if fields.get("lead"):
+            session.lead = LeadFeatures.from_dict(fields["lead"])
+        return session
+
+    def exchanges(self) -> Iterator[Tuple[str, str]]:
+        """(user, assistant) pairs of the remembered conversation, the summary first"""
+        if self.summary:
+            yield self.summary, ""
+        user_message = None
+        for role, text in self.turns:
+            if role == "user":
+                if user_message is not None:
+                    yield user_message, ""
+                user_message = text
+            elif user_message is not None:
+                yield user_message, text
+                user_message = None
+        if user_message is not None:
+            yield user_message, ""
+
+
+class SessionStore:
+    """Per-thread conversation memory with LRU/TTL eviction and bounded size.
+
+    Each session keeps its most recent turns within a token budget. Older
+    turns are folded into a short extractive summary instead of being kept
+    verbatim. The store as a whole is capped by session count and by an
+    approximate memory ceiling, evicting the least recently used threads.
+
+    With a scorer, every turn also updates the thread's lead score, which
+    lives and expires with the session; mark_booked adds a booking made
+    from the thread.
+    """
+
+    # True when reads and writes go over the network to other processes' state
+    distributed = False
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600,
+                 token_budget: int = 800, summary_max_chars: int = 600,
+                 max_memory_bytes: int = 64 * 1024 * 1024, scorer: Optional[LeadScorer] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.token_budget = token_budget
+        self.summary_max_chars = summary_max_chars
+        self.max_memory_bytes = max_memory_bytes
+        self.scorer = scorer
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._memory = 0
+        self.evictions = 0
+
+    def _touch(self, thread_id: str, create: bool) -> Optional[Session]:
+        now = time.monotonic()
+        session = self._sessions.get(thread_id)
+        if session is not None and now - session.last_access > self.ttl_seconds:
+            self._drop(thread_id)
+            session = None
+        if session is None:
+            if not create:
+                return None
+            session = Session()
+            self._sessions[thread_id] = session
+        session.last_access = now
+        self._sessions.move_to_end(thread_id)
+        return session
+
+    def _drop(self, thread_id: str):
+        session = self._sessions.pop(thread_id)
+        self._memory -= session.size + len(session.summary)
+        self.evictions += 1
+
+    def _evict(self):
+        now = time.monotonic()
+        # LRU order means expired sessions are all at the front
+        while self._sessions:
+            thread_id, session = next(iter(self._sessions.items()))
+            if (now - session.last_access > self.ttl_seconds
+                    or len(self._sessions) > self.max_sessions
+                    or self._memory > self.max_memory_bytes):
+                self._drop(thread_id)
+            else:
+                break
+
+    def _compact(self, session: Session):
+        # Fold the oldest turns into the summary until we fit the token budget
+        while session.tokens > self.token_budget and len(session.turns) > 2:
+            role, text = session.turns.popleft()
+            session.tokens -= estimate_tokens(text)
+            session.size -= len(text)
+            if role == "user":
+                snippet = text.strip().split("\n")[0][:120]
+                summary = f"{session.summary} User said: {snippet}".strip()
+                # Keep only the most recent entries of the summary
+                while len(summary) > self.summary_max_chars and "User said:" in summary[1:]:
+                    summary = summary[summary.index("User said:", 1):]
+                session.summary = summary[-self.summary_max_chars:]
+
+    def _append(self, session: Session, user_message: str, bot_message: str):
+        for role, text in (("user", user_message), ("assistant", bot_message)):
+            session.turns.append((role, text))
+            session.tokens += estimate_tokens(text)
+            session.size += len(text)
+        if self.scorer is not None:
+            if session.lead is None:
+                session.lead = LeadFeatures()
+            self.scorer.update(session.lead, user_message, bot_message)
+        self._compact(session)
+
+    def _book(self, session: Session):
+        if session.lead is None:
+            session.lead = LeadFeatures()
+        self.scorer.mark_booked(session.lead)
+
+    def _lead(self, thread_id: str, features: LeadFeatures) -> dict:
+        return {"thread_id": thread_id, "score": features.score, "tier": self.scorer.tier(features.score),
+                "features": features.to_dict()}
+
+    @staticmethod
+    def _render(session: Session) -> str:
+        lines = []
+        if session.summary:
+            lines.append(f"Earlier in this conversation: {session.summary}")
+        for role, text in session.turns:
+            lines.append(f"{'User' if role == 'user' else 'Assistant'}: {text}")
+        return "\n".join(lines)
+
+    def add_turn(self, thread_id: str, user_message: str, bot_message: str):
+        """Record one user/assistant exchange for a thread"""
+        with self._lock:
+            session = self._touch(thread_id, create=True)
+            before = session.size + len(session.summary)
+            self._append(session, user_message, bot_message)
+            self._memory += session.size + len(session.summary) - before
+            self._evict()
+
+    def mark_booked(self, thread_id: str):
+        """Count a booking made from this thread in its lead score (BookingService on_booked hook)"""
+        if self.scorer is None:
+            return
+        with self._lock:
+            self._book(self._touch(thread_id, create=True))
+            self._evict()
+
+    def get_history(self, thread_id: str) -> str:
+        """Render the remembered conversation for a prompt, empty for new threads"""
+        with self._lock:
+            session = self._touch(thread_id, create=False)
+            if session is None:
+                return ""
+            return self._render(session)
+
+    def turn_count(self, thread_id: str) -> int:
+        with self._lock:
+            session = self._sessions.get(thread_id)
+            return len(session.turns) // 2 if session else 0
+
+    def clear(self, thread_id: str):
+        with self._lock:
+            if thread_id in self._sessions:
+                self._drop(thread_id)
+
+    def lead_score(self, thread_id: str) -> Optional[dict]:
+        """Current score, tier and features of a thread's lead"""
+        with self._lock:
+            session = self._sessions.get(thread_id)
+            if session is None or session.lead is None:
+                return None
+            return self._lead(thread_id, session.lead)
+
+    def top_leads(self, limit: int = 50, min_score: float = 0.0) -> List[dict]:
+        """Highest scoring live conversations first"""
+        with self._lock:
+            scored = [(session.lead.score, thread_id, session.lead) for thread_id, session in self._sessions.items()
+                      if session.lead is not None and session.lead.score >= min_score]
+        return [self._lead(thread_id, features) for _score, thread_id, features in heapq.nlargest(limit, scored)]
+
+    def rescore_leads(self) -> int:
+        """Bulk re-score: re-extract every stored conversation's features with the current scorer"""
+        if self.scorer is None:
+            return 0
+        count = 0
+        with self._lock:
+            for session in self._sessions.values():
+                if session.lead is not None:
+                    session.lead = self.scorer.rescore(session.lead, session.exchanges())
+                    count += 1
+        return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "memory_bytes": self._memory,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+class SharedSessionStore(SessionStore):
+    """Session memory kept in the shared state, so any worker can serve any thread.
+
+    Sessions are stored as JSON with the TTL as expiry; eviction and the
+    memory ceiling are left to the backend. Lead scores are also ranked in
+    the shared state so any worker can list the hottest threads.
+    """
+
+    LEADS_KEY = "lead_scores"
+
+    def __init__(self, state, ttl_seconds: float = 3600, token_budget: int = 800, summary_max_chars: int = 600,
+                 scorer: Optional[LeadScorer] = None):
+        super().__init__(ttl_seconds=ttl_seconds, token_budget=token_budget, summary_max_chars=summary_max_chars,
+                         scorer=scorer)
+        self.state = state
+
+    @property
+    def distributed(self) -> bool:
+        return self.state.distributed
+
+    def _load(self, thread_id: str) -> Optional[Session]:
+        data = self.state.get(f"session:{thread_id}")
+        return Session.from_json(data) if data is not None else None
+
+    def add_turn(self, thread_id: str, user_message: str, bot_message: str):
+        def append(data: Optional[str]) -> str:
+            session = Session.from_json(data) if data is not None else Session()
+            self._append(session, user_message, bot_message)
+            return session.to_json()
+
+        # Read-append-write in one transaction: two workers answering the same thread both keep their turn
+        self._rank(thread_id, Session.from_json(self.state.update(f"session:{thread_id}", append,
+                                                                  ttl_seconds=self.ttl_seconds)))
+
+    def mark_booked(self, thread_id: str):
+        if self.scorer is None:
+            return
+
+        def book(data: Optional[str]) -> str:
+            session = Session.from_json(data) if data is not None else Session()
+            self._book(session)
+            return session.to_json()
+
+        self._rank(thread_id, Session.from_json(self.state.update(f"session:{thread_id}", book,
+                                                                  ttl_seconds=self.ttl_seconds)))
+
+    def _rank(self, thread_id: str, session: Session):
+        if session.lead is not None:
+            self.state.rank(self.LEADS_KEY, thread_id, session.lead.score)
+
+    def get_history(self, thread_id: str) -> str:
+        session = self._load(thread_id)
+        return self._render(session) if session is not None else ""
+
+    def turn_count(self, thread_id: str) -> int:
+        session = self._load(thread_id)
+        return len(session.turns) // 2 if session else 0
+
+    def clear(self, thread_id: str):
+        self.state.delete(f"session:{thread_id}")
+        self.state.unrank(self.LEADS_KEY, thread_id)
+
+    def lead_score(self, thread_id: str) -> Optional[dict]:
+        session = self._load(thread_id)
+        if session is None or session.lead is None:
+            return None
+        return self._lead(thread_id, session.lead)
+
+    def top_leads(self, limit: int = 50, min_score: float = 0.0) -> List[dict]:
+        leads = []
+        for thread_id, _score in self.state.top(self.LEADS_KEY, limit, min_score):
+            session = self._load(thread_id)
+            if session is None or session.lead is None:
+                # The session expired; its ranking entry goes too
+                self.state.unrank(self.LEADS_KEY, thread_id)
+                continue
+            leads.append(self._lead(thread_id, session.lead))
+        return leads
+
+    def rescore_leads(self) -> int:
+        if self.scorer is None:
+            return 0
+        count = 0
+        for thread_id, _score in self.state.top(self.LEADS_KEY):
+            if self._load(thread_id) is None:
+                self.state.unrank(self.LEADS_KEY, thread_id)
+                continue
+
+            def rescore(data: Optional[str]) -> str:
+                session = Session.from_json(data) if data is not None else Session()
+                if session.lead is not None:
+                    session.lead = self.scorer.rescore(session.lead, session.exchanges())
+                return session.to_json()
+
+            self._rank(thread_id, Session.from_json(self.state.update(f"session:{thread_id}", rescore,
+                                                                      ttl_seconds=self.ttl_seconds)))
+            count += 1
+        return count
+
+    def stats(self) -> dict:
+        # Counted in the backend; their size is not tracked there (the backend's own memory metrics have it)
+        return {
+            "backend": type(self.state).__name__,
+            "sessions": self.state.count("session:"),
+            "memory_bytes": None,
+            "evictions": None,
+        }
@@ -0,0 +1,435 @@
+import heapq
+import json
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import log_event
+from slot_store import parse_slot
+
+# Callback invoked with each change event published by another worker
+Subscriber = Callable[[dict], None]
+
+
+def claim_key(slot: str, rep: str) -> str:
+    """Shared key of one (slot, rep) claim"""
+    return f"{slot}|{rep}"
+
+
+def split_claim_key(key: str):
+    slot, _, rep = key.rpartition("|")
+    return slot, rep
+
+
+def claim_before(key: str, cutoff: datetime) -> bool:
+    """True when the claim's slot starts before cutoff"""
+    try:
+        return parse_slot(split_claim_key(key)[0]) < cutoff
+    except ValueError:
+        return False
+
+
+class SharedState(ABC):
+    """State shared by every worker: slot claims, key/value entries with TTL and change broadcast.
+
+    Slot claims are atomic set-if-absent operations, so two workers can never
+    book the same slot. Change events are broadcast to the other workers,
+    which apply them to their local indexes; subscribers never see events
+    their own worker published.
+    """
+
+    # True when other processes see the same state
+    distributed = False
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._subscribers: List[Subscriber] = []
+
+    # Slot claims
+    @abstractmethod
+    def claim(self, key: str, owner: str) -> bool:
+        """Atomically claim key for owner, False if someone already holds it"""
+
+    @abstractmethod
+    def release(self, key: str, owner: Optional[str] = None) -> bool:
+        """Drop a claim, optionally only if owner still holds it"""
+
+    @abstractmethod
+    def owner(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def claims(self) -> Dict[str, str]:
+        """Every current claim, used to sync a worker at startup"""
+
+    @abstractmethod
+    def prune_claims(self, cutoff: datetime) -> int:
+        """Drop the claims of slots starting before cutoff (evicted past windows); returns how many"""
+
+    # Key/value entries (sessions, idempotency results)
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def update(self, key: str, change: Callable[[Optional[str]], str], ttl_seconds: Optional[float] = None) -> str:
+        """Atomically replace the value at key with change(current value or None); returns the new value.
+
+        change may run more than once when another worker writes the key at
+        the same time, so it must not have side effects.
+        """
+
+    @abstractmethod
+    def count(self, prefix: str) -> int:
+        """Number of live key/value entries whose key starts with prefix"""
+
+    # Ranked entries (lead scores): member -> score, highest first
+    @abstractmethod
+    def rank(self, key: str, member: str, score: float):
+        ...
+
+    @abstractmethod
+    def unrank(self, key: str, member: str):
+        ...
+
+    @abstractmethod
+    def top(self, key: str, limit: Optional[int] = None, min_score: float = float("-inf")) -> List[Tuple[str, float]]:
+        ...
+
+    # Rate limits: token buckets every worker draws from
+    @abstractmethod
+    def take_tokens(self, key: str, rate: float, capacity: float, amount: float = 1.0) -> float:
+        """Take amount tokens from the bucket at key (refilled at rate per second, holding at most capacity).
+
+        Returns 0 when they were taken, otherwise the seconds until they will
+        be available; nothing is taken from the bucket in that case.
+        """
+
+    # Change broadcast
+    @abstractmethod
+    def publish(self, event: dict):
+        ...
+
+    def subscribe(self, callback: Subscriber):
+        self._subscribers.append(callback)
+
+    def _dispatch(self, payload: str):
+        event = json.loads(payload)
+        if event.pop("origin", None) == self.worker_id:
+            return
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                log_event("shared_state_subscriber_error", level=logging.ERROR, sample_rate=1.0, error=str(e))
+
+    def _encode(self, event: dict) -> str:
+        return json.dumps(dict(event, origin=self.worker_id))
+
+    def close(self):
+        pass
+
+
+class InProcessState(SharedState):
+    """Single-process implementation; the default when only one worker runs"""
+
+    def __init__(self, max_buckets: int = 100_000):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._claims: Dict[str, str] = {}
+        # key -> (value, expires_at or None)
+        self._values: Dict[str, tuple] = {}
+        self._ranks: Dict[str, Dict[str, float]] = {}
+        # key -> [tokens, updated_at], least recently used first
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self.max_buckets = max_buckets
+
+    def claim(self, key, owner):
+        with self._lock:
+            if key in self._claims:
+                return False
+            self._claims[key] = owner
+            return True
+
+    def release(self, key, owner=None):
+        with self._lock:
+            if key not in self._claims or (owner is not None and self._claims[key] != owner):
+                return False
+            del self._claims[key]
+            return True
+
+    def owner(self, key):
+        with self._lock:
+            return self._claims.get(key)
+
+    def claims(self):
+        with self._lock:
+            return dict(self._claims)
+
+    def prune_claims(self, cutoff):
+        with self._lock:
+            stale = [key for key in self._claims if claim_before(key, cutoff)]
+            for key in stale:
+                del self._claims[key]
+            return len(stale)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        with self._lock:
+            self._values[key] = (value, None if ttl_seconds is None else time.monotonic() + ttl_seconds)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def update(self, key, change, ttl_seconds=None):
+        with self._lock:
+            value, expires_at = self._values.get(key, (None, None))
+            if expires_at is not None and expires_at < time.monotonic():
+                value = None
+            value = change(value)
+            self._values[key] = (value, None if ttl_seconds is None else time.monotonic() + ttl_seconds)
+            return value
+
+    def count(self, prefix):
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for key, (_value, expires_at) in self._values.items()
+                       if key.startswith(prefix) and (expires_at is None or expires_at >= now))
+
+    def rank(self, key, member, score):
+        with self._lock:
+            self._ranks.setdefault(key, {})[member] = score
+
+    def unrank(self, key, member):
+        with self._lock:
+            self._ranks.get(key, {}).pop(member, None)
+
+    def top(self, key, limit=None, min_score=float("-inf")):
+        with self._lock:
+            entries = [(score, member) for member, score in self._ranks.get(key, {}).items() if score >= min_score]
+        entries = heapq.nlargest(limit, entries) if limit is not None else sorted(entries, reverse=True)
+        return [(member, score) for score, member in entries]
+
+    def take_tokens(self, key, rate, capacity, amount=1.0):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+                # Evicting the least recently used bucket only forgets a client that went quiet
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= amount:
+                bucket[0] -= amount
+                return 0.0
+            return (amount - bucket[0]) / rate
+
+    def publish(self, event):
+        # Nobody else to tell; subscribers only get other workers' events
+        pass
+
+
+class RedisState(SharedState):
+    """Redis-compatible implementation for several workers or hosts.
+
+    Claims live in one hash (HSETNX is the atomic claim), entries are plain
+    keys with an expiry, rankings are sorted sets, token buckets are small
+    hashes updated in a WATCH/MULTI transaction and changes go out on a
+    pub/sub channel that a background thread listens to.
+    """
+
+    distributed = True
+
+    def __init__(self, client, prefix: str = "leadbot:"):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.claims_key = f"{prefix}claims"
+        self.channel = f"{prefix}events"
+        self._pubsub = None
+        self._listener = None
+
+    def claim(self, key, owner):
+        return bool(self.client.hsetnx(self.claims_key, key, owner))
+
+    def release(self, key, owner=None):
+        if owner is None:
+            return bool(self.client.hdel(self.claims_key, key))
+        # Compare-and-delete: only drop the claim if owner still holds it
+        from redis import WatchError
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.claims_key)
+                    if pipe.hget(self.claims_key, key) != owner:
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.hdel(self.claims_key, key)
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    def owner(self, key):
+        return self.client.hget(self.claims_key, key)
+
+    def claims(self):
+        return self.client.hgetall(self.claims_key)
+
+    def prune_claims(self, cutoff, batch: int = 1000):
+        stale = [key for key, _owner in self.client.hscan_iter(self.claims_key, count=batch)
+                 if claim_before(key, cutoff)]
+        for start in range(0, len(stale), batch):
+            self.client.hdel(self.claims_key, *stale[start:start + batch])
+        return len(stale)
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl_seconds=None):
+        px = None if ttl_seconds is None else max(1, int(ttl_seconds * 1000))
+        self.client.set(self.prefix + key, value, px=px)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def update(self, key, change, ttl_seconds=None):
+        from redis import WatchError
+
+        name = self.prefix + key
+        px = None if ttl_seconds is None else max(1, int(ttl_seconds * 1000))
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(name)
+                    value = change(pipe.get(name))
+                    pipe.multi()
+                    pipe.set(name, value, px=px)
+                    pipe.execute()
+                    return value
+                except WatchError:
+                    # Another worker wrote the key in between: redo the change on its value
+                    continue
+
+    def count(self, prefix):
+        # SCAN walks the keyspace in small steps, so a scrape never blocks Redis like KEYS would
+        return sum(1 for _key in self.client.scan_iter(match=self.prefix + prefix + "*", count=1000))
+
+    def rank(self, key, member, score):
+        self.client.zadd(self.prefix + key, {member: score})
+
+    def unrank(self, key, member):
+        self.client.zrem(self.prefix + key, member)
+
+    def top(self, key, limit=None, min_score=float("-inf")):
+        if limit is None:
+            return self.client.zrevrangebyscore(self.prefix + key, "+inf", min_score, withscores=True)
+        return self.client.zrevrangebyscore(self.prefix + key, "+inf", min_score, start=0, num=limit, withscores=True)
+
+    def take_tokens(self, key, rate, capacity, amount=1.0):
+        from redis import WatchError
+
+        name = f"{self.prefix}bucket:{key}"
+        # A bucket left alone this long is full again, so it can expire
+        ttl_ms = int(capacity / rate * 1000) + 1000
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(name)
+                    tokens, updated = pipe.hmget(name, "tokens", "updated")
+                    # Wall clock, as the buckets are shared between hosts
+                    now = time.time()
+                    tokens = capacity if tokens is None else min(capacity, float(tokens) + max(0.0, now - float(updated)) * rate)
+                    if tokens < amount:
+                        pipe.unwatch()
+                        return (amount - tokens) / rate
+                    pipe.multi()
+                    pipe.hset(name, mapping={"tokens": tokens - amount, "updated": now})
+                    pipe.pexpire(name, ttl_ms)
+                    pipe.execute()
+                    return 0.0
+                except WatchError:
+                    continue
+
+    def publish(self, event):
+        self.client.publish(self.channel, self._encode(event))
+
+    def subscribe(self, callback):
+        super().subscribe(callback)
+        if self._listener is None:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{self.channel: lambda message: self._dispatch(message["data"])})
+            self._listener = self._pubsub.run_in_thread(sleep_time=0.05, daemon=True)
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+def redis_client(url: str):
+    """Redis client for a redis:// URL, or an in-process fakeredis for 'fakeredis:' (tests)"""
+    if url.startswith("fakeredis:"):
+        import fakeredis
+
+        return fakeredis.FakeRedis(decode_responses=True)
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError(f"{url} needs the redis package (pip install redis)")
+    return redis.Redis.from_url(url, decode_responses=True)
+
+
+def create_shared_state(url: str) -> SharedState:
+    """Build the shared state from a URL: 'memory:', 'redis://host:6379/0' or 'fakeredis:'"""
+    scheme = url.partition(":")[0]
+    if scheme == "memory":
+        return InProcessState()
+    if scheme in ("redis", "rediss", "unix", "fakeredis"):
+        return RedisState(redis_client(url))
+    raise ValueError(f"Unknown shared state backend: {url}")
+
+
+if __name__ == "__main__":
+    # Local stand-in for a Redis server, for trying multi-worker mode without installing Redis:
+    #   python shared_state.py 6379 & SHARED_STATE=redis://localhost:6379/0 WEB_CONCURRENCY=4 python main.py
+    import sys
+
+    from fakeredis import TcpFakeServer
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6379
+    server = TcpFakeServer(("127.0.0.1", port))
+    print(f"Redis stand-in listening on 127.0.0.1:{port}")
+    server.serve_forever()
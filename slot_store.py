@@ -0,0 +1,339 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+DEFAULT_REP = "default"
+
+# Slot strings look like "2025-08-20 10:00 AM"
+SLOT_FORMAT = "%Y-%m-%d %I:%M %p"
+
+
+def parse_slot(slot: str) -> datetime:
+    """Parse a 'date time' slot string into a datetime"""
+    return datetime.strptime(slot.strip(), SLOT_FORMAT)
+
+
+def format_slot(when: datetime) -> str:
+    """Format a datetime back into the 'date time' slot string used by the API"""
+    # Same as strftime("%Y-%m-%d %I:%M %p") without the hour's leading zero ("2:00 PM"),
+    # built by hand because strftime dominates large calendar listings
+    hour = when.hour % 12 or 12
+    return f"{when.year:04d}-{when.month:02d}-{when.day:02d} {hour}:{when.minute:02d} {'AM' if when.hour < 12 else 'PM'}"
+
+
+class SlotStore:
+    """Thread-safe slot store with a sorted free-slot index and atomic booking.
+
+    Every slot is keyed by (start datetime, rep). Free slots are kept in a
+    sorted list so range queries cost O(log n + k), and booking is a
+    compare-and-set under a single lock so two concurrent requests can never
+    claim the same slot.
+
+    With an availability engine attached, slots are materialized from the
+    reps' recurring rules one window at a time, the first time a query or
+    booking touches that window. With retain_days set, windows that ended
+    more than retain_days ago are dropped with their slots and never
+    generated again, so the index does not grow with time.
+    """
+
+    def __init__(self, availability=None, retain_days: Optional[int] = None):
+        self._lock = threading.RLock()
+        self.availability = availability
+        self.retain_days = retain_days
+        # Availability windows already added to the store
+        self._materialized = set()
+        # Windows below this one are evicted; slots before evicted_before are not kept
+        self._first_window: Optional[int] = None
+        self.evicted_before: Optional[datetime] = None
+        # (when, rep) -> client name, None when free
+        self._slots: Dict[Tuple[datetime, str], Optional[str]] = {}
+        # when -> reps with a slot at that time
+        self._reps_at: Dict[datetime, List[str]] = {}
+        # Sorted (when, rep) keys of free slots, and of all slots
+        self._free: List[Tuple[datetime, str]] = []
+        self._keys: List[Tuple[datetime, str]] = []
+        # Bumped on every change, handy for cache invalidation
+        self.version = 0
+        # Called with (slot string, still bookable) when a booking or removal changes a time
+        self._listeners: List[Callable[[str, bool], None]] = []
+        # Called with the cutoff when past windows are evicted
+        self._evict_listeners: List[Callable[[datetime], None]] = []
+
+    @classmethod
+    def from_calendar(cls, calendar: Dict[str, Dict[str, Optional[str]]], rep: str = DEFAULT_REP) -> "SlotStore":
+        """Build a store from the legacy {date: {time: client}} calendar dict"""
+        store = cls()
+        for date, times in calendar.items():
+            for time, client in times.items():
+                store.add_slot(f"{date} {time}", rep=rep, client_name=client)
+        return store
+
+    def materialize(self, start: datetime, end: datetime):
+        """Add the generated slots of every window overlapping [start, end) that was not added yet"""
+        if self.availability is None:
+            return
+        with self._lock:
+            if self.retain_days is not None:
+                self._evict_past_windows()
+            for window in self.availability.windows(start, end):
+                if window in self._materialized or (self._first_window is not None and window < self._first_window):
+                    continue
+                self._materialized.add(window)
+                for when, rep in self.availability.window_slots(window):
+                    # Slots booked before their window was generated (persisted claims) stay booked
+                    self.add_slot(when, rep=rep)
+
+    def retention_cutoff(self) -> Optional[datetime]:
+        """Start of the oldest window kept, None when past windows are never evicted"""
+        if self.retain_days is None or self.availability is None:
+            return None
+        return self.availability.window_start(
+            self.availability.window_of(self.availability.now() - timedelta(days=self.retain_days)))
+
+    def _evict_past_windows(self):
+        first_window = self.availability.window_of(self.availability.now() - timedelta(days=self.retain_days))
+        if self._first_window is not None and first_window <= self._first_window:
+            return
+        self._first_window = first_window
+        self._materialized = {window for window in self._materialized if window >= first_window}
+        cutoff = self.availability.window_start(first_window)
+        self.evict_before(cutoff)
+        for callback in self._evict_listeners:
+            callback(cutoff)
+
+    def evict_before(self, cutoff: datetime) -> int:
+        """Drop every slot, free or booked, starting before cutoff; returns how many were dropped"""
+        with self._lock:
+            if self.evicted_before is None or cutoff > self.evicted_before:
+                self.evicted_before = cutoff
+            hi = bisect_left(self._keys, (cutoff, ""))
+            if not hi:
+                return 0
+            for key in self._keys[:hi]:
+                del self._slots[key]
+                self._reps_at.pop(key[0], None)
+            del self._keys[:hi]
+            del self._free[:bisect_left(self._free, (cutoff, ""))]
+            self.version += 1
+            return hi
+
+    def _materialize_at(self, when: datetime):
+        self.materialize(when, when + timedelta(microseconds=1))
+
+    def add_slot(self, slot: Union[str, datetime], rep: str = DEFAULT_REP, client_name: Optional[str] = None) -> bool:
+        """Add a slot (slot string or datetime), returns False if it already exists"""
+        key = (slot if isinstance(slot, datetime) else parse_slot(slot), rep)
+        with self._lock:
+            if key in self._slots:
+                return False
+            self._slots[key] = client_name
+            self._reps_at.setdefault(key[0], []).append(rep)
+            insort(self._keys, key)
+            if client_name is None:
+                insort(self._free, key)
+            self.version += 1
+            return True
+
+    def remove_slot(self, slot: str, rep: str = DEFAULT_REP) -> bool:
+        """Remove a slot entirely, returns False if it did not exist"""
+        key = (parse_slot(slot), rep)
+        with self._lock:
+            self._materialize_at(key[0])
+            if key not in self._slots:
+                return False
+            if self._slots.pop(key) is None:
+                self._discard(self._free, key)
+            self._discard(self._keys, key)
+            reps = self._reps_at[key[0]]
+            reps.remove(rep)
+            if not reps:
+                del self._reps_at[key[0]]
+            self.version += 1
+            self._notify(key[0])
+            return True
+
+    def subscribe(self, callback: Callable[[str, bool], None]):
+        """Get told about bookings and releases; callbacks run under the store lock and must not block"""
+        self._listeners.append(callback)
+
+    def subscribe_evictions(self, callback: Callable[[datetime], None]):
+        """Get told the cutoff when past windows are evicted; runs under the store lock and must not block"""
+        self._evict_listeners.append(callback)
+
+    def _notify(self, when: datetime):
+        if not self._listeners:
+            return
+        slot = format_slot(when)
+        available = self._find_key(when, None, free_only=True) is not None
+        for callback in self._listeners:
+            callback(slot, available)
+
+    @staticmethod
+    def _discard(index: List[Tuple[datetime, str]], key: Tuple[datetime, str]):
+        idx = bisect_left(index, key)
+        if idx < len(index) and index[idx] == key:
+            del index[idx]
+
+    def _find_key(self, when: datetime, rep: Optional[str], free_only: bool) -> Optional[Tuple[datetime, str]]:
+        if rep is not None:
+            key = (when, rep)
+            if key not in self._slots or (free_only and self._slots[key] is not None):
+                return None
+            return key
+        # Any rep: first free (or existing) slot at that time
+        idx = bisect_left(self._free, (when, ""))
+        if idx < len(self._free) and self._free[idx][0] == when:
+            return self._free[idx]
+        if free_only or when not in self._reps_at:
+            return None
+        return (when, self._reps_at[when][0])
+
+    def book(self, slot: str, client_name: str, rep: Optional[str] = None) -> Optional[str]:
+        """Atomically claim a free slot, returns the rep that got it or None if it is taken or unknown"""
+        try:
+            when = parse_slot(slot)
+        except ValueError:
+            return None
+        with self._lock:
+            self._materialize_at(when)
+            key = self._find_key(when, rep, free_only=True)
+            if key is None:
+                return None
+            self._slots[key] = client_name
+            self._discard(self._free, key)
+            self.version += 1
+            self._notify(when)
+            return key[1]
+
+    def release(self, slot: str, rep: Optional[str] = None, client_name: Optional[str] = None) -> bool:
+        """Free a booked slot, optionally only if it is held by client_name"""
+        try:
+            when = parse_slot(slot)
+        except ValueError:
+            return False
+        with self._lock:
+            self._materialize_at(when)
+            reps = self._reps_at.get(when, []) if rep is None else [rep]
+            for slot_rep in reps:
+                key = (when, slot_rep)
+                held_by = self._slots.get(key)
+                if held_by is not None and (client_name is None or held_by == client_name):
+                    self._slots[key] = None
+                    insort(self._free, key)
+                    self.version += 1
+                    self._notify(when)
+                    return True
+            return False
+
+    def apply_claims(self, claims):
+        """Replay persisted (slot, rep, client_name) rows on top of the seeded calendar"""
+        for slot, rep, client_name in claims:
+            if self.evicted_before is not None and parse_slot(slot) < self.evicted_before:
+                # History the calendar no longer shows; the booking log keeps it
+                continue
+            if client_name is None:
+                if not self.release(slot, rep=rep):
+                    self.add_slot(slot, rep=rep)
+            elif not self.book(slot, client_name, rep=rep):
+                self.add_slot(slot, rep=rep, client_name=client_name)
+
+    def free_reps(self, slot: str) -> List[str]:
+        """Reps that still have this slot open, in booking preference order"""
+        try:
+            when = parse_slot(slot)
+        except ValueError:
+            return []
+        with self._lock:
+            self._materialize_at(when)
+            idx = bisect_left(self._free, (when, ""))
+            reps = []
+            while idx < len(self._free) and self._free[idx][0] == when:
+                reps.append(self._free[idx][1])
+                idx += 1
+            return reps
+
+    def is_free(self, slot: str, rep: Optional[str] = None) -> bool:
+        try:
+            when = parse_slot(slot)
+        except ValueError:
+            return False
+        with self._lock:
+            self._materialize_at(when)
+            return self._find_key(when, rep, free_only=True) is not None
+
+    def free_slots(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   rep: Optional[str] = None) -> List[str]:
+        """Free slot strings with start <= when < end, in chronological order"""
+        with self._lock:
+            if start is not None and end is not None:
+                self.materialize(start, end)
+            lo = 0 if start is None else bisect_left(self._free, (start, ""))
+            hi = len(self._free) if end is None else bisect_left(self._free, (end, ""))
+            result = []
+            last = None
+            for when, slot_rep in self._free[lo:hi]:
+                if rep is not None and slot_rep != rep:
+                    continue
+                # Collapse reps sharing the same start time into one offered slot
+                if when == last:
+                    continue
+                last = when
+                result.append(format_slot(when))
+            return result
+
+    def query(self, start: datetime, end: datetime, rep: Optional[str] = None, status: str = "all",
+              time_from: Optional[time] = None, time_to: Optional[time] = None,
+              after: Optional[Tuple[datetime, str]] = None, limit: Optional[int] = None,
+              distinct_times: bool = False) -> List[Tuple[datetime, str, bool]]:
+        """(when, rep, booked) rows with start <= when < end in (when, rep) order, without client names.
+
+        status is "free", "booked" or "all"; time_from/time_to keep times of day in
+        [time_from, time_to); after is an exclusive (when, rep) keyset cursor;
+        distinct_times keeps one row per start time (the first rep's).
+        """
+        with self._lock:
+            self.materialize(start, end)
+            index = self._free if status == "free" else self._keys
+            lo = bisect_left(index, (start, ""))
+            if after is not None:
+                lo = max(lo, bisect_right(index, after))
+            hi = bisect_left(index, (end, ""))
+            rows = []
+            last = None
+            for i in range(lo, hi):
+                key = index[i]
+                when, slot_rep = key
+                if rep is not None and slot_rep != rep:
+                    continue
+                if (time_from is not None and when.time() < time_from) or (time_to is not None and when.time() >= time_to):
+                    continue
+                booked = self._slots[key] is not None
+                if (status == "booked" and not booked) or (distinct_times and when == last):
+                    continue
+                last = when
+                rows.append((when, slot_rep, booked))
+                if limit is not None and len(rows) >= limit:
+                    break
+            return rows
+
+    def free_count(self) -> int:
+        with self._lock:
+            return len(self._free)
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[str]]]:
+        """Legacy {date: {time: client}} view of the whole calendar"""
+        with self._lock:
+            items = sorted(self._slots.items())
+        result: Dict[str, Dict[str, Optional[str]]] = {}
+        for (when, _rep), client in items:
+            date, time = format_slot(when).split(" ", 1)
+            day = result.setdefault(date, {})
+            # Report a time as free while any rep still has it open
+            if time not in day or client is None:
+                day[time] = client
+        return result
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._slots)
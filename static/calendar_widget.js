@@ -0,0 +1,135 @@
+// Calendar widget behaviour: slot selection, booking form submit and live slot updates.
+// Loaded once by index.html; the widget HTML rendered into chat bubbles calls these globals.
+
+// Live slot updates: grey out times other visitors book while a widget is open
+const takenSlots = new Set();
+
+function isTaken(slot) {
+    return takenSlots.has(slot);
+}
+
+function applySlotState(root) {
+    root.querySelectorAll('.time-slot[data-slot]').forEach(button => {
+        const taken = isTaken(button.dataset.slot);
+        button.classList.toggle('taken', taken);
+        button.disabled = taken;
+    });
+    if (window.selectedSlot && isTaken(window.selectedSlot)) {
+        const display = document.getElementById('selectedSlotDisplay');
+        if (display) {
+            display.textContent = `Sorry, ${window.selectedSlot} was just booked. Please pick another time.`;
+        }
+        window.selectedSlot = null;
+    }
+}
+
+function connectSlotUpdates(delay = 1000) {
+    const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${scheme}://${location.host}/ws/slots`);
+    socket.onopen = () => { delay = 1000; };
+    socket.onmessage = (message) => {
+        const update = JSON.parse(message.data);
+        if (update.type === 'sync') {
+            // Full state on (re)connect
+            takenSlots.clear();
+            update.taken.forEach(slot => takenSlots.add(slot));
+        } else if (update.type === 'slots') {
+            update.changes.forEach(([slot, available]) => {
+                if (available) {
+                    takenSlots.delete(slot);
+                } else {
+                    takenSlots.add(slot);
+                }
+            });
+        }
+        applySlotState(document);
+    };
+    // Reconnect with backoff; the sync message on reconnect covers anything missed
+    socket.onclose = () => setTimeout(() => connectSlotUpdates(Math.min(delay * 2, 30000)), delay);
+}
+
+// Global functions for calendar widget
+window.selectTimeSlot = function(slot, button) {
+    console.log('Time slot selected:', slot);
+
+    // Remove previous selection
+    document.querySelectorAll('.time-slot').forEach(btn => {
+        btn.style.background = 'linear-gradient(135deg, #3498db 0%, #2980b9 100%)';
+    });
+
+    // Highlight selected slot
+    button.style.background = 'linear-gradient(135deg, #e74c3c 0%, #c0392b 100%)';
+
+    // Store selected slot globally
+    window.selectedSlot = slot;
+    // Same key for every submit of this selection, so retries can't double-book
+    window.bookingKey = window.crypto && crypto.randomUUID
+        ? crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+    // Show booking form
+    const form = document.getElementById('bookingForm');
+    const display = document.getElementById('selectedSlotDisplay');
+
+    if (form && display) {
+        display.textContent = `Selected: ${slot}`;
+        form.classList.add('show');
+
+        // Scroll to form
+        form.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+    } else {
+        console.error('Booking form elements not found');
+    }
+};
+
+window.submitBooking = async function(event) {
+    event.preventDefault();
+    console.log('Submitting booking for slot:', window.selectedSlot);
+
+    if (!window.selectedSlot) {
+        alert('Please select a time slot first!');
+        return;
+    }
+
+    const formData = {
+        name: document.getElementById('clientName').value,
+        email: document.getElementById('clientEmail').value,
+        phone: document.getElementById('clientPhone').value,
+        company: document.getElementById('clientCompany').value,
+        selected_slot: window.selectedSlot,
+        message: document.getElementById('clientMessage').value,
+        // Credits the booking to the chat's lead score (none on the standalone form)
+        thread_id: sessionStorage.getItem('threadId')
+    };
+
+    console.log('Form data:', formData);
+
+    try {
+        const response = await fetch('/save-form', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Idempotency-Key': window.bookingKey
+            },
+            body: JSON.stringify(formData)
+        });
+
+        const result = await response.json();
+        console.log('Booking result:', result);
+
+        if (result.success) {
+            alert('🎉 Meeting scheduled successfully! We\'ll contact you within 24 hours to confirm.');
+            const form = document.getElementById('bookingForm');
+            if (form) {
+                form.style.display = 'none';
+            }
+        } else {
+            alert('Error: ' + result.message);
+        }
+    } catch (error) {
+        console.error('Booking error:', error);
+        alert('Sorry, there was an error. Please try again.');
+    }
+};
+
+console.log('Global functions defined:', typeof window.selectTimeSlot, typeof window.submitBooking);
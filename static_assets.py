@@ -0,0 +1,155 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from calendar_api import etag_matches
+from metrics import REGISTRY
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it only gzip variants are served
+    brotli = None
+
+ASSET_RESPONSES = REGISTRY.counter("chatbot_static_responses_total", "Static asset responses, by content coding",
+                                   ["encoding"])
+
+# Never worth compressing, and some clients mishandle it
+_MIN_COMPRESS_BYTES = 256
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+class Asset(NamedTuple):
+    path: str
+    media_type: str
+    cache_control: str
+    mtime: float
+    # content coding ("identity", "gzip", "br") -> (body, strong ETag)
+    variants: Dict[str, Tuple[bytes, str]]
+
+
+def _accepted(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Codings of an Accept-Encoding header with their q-values"""
+    codings = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+class AssetStore:
+    """Static files served from memory: read once, compressed once, revalidated by ETag.
+
+    Each file is kept as identity, gzip and (when the brotli package is
+    installed) brotli variants, each with its own strong ETag, so a request
+    costs a dict lookup and no disk I/O or compression. With reload on, a
+    changed file is picked up on the next request (mtime checked at most
+    once per reload_interval), which is meant for development.
+    """
+
+    def __init__(self, reload: bool = False, reload_interval: float = 1.0):
+        self.reload = reload
+        self.reload_interval = reload_interval
+        self._assets: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+
+    def add(self, url: str, path: str, cache_control: str = "no-cache", media_type: Optional[str] = None):
+        """Serve the file at path under url"""
+        media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        self._assets[url] = self._load(path, media_type, cache_control)
+
+    def add_directory(self, prefix: str, directory: str, cache_control: str = "no-cache"):
+        """Serve every file below directory under prefix, e.g. /static/calendar_widget.css"""
+        for root, _dirs, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                self.add(f"{prefix.rstrip('/')}/{relative}", path, cache_control)
+
+    @staticmethod
+    def _load(path: str, media_type: str, cache_control: str) -> Asset:
+        with open(path, "rb") as f:
+            body = f.read()
+        mtime = os.stat(path).st_mtime
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        variants = {"identity": (body, f'"{digest}"')}
+        if len(body) >= _MIN_COMPRESS_BYTES and media_type.startswith(_COMPRESSIBLE):
+            compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+            for coding, data in compressed.items():
+                if len(data) < len(body):
+                    variants[coding] = (data, f'"{digest}-{coding}"')
+        return Asset(path, media_type, cache_control, mtime, variants)
+
+    def _reload_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            for url, asset in list(self._assets.items()):
+                try:
+                    if os.stat(asset.path).st_mtime != asset.mtime:
+                        self._assets[url] = self._load(asset.path, asset.media_type, asset.cache_control)
+                except OSError:
+                    # Deleted or mid-save: keep serving the last good copy
+                    pass
+
+    def get(self, url: str) -> Optional[Asset]:
+        if self.reload:
+            self._reload_changed()
+        return self._assets.get(url)
+
+    @staticmethod
+    def negotiate(asset: Asset, accept_encoding: Optional[str]) -> str:
+        """Smallest variant the client accepts; brotli beats gzip at equal preference"""
+        accepted = _accepted(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        for coding in ("br", "gzip"):
+            if coding in asset.variants and accepted.get(coding, wildcard) > 0:
+                return coding
+        return "identity"
+
+    def respond(self, url: str, accept_encoding: Optional[str], if_none_match: Optional[str]):
+        """(status, body, headers) for a GET of url, or None when there is no such asset"""
+        asset = self.get(url)
+        if asset is None:
+            return None
+        coding = self.negotiate(asset, accept_encoding)
+        body, etag = asset.variants[coding]
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        ASSET_RESPONSES.inc(encoding=coding)
+        if etag_matches(if_none_match, etag):
+            return 304, b"", headers
+        headers["Content-Type"] = asset.media_type
+        return 200, body, headers
+
+    def stats(self) -> dict:
+        return {
+            "brotli": brotli is not None,
+            "assets": {
+                url: {coding: len(body) for coding, (body, _etag) in asset.variants.items()}
+                for url, asset in self._assets.items()
+            },
+        }
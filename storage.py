@@ -0,0 +1,357 @@
+import csv
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from metrics import REGISTRY, log_event, stage_timer
+from shared_state import redis_client
+
+CSV_HEADER = ['Timestamp', 'Name', 'Email', 'Phone', 'Company', 'Selected Slot', 'Message']
+
+# (slot, rep, client_name) rows describing the persisted calendar state
+SlotClaim = Tuple[str, str, Optional[str]]
+
+BATCH_SIZE = REGISTRY.histogram(
+    "chatbot_storage_batch_size",
+    "Entries committed per group commit",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+COMMIT_FAILURES = REGISTRY.counter("chatbot_storage_commit_failures_total",
+                                   "Failed group commits, by outcome (retried, failed)", ["outcome"])
+
+
+def booking_record(name: str, email: str, phone: str, company: str, selected_slot: str,
+                   message: str = "", rep: str = "default") -> Dict[str, str]:
+    """Build the dict stored for one booking"""
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "name": name,
+        "email": email,
+        "phone": phone,
+        "company": company,
+        "selected_slot": selected_slot,
+        "message": message,
+        "rep": rep,
+    }
+
+
+def _csv_row(record: Dict[str, str]) -> List[str]:
+    return [record["timestamp"], record["name"], record["email"], record["phone"],
+            record["company"], record["selected_slot"], record["message"]]
+
+
+class BookingStorage(ABC):
+    """Base class for booking/calendar persistence with a group-committing background writer.
+
+    Callers enqueue bookings and slot changes and get a Future back; a single
+    writer thread drains the queue and commits everything it picked up in one
+    transaction, so a burst of bookings costs one fsync instead of one each.
+    A failed commit is retried with exponential backoff (a locked database
+    usually frees up); when it keeps failing, each entry is tried on its own
+    and the Futures of those that still fail get the error, so the caller can
+    report the booking as failed instead of losing it silently.
+    """
+
+    def __init__(self, csv_export: Optional[str] = None, max_batch: int = 256, commit_retries: int = 4,
+                 retry_backoff: float = 0.1):
+        self.csv_export = csv_export
+        self.max_batch = max_batch
+        self.commit_retries = commit_retries
+        self.retry_backoff = retry_backoff
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._run_writer, name="booking-writer", daemon=True)
+        self._closed = False
+        self._writer.start()
+
+    # Public API
+    def record_booking(self, record: Dict[str, str]) -> Future:
+        """Queue a booking row and its slot claim for the next group commit; the Future resolves once committed"""
+        return self._enqueue("booking", record)
+
+    def save_slot(self, slot: str, rep: str, client_name: Optional[str]) -> Future:
+        """Queue a calendar state change (client_name None frees the slot)"""
+        return self._enqueue("slot", (slot, rep, client_name))
+
+    def _enqueue(self, kind: str, payload) -> Future:
+        if self._closed:
+            raise RuntimeError("Booking storage is closed")
+        done: Future = Future()
+        self._queue.put((kind, payload, done))
+        return done
+
+    def flush(self):
+        """Block until everything queued so far is committed"""
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    @abstractmethod
+    def load_slots(self) -> List[SlotClaim]:
+        """Persisted calendar state, used to rebuild the slot store at startup"""
+
+    @abstractmethod
+    def load_bookings(self) -> List[Dict[str, str]]:
+        ...
+
+    def export_csv(self, path: str) -> int:
+        """Write every stored booking to a CSV file in the legacy format"""
+        bookings = self.load_bookings()
+        with open(path, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADER)
+            for record in bookings:
+                writer.writerow(_csv_row(record))
+        return len(bookings)
+
+    # Backend hooks
+    @abstractmethod
+    def _commit(self, bookings: List[Dict[str, str]], slots: List[SlotClaim]):
+        ...
+
+    def _run_writer(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Group commit whatever else is already waiting
+            while item is not None and len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            stop = batch[-1] is None
+            entries = [entry for entry in batch if entry is not None]
+            try:
+                if entries:
+                    with stage_timer("storage_write"):
+                        self._commit_entries(entries)
+                    BATCH_SIZE.observe(len(entries))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                self._shutdown()
+                return
+
+    @staticmethod
+    def _split(entries) -> Tuple[List[Dict[str, str]], List[SlotClaim]]:
+        bookings = [payload for kind, payload, _done in entries if kind == "booking"]
+        slots = [payload for kind, payload, _done in entries if kind == "slot"]
+        slots.extend((b["selected_slot"], b["rep"], b["name"]) for b in bookings)
+        return bookings, slots
+
+    def _commit_entries(self, entries):
+        if self._commit_with_retries(entries):
+            return
+        # Still failing: commit the entries one by one, so one bad entry does not sink the whole batch
+        for entry in entries:
+            try:
+                self._commit_batch([entry])
+            except Exception as e:
+                COMMIT_FAILURES.inc(outcome="failed")
+                entry[2].set_exception(e)
+
+    def _commit_with_retries(self, entries) -> bool:
+        for attempt in range(self.commit_retries + 1):
+            if attempt:
+                COMMIT_FAILURES.inc(outcome="retried")
+                time.sleep(min(self.retry_backoff * 2 ** (attempt - 1), 2.0))
+            try:
+                self._commit_batch(entries)
+                return True
+            except Exception as e:
+                log_event("storage_commit_error", level=logging.ERROR, sample_rate=1.0, attempt=attempt + 1,
+                          entries=len(entries), error=str(e))
+        return False
+
+    def _commit_batch(self, entries):
+        bookings, slots = self._split(entries)
+        self._commit(bookings, slots)
+        for _kind, _payload, done in entries:
+            done.set_result(None)
+        if bookings and self.csv_export:
+            self._export_csv(bookings)
+
+    def _export_csv(self, bookings: List[Dict[str, str]]):
+        # Only a mirror: the bookings are committed, so a failure here is logged and not retried
+        try:
+            self._append_csv(bookings)
+        except OSError as e:
+            log_event("storage_csv_error", level=logging.ERROR, sample_rate=1.0, error=str(e))
+
+    def _shutdown(self):
+        pass
+
+    def _append_csv(self, bookings: List[Dict[str, str]]):
+        file_exists = os.path.exists(self.csv_export)
+        with open(self.csv_export, mode='a', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            if not file_exists:
+                writer.writerow(CSV_HEADER)
+            writer.writerows(_csv_row(record) for record in bookings)
+
+
+class MemoryStorage(BookingStorage):
+    """Non-persistent backend, handy for tests and benchmarks"""
+
+    def __init__(self, csv_export: Optional[str] = None, max_batch: int = 256):
+        self._lock = threading.Lock()
+        self._bookings: List[Dict[str, str]] = []
+        self._slots: Dict[Tuple[str, str], Optional[str]] = {}
+        super().__init__(csv_export=csv_export, max_batch=max_batch)
+
+    def _commit(self, bookings, slots):
+        with self._lock:
+            self._bookings.extend(bookings)
+            for slot, rep, client_name in slots:
+                self._slots[(slot, rep)] = client_name
+
+    def load_slots(self):
+        with self._lock:
+            return [(slot, rep, client) for (slot, rep), client in self._slots.items()]
+
+    def load_bookings(self):
+        with self._lock:
+            return list(self._bookings)
+
+
+class SQLiteStorage(BookingStorage):
+    """SQLite backend in WAL mode; bookings and calendar state survive restarts"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            company TEXT NOT NULL,
+            selected_slot TEXT NOT NULL,
+            message TEXT NOT NULL DEFAULT '',
+            rep TEXT NOT NULL DEFAULT 'default'
+        );
+        CREATE TABLE IF NOT EXISTS slots (
+            slot TEXT NOT NULL,
+            rep TEXT NOT NULL,
+            client_name TEXT,
+            PRIMARY KEY (slot, rep)
+        );
+    """
+
+    def __init__(self, path: str = "bookings.db", csv_export: Optional[str] = None, max_batch: int = 256):
+        self.path = path
+        setup = self._connect()
+        setup.executescript(self.SCHEMA)
+        setup.close()
+        # Separate read connection; WAL lets it run alongside the writer
+        self._read_lock = threading.Lock()
+        self._reader = self._connect(check_same_thread=False)
+        self._write_conn: Optional[sqlite3.Connection] = None
+        super().__init__(csv_export=csv_export, max_batch=max_batch)
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=check_same_thread)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL is durable across process crashes, only a power loss can drop the last commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _commit(self, bookings, slots):
+        if self._write_conn is None:
+            self._write_conn = self._connect()
+        try:
+            self._write(bookings, slots)
+        except sqlite3.Error:
+            # Start the retry from a fresh connection, in case this one is broken
+            self._write_conn.close()
+            self._write_conn = None
+            raise
+
+    def _write(self, bookings, slots):
+        with self._write_conn:
+            self._write_conn.executemany(
+                "INSERT INTO bookings (timestamp, name, email, phone, company, selected_slot, message, rep) "
+                "VALUES (:timestamp, :name, :email, :phone, :company, :selected_slot, :message, :rep)",
+                bookings,
+            )
+            self._write_conn.executemany(
+                "INSERT INTO slots (slot, rep, client_name) VALUES (?, ?, ?) "
+                "ON CONFLICT (slot, rep) DO UPDATE SET client_name = excluded.client_name",
+                slots,
+            )
+
+    def _shutdown(self):
+        if self._write_conn is not None:
+            self._write_conn.close()
+
+    def close(self):
+        super().close()
+        with self._read_lock:
+            self._reader.close()
+
+    def load_slots(self):
+        with self._read_lock:
+            return [tuple(row) for row in self._reader.execute("SELECT slot, rep, client_name FROM slots")]
+
+    def load_bookings(self):
+        with self._read_lock:
+            cursor = self._reader.execute(
+                "SELECT timestamp, name, email, phone, company, selected_slot, message, rep FROM bookings ORDER BY id"
+            )
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+
+class RedisStorage(BookingStorage):
+    """Redis-compatible backend, so workers on several hosts share one booking log and calendar"""
+
+    def __init__(self, client, prefix: str = "leadbot:", csv_export: Optional[str] = None, max_batch: int = 256):
+        self.client = client
+        self.bookings_key = f"{prefix}bookings"
+        self.slots_key = f"{prefix}slots"
+        super().__init__(csv_export=csv_export, max_batch=max_batch)
+
+    def _commit(self, bookings, slots):
+        # One MULTI/EXEC round trip per group commit
+        with self.client.pipeline(transaction=True) as pipe:
+            if bookings:
+                pipe.rpush(self.bookings_key, *(json.dumps(record) for record in bookings))
+            if slots:
+                pipe.hset(self.slots_key, mapping={f"{slot}|{rep}": json.dumps(client) for slot, rep, client in slots})
+            pipe.execute()
+
+    def load_slots(self):
+        claims = []
+        for key, client in self.client.hgetall(self.slots_key).items():
+            slot, _, rep = key.rpartition("|")
+            claims.append((slot, rep, json.loads(client)))
+        return claims
+
+    def load_bookings(self):
+        return [json.loads(record) for record in self.client.lrange(self.bookings_key, 0, -1)]
+
+
+def create_storage(url: str, csv_export: Optional[str] = None) -> BookingStorage:
+    """Build a backend from a URL like 'sqlite:bookings.db', 'memory:' or 'redis://host:6379/0'"""
+    scheme, _, location = url.partition(":")
+    if scheme == "sqlite":
+        return SQLiteStorage(location or "bookings.db", csv_export=csv_export)
+    if scheme == "memory":
+        return MemoryStorage(csv_export=csv_export)
+    if scheme in ("redis", "rediss", "unix", "fakeredis"):
+        return RedisStorage(redis_client(url), csv_export=csv_export)
+    raise ValueError(f"Unknown booking storage backend: {url}")
@@ -0,0 +1,27 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Offline configuration for importing main: no API calls, no files left behind
+os.environ.setdefault("GOOGLE_API_KEY", "offline-test")
+os.environ["BOOKING_STORAGE"] = "memory:"
+os.environ["BOOKINGS_CSV_EXPORT"] = ""
+os.environ["TRANSCRIPT_LOG_DIR"] = ""
+os.environ["LLM_WARMUP"] = "0"
+os.environ["LOG_SAMPLE_RATE"] = "0"
+
+
+@pytest.fixture(scope="session")
+def main():
+    return pytest.importorskip("main")
+
+
+@pytest.fixture
+def free_slots(main):
+    """Bookable 'date time' slots of the coming two weeks"""
+    return json.loads(main.available_slots_json())
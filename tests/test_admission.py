@@ -0,0 +1,133 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import shared_state
+from admission import AdmissionController, AdmissionMiddleware
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def chat_app(controller, seen_active=None):
+    async def chat(request):
+        return JSONResponse({"response": "hi"})
+
+    async def chat_stream(request):
+        async def events():
+            for chunk in ("one", "two"):
+                seen_active.append(controller.active)
+                yield chunk
+        return StreamingResponse(events())
+
+    app = Starlette(routes=[Route("/chat", chat, methods=["POST"]), Route("/chat/stream", chat_stream, methods=["POST"])])
+    return AdmissionMiddleware(app, controller=controller)
+
+
+def post(app, path, payload, headers=None):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=payload, headers=headers)
+    return asyncio.run(run())
+
+
+def test_ip_bucket_refills_and_rejections_carry_retry_after(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(shared_state.time, "monotonic", clock)
+    controller = AdmissionController(ip_rate_per_minute=6, ip_burst=2, thread_rate_per_minute=0)
+    app = chat_app(controller)
+
+    assert [post(app, "/chat", {"message": "hi"}).status_code for _ in range(2)] == [200, 200]
+    rejected = post(app, "/chat", {"message": "hi"})
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "10"
+
+    # One token per 10 s
+    clock.now += 10
+    assert post(app, "/chat", {"message": "hi"}).status_code == 200
+    assert post(app, "/chat", {"message": "hi"}).status_code == 429
+
+
+def test_thread_bucket_limits_one_conversation_only():
+    controller = AdmissionController(ip_rate_per_minute=0, thread_rate_per_minute=60, thread_burst=1)
+    app = chat_app(controller)
+
+    assert post(app, "/chat", {"message": "hi", "thread_id": "t1"}).status_code == 200
+    assert post(app, "/chat", {"message": "hi", "thread_id": "t1"}).status_code == 429
+    assert post(app, "/chat", {"message": "hi", "thread_id": "t2"}).status_code == 200
+
+
+def test_full_queue_and_queue_timeout_are_rejected_with_503():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        assert await controller.acquire() is None
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queued == 1
+
+        full = await controller.acquire()
+        timed_out = await waiting
+        controller.release()
+        return controller, full, timed_out
+
+    controller, full, timed_out = asyncio.run(run())
+
+    assert (full.status, full.outcome) == (503, "queue_full")
+    assert (timed_out.status, timed_out.outcome) == (503, "queue_timeout")
+    assert (controller.active, controller.queued) == (0, 0)
+
+
+def test_queued_request_gets_the_slot_when_it_is_released():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        controller.release()
+        return controller, await waiting
+
+    controller, admitted = asyncio.run(run())
+
+    assert admitted is None
+    assert controller.active == 1
+
+
+def test_slot_is_held_until_a_streamed_reply_finishes():
+    seen_active = []
+    controller = AdmissionController(ip_rate_per_minute=0, thread_rate_per_minute=0, max_concurrency=2)
+
+    response = post(chat_app(controller, seen_active), "/chat/stream", {"message": "hi"})
+
+    assert response.text == "onetwo"
+    assert seen_active == [1, 1]
+    assert controller.active == 0
+
+
+@pytest.mark.parametrize("trusted_proxies, expected", [(0, "10.0.0.9"), (1, "198.51.100.7"), (2, "203.0.113.5"),
+                                                      (5, "1.2.3.4")])
+def test_client_ip_trusts_only_the_configured_proxy_hops(trusted_proxies, expected):
+    controller = AdmissionController(trusted_proxies=trusted_proxies)
+    # A forged first entry, then the client as seen by the outer proxy, then the inner proxy
+    scope = {"client": ("10.0.0.9", 50000),
+             "headers": [(b"x-forwarded-for", b"1.2.3.4, 203.0.113.5, 198.51.100.7")]}
+
+    assert controller.client_ip(scope) == expected
+
+
+def test_forwarded_for_keys_the_ip_bucket_behind_a_proxy():
+    controller = AdmissionController(ip_rate_per_minute=60, ip_burst=1, thread_rate_per_minute=0, trusted_proxies=1)
+    app = chat_app(controller)
+
+    assert post(app, "/chat", {"message": "hi"}, {"X-Forwarded-For": "203.0.113.5"}).status_code == 200
+    assert post(app, "/chat", {"message": "hi"}, {"X-Forwarded-For": "203.0.113.5"}).status_code == 429
+    assert post(app, "/chat", {"message": "hi"}, {"X-Forwarded-For": "203.0.113.6"}).status_code == 200
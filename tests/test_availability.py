@@ -0,0 +1,87 @@
+import json
+import os
+from datetime import date, datetime
+
+import pytest
+
+from availability import AvailabilityEngine, AvailabilityRule, Blackout
+from slot_store import SlotStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def shipped():
+    """The engine built from the availability.json in the repository"""
+    return AvailabilityEngine.from_file(os.path.join(ROOT, "availability.json"))
+
+
+def days(slots):
+    return sorted({when.date() for when, _rep in slots})
+
+
+def test_shipped_rules_skip_weekends_lunch_and_the_holiday_exceptions(shipped):
+    slots = shipped.slots(datetime(2026, 12, 21), datetime(2027, 1, 4))
+
+    # Mon 21 to Fri 25 and Mon 28 to Fri 1; the 24th, 25th and 1st are exceptions
+    assert days(slots) == [date(2026, 12, d) for d in (21, 22, 23, 28, 29, 30, 31)]
+    assert [when.hour for when, _rep in slots if when.date() == date(2026, 12, 23)] == [9, 10, 11, 13, 14, 15, 16]
+    assert len(slots) == 7 * 7
+
+
+def test_slot_store_materializes_the_rules_across_exception_dates(shipped):
+    store = SlotStore(shipped)
+
+    assert store.is_free("2026-12-23 4:00 PM")
+    assert not store.is_free("2026-12-24 9:00 AM")
+    assert not store.is_free("2027-01-01 9:00 AM")
+    assert store.is_free("2027-01-04 9:00 AM")
+    assert not store.is_free("2027-01-04 12:00 PM")
+
+
+def test_interval_until_and_exdates():
+    rule = AvailabilityRule("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;UNTIL=20300131", "09:00", "10:00",
+                            dtstart="2030-01-07", exdates=["2030-01-09"])
+    engine = AvailabilityEngine([rule])
+
+    assert days(engine.slots(datetime(2030, 1, 1), datetime(2030, 2, 15))) == [
+        date(2030, 1, 7), date(2030, 1, 21), date(2030, 1, 23)]
+
+
+def test_partial_blackout_of_one_rep():
+    rules = [AvailabilityRule("FREQ=DAILY", "09:00", "12:00", rep=rep) for rep in ("alice", "bob")]
+    engine = AvailabilityEngine(rules, [Blackout(date(2030, 1, 7), "alice", datetime(2030, 1, 7, 10).time(),
+                                                 datetime(2030, 1, 7, 12).time())])
+
+    slots = engine.slots(datetime(2030, 1, 7), datetime(2030, 1, 8))
+
+    assert [(when.hour, rep) for when, rep in slots] == [(9, "alice"), (9, "bob"), (10, "bob"), (11, "bob")]
+
+
+def test_rep_time_zone_is_shifted_into_the_calendar_one_across_dst():
+    rule = AvailabilityRule("FREQ=DAILY", "09:00", "10:00", timezone="America/New_York")
+    engine = AvailabilityEngine([rule], timezone="UTC")
+
+    # New York leaves daylight saving time on 2030-11-03
+    slots = engine.slots(datetime(2030, 11, 1), datetime(2030, 11, 6))
+
+    assert [when.hour for when, _rep in slots] == [13, 13, 14, 14, 14]
+
+
+def test_slots_across_a_window_boundary_match_a_day_by_day_expansion(shipped):
+    start, end = datetime(2026, 12, 16), datetime(2027, 1, 13)
+    by_day = []
+    for n in range((end - start).days):
+        day = datetime.fromordinal(start.toordinal() + n)
+        by_day.extend(shipped.slots(day, datetime.fromordinal(day.toordinal() + 1)))
+
+    assert shipped.slots(start, end) == by_day
+
+
+def test_fingerprint_follows_the_config():
+    with open(os.path.join(ROOT, "availability.json"), encoding="utf-8") as f:
+        config = json.load(f)
+    changed = dict(config, exceptions=config["exceptions"] + [{"date": "2027-01-02"}])
+
+    assert AvailabilityEngine.from_dict(config).fingerprint == AvailabilityEngine.from_dict(dict(config)).fingerprint
+    assert AvailabilityEngine.from_dict(config).fingerprint != AvailabilityEngine.from_dict(changed).fingerprint
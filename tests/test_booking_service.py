@@ -0,0 +1,80 @@
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+
+from availability import AvailabilityEngine, AvailabilityRule
+from booking_service import BookingService, InvalidBookingError
+from shared_state import InProcessState, RedisState
+from slot_store import SlotStore
+from storage import MemoryStorage
+
+NOW = datetime(2026, 10, 17, 10, 0)
+
+
+class FixedClockEngine(AvailabilityEngine):
+    def __init__(self, now: datetime):
+        super().__init__([AvailabilityRule("FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR,SA,SU", "09:00", "12:00")])
+        self.current = now
+
+    def now(self) -> datetime:
+        return self.current
+
+
+@pytest.fixture
+def service():
+    storage = MemoryStorage()
+    yield BookingService(SlotStore(FixedClockEngine(NOW)), storage, horizon_days=14)
+    storage.close()
+
+
+def test_books_a_slot_inside_the_horizon(service):
+    assert service.book_slot("2026-10-18 9:00 AM", "Ada").rep == "default"
+
+
+@pytest.mark.parametrize("slot", ["2026-10-16 9:00 AM", "2026-10-17 9:00 AM", "2099-01-01 9:00 AM",
+                                  "2026-11-01 9:00 AM"])
+def test_rejects_past_and_far_future_slots(service, slot):
+    with pytest.raises(InvalidBookingError):
+        service.book_slot(slot, "Ada")
+    with pytest.raises(InvalidBookingError):
+        service.book_meeting("Ada", "ada@example.com", "5550100100", "Ada Co", slot)
+
+
+def test_past_windows_are_evicted():
+    engine = FixedClockEngine(NOW)
+    store = SlotStore(engine, retain_days=7)
+    store.materialize(NOW - timedelta(days=7), NOW + timedelta(days=14))
+    store.book("2026-10-12 9:00 AM", "Ada")
+
+    engine.current = NOW + timedelta(days=28)
+    store.materialize(engine.current, engine.current + timedelta(days=1))
+
+    assert store.evicted_before is not None and store.evicted_before <= engine.current - timedelta(days=7)
+    assert not store.query(datetime(2026, 10, 1), store.evicted_before)
+    # Evicted windows are not generated again by a lookup of an old slot
+    assert not store.is_free("2026-10-13 9:00 AM")
+    assert all(when >= store.evicted_before for when, _rep, _booked in
+               store.query(datetime(2026, 1, 1), engine.current + timedelta(days=1)))
+
+
+@pytest.mark.parametrize("make_state", [InProcessState, lambda: RedisState(fakeredis.FakeRedis(decode_responses=True))],
+                         ids=["memory", "redis"])
+def test_shared_claims_of_evicted_windows_are_pruned(make_state):
+    state = make_state()
+    engine = FixedClockEngine(NOW)
+    storage = MemoryStorage()
+    service = BookingService(SlotStore(engine, retain_days=7), storage, shared_state=state, horizon_days=14)
+    # History from before the retention window, and a current booking
+    service.sync_shared_claims([("2026-09-01 9:00 AM", "default", "Old"), ("2026-10-18 9:00 AM", "default", "Ada")])
+    assert list(state.claims()) == ["2026-10-18 9:00 AM|default"]
+
+    engine.current = NOW + timedelta(days=28)
+    service.slot_store.materialize(engine.current, engine.current + timedelta(days=1))
+
+    deadline = time.monotonic() + 2
+    while state.claims() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert state.claims() == {}
+    storage.close()
@@ -0,0 +1,67 @@
+import json
+
+
+def test_process_meeting_booking_tool(main, free_slots):
+    """The agent's booking tool confirms the booking it stored, end to end through BookingService"""
+    slot = free_slots[0]
+    details = {"name": "Dana Tool", "email": "dana@example.com", "phone": "+1 555 010 0142", "company": "Tool Test Ltd",
+               "selected_slot": slot, "message": "Booked from the chat"}
+
+    reply = main.process_meeting_booking.invoke({"booking_data": json.dumps(details)})
+
+    assert reply.startswith("SUCCESS: Meeting booked for Dana Tool at " + slot), reply
+    assert "dana@example.com" in reply
+    assert not main.slot_store.is_free(slot)
+    main.storage.flush()
+    assert any(booking["email"] == "dana@example.com" for booking in main.storage.load_bookings())
+    assert main.lead_registry.find(email="dana@example.com")[0].bookings[0][0] == slot
+
+
+def test_process_meeting_booking_tool_repeat_lead(main, free_slots):
+    """A second booking by a known lead is merged into it and still confirmed to the visitor"""
+    first, second = free_slots[0], free_slots[1]
+    details = {"name": "Iris Repeat", "email": "Iris.Repeat+chat@example.com", "phone": "555 010 0146",
+               "company": "Repeat Inc.", "selected_slot": first}
+    assert main.process_meeting_booking.invoke({"booking_data": json.dumps(details)}).startswith("SUCCESS")
+
+    reply = main.process_meeting_booking.invoke({"booking_data": json.dumps(
+        dict(details, email="iris.repeat@example.com", company="Repeat", selected_slot=second))})
+
+    assert reply == (f"SUCCESS: Meeting booked for Iris Repeat at {second}. "
+                     "A confirmation email with the calendar invite is on its way to iris.repeat@example.com."), reply
+    [lead] = main.lead_registry.find(email="iris.repeat@example.com")
+    assert lead.submissions == 2
+    assert [slot for slot, _rep in lead.bookings] == [first, second]
+
+
+def test_process_meeting_booking_tool_taken_slot(main, free_slots):
+    slot = free_slots[0]
+    details = {"name": "Eli First", "email": "eli@example.com", "phone": "555 010 0143", "company": "First Co",
+               "selected_slot": slot}
+    assert main.process_meeting_booking.invoke({"booking_data": json.dumps(details)}).startswith("SUCCESS")
+
+    reply = main.process_meeting_booking.invoke({"booking_data": json.dumps(dict(details, email="fay@example.com"))})
+
+    assert reply.startswith("Error: "), reply
+
+
+def test_booking_tool_marks_the_chat_lead_as_booked(main, free_slots):
+    details = {"name": "Gus Chat", "email": "gus@example.com", "phone": "555 010 0144", "company": "Chat Co",
+               "selected_slot": free_slots[0]}
+    main.session_store.add_turn("thread-gus", "I'd like to book a meeting", "Here is the calendar.")
+    token = main._chat_thread.set("thread-gus")
+    try:
+        assert main.process_meeting_booking.invoke({"booking_data": json.dumps(details)}).startswith("SUCCESS")
+    finally:
+        main._chat_thread.reset(token)
+
+    assert main.session_store.lead_score("thread-gus")["features"]["booked"]
+
+
+def test_form_booking_with_thread_id_marks_the_chat_lead(main, free_slots):
+    main.session_store.add_turn("thread-hal", "Can we talk pricing?", "Sure.")
+    result = main.booking_service.book_meeting("Hal Form", "hal@example.com", "555 010 0145", "Form Co", free_slots[0],
+                                               thread_id="thread-hal")
+
+    assert not result.replayed
+    assert main.session_store.lead_score("thread-hal")["features"]["booked"]
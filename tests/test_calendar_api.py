@@ -0,0 +1,184 @@
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+
+from booking_service import BookingService
+from calendar_api import decode_cursor, encode_cursor, next_cursor, parse_query, query_fingerprint
+from shared_state import RedisState
+from slot_store import SlotStore
+from storage import MemoryStorage
+
+NOW = datetime(2026, 10, 17, 15, 30)
+
+
+def query(**params):
+    return parse_query(NOW, 14, 1000, **params)
+
+
+def test_default_range_is_today_through_the_horizon():
+    q = query()
+    assert (q.start, q.end) == (datetime(2026, 10, 17), datetime(2026, 10, 31))
+
+
+def test_default_end_stops_at_the_horizon():
+    assert query(start="2026-10-25").end == datetime(2026, 11, 1)
+
+
+@pytest.mark.parametrize("params", [
+    {"start": "2024-01-01", "end": "2200-01-01"},
+    {"start": "2026-10-17", "end": "2026-11-05"},
+    {"start": "2099-01-01", "end": "2099-01-02"},
+    {"date": "2099-01-01"},
+    {"start": "2020-01-01", "end": "2020-01-02"},
+    {"start": "2026-09-01", "end": "2026-09-10"},
+])
+def test_out_of_range_queries_are_rejected(params):
+    with pytest.raises(ValueError):
+        query(**params)
+
+
+def test_recent_past_and_full_horizon_are_allowed():
+    assert query(date="2026-10-01").start == datetime(2026, 10, 1)
+    assert query(start="2026-10-18", end="2026-11-01").end == datetime(2026, 11, 1)
+
+
+def test_slots_endpoint_rejects_unbounded_ranges(main):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+    materialized = main.slot_store.free_count()
+    response = client.get("/slots", params={"start": "2024-01-01", "end": "2200-01-01"})
+    assert response.status_code == 400
+    assert main.slot_store.free_count() == materialized
+    assert client.get("/slots").status_code == 200
+
+
+def test_query_fingerprint_depends_on_the_resolved_query():
+    assert query_fingerprint(query()) == query_fingerprint(query())
+    assert query_fingerprint(query()) != query_fingerprint(query(fmt="compact"))
+    assert query_fingerprint(query()) != query_fingerprint(query(rep="alice"))
+    assert query_fingerprint(query()) != query_fingerprint(query(), distinct_times=True)
+    # The default range moves with the day
+    tomorrow = parse_query(NOW + timedelta(days=1), 14, 1000)
+    assert query_fingerprint(query()) != query_fingerprint(tomorrow)
+
+
+def test_etag_is_per_query_and_changes_with_bookings(main, free_slots):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+    full = client.get("/calendar")
+    etag = full.headers["ETag"]
+    assert client.get("/calendar", headers={"If-None-Match": etag}).status_code == 304
+    compact = client.get("/calendar", params={"format": "compact"}, headers={"If-None-Match": etag})
+    assert compact.status_code == 200 and compact.headers["ETag"] != etag
+
+    main.booking_service.book_slot(free_slots[0], "Etag Test")
+    assert client.get("/calendar", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_calendar_version_is_shared_between_workers():
+    server = fakeredis.FakeServer()
+    workers = [BookingService(SlotStore.from_calendar({"2030-01-07": {"9:00 AM": None}}), MemoryStorage(),
+                              shared_state=RedisState(fakeredis.FakeRedis(server=server, decode_responses=True)))
+               for _ in range(2)]
+    assert workers[0].calendar_version == workers[1].calendar_version
+
+    workers[0].book_slot("2030-01-07 9:00 AM", "Ada")
+
+    deadline = time.monotonic() + 2
+    while workers[1].calendar_version != workers[0].calendar_version and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert workers[1].calendar_version == workers[0].calendar_version
+    for worker in workers:
+        worker.storage.close()
+        worker.shared_state.close()
+
+
+def team_store():
+    """Two reps with overlapping hours on 2030-01-07 and 2030-01-08"""
+    store = SlotStore()
+    for day in ("2030-01-07", "2030-01-08"):
+        for hour in ("9:00 AM", "10:00 AM", "11:00 AM"):
+            store.add_slot(f"{day} {hour}", rep="alice")
+        for hour in ("10:00 AM", "11:00 AM", "2:00 PM"):
+            store.add_slot(f"{day} {hour}", rep="bob")
+    return store
+
+
+def walk(store, limit, status="all", distinct_times=False, between_pages=None):
+    """Every page of a range query, following next_cursor the way calendar_page does"""
+    pages, after = [], None
+    while True:
+        rows = store.query(datetime(2030, 1, 7), datetime(2030, 1, 9), status=status, after=after, limit=limit + 1,
+                           distinct_times=distinct_times)
+        pages.append(rows[:limit])
+        cursor = next_cursor(rows, limit, distinct_times=distinct_times)
+        if cursor is None:
+            return pages
+        after = decode_cursor(cursor)
+        if between_pages is not None:
+            between_pages(len(pages))
+
+
+def test_cursor_pages_cover_the_range_once_in_order():
+    store = team_store()
+    everything = store.query(datetime(2030, 1, 7), datetime(2030, 1, 9))
+
+    pages = walk(store, limit=5)
+
+    assert [len(page) for page in pages] == [5, 5, 2]
+    assert [row for page in pages for row in page] == everything
+    assert [(row[0], row[1]) for row in everything] == sorted((row[0], row[1]) for row in everything)
+
+
+def test_cursor_pages_stay_stable_while_slots_are_booked():
+    store = team_store()
+    free = [(when, rep) for when, rep, _booked in store.query(datetime(2030, 1, 7), datetime(2030, 1, 9), status="free")]
+
+    def book_after_first_page(served_pages):
+        if served_pages == 1:
+            # One slot on the page already served, one on a later page
+            store.book("2030-01-07 9:00 AM", "Ada", rep="alice")
+            store.book("2030-01-08 2:00 PM", "Bob", rep="bob")
+
+    pages = walk(store, limit=4, status="free", between_pages=book_after_first_page)
+
+    served = [(when, rep) for page in pages for when, rep, _booked in page]
+    assert served == [key for key in free if key != (datetime(2030, 1, 8, 14), "bob")]
+
+
+def test_distinct_time_pages_do_not_repeat_a_time_shared_by_reps():
+    store = team_store()
+
+    pages = walk(store, limit=2, status="free", distinct_times=True)
+
+    times = [when for page in pages for when, _rep, _booked in page]
+    assert times == sorted(set(times)) and len(times) == 8
+
+
+def test_cursor_round_trip_and_garbage_cursor():
+    when = datetime(2030, 1, 7, 10)
+    assert decode_cursor(encode_cursor(when, "bob")) == (when, "bob")
+    with pytest.raises(ValueError):
+        query(cursor="not-a-cursor")
+
+
+def test_calendar_endpoint_pages_through_next_cursor(main):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+    everything = client.get("/calendar", params={"limit": 1000}).json()["slots"]
+    paged, cursor = [], None
+    while True:
+        params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/calendar", params=params).json()
+        paged.extend(page["slots"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(everything) > 7
+    assert paged == everything
@@ -0,0 +1,15 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_import import DEFAULT_BUDGET_MS, LAZY_MODULES, measure  # noqa: E402
+
+
+def test_import_main_stays_within_budget():
+    """Cold `import main` in a fresh interpreter: no LLM stack, and under IMPORT_BUDGET_MS"""
+    total, modules = measure(runs=3)
+
+    eager = [name for name in LAZY_MODULES if name in modules]
+    assert not eager, f"imported at start-up: {', '.join(eager)}"
+    assert total <= DEFAULT_BUDGET_MS, f"import main took {total:.0f} ms, budget {DEFAULT_BUDGET_MS:.0f} ms"
@@ -0,0 +1,45 @@
+import pytest
+
+from intent_router import SCHEDULE_MEETING, KeywordIntentRouter
+
+
+@pytest.fixture
+def router():
+    return KeywordIntentRouter(threshold=0.8)
+
+
+@pytest.mark.parametrize("message", [
+    "Can we meet next week?",
+    "Book a call",
+    "I'd like to schedule a demo",
+    "Could we set up a meeting on Tuesday?",
+    "Please arrange a consultation",
+    "We would like to book an appointment with your team",
+    "Let's meet",
+    "Let's talk over a call",
+    "What slots are available tomorrow?",
+    "When are you free?",
+])
+def test_meeting_requests_take_the_fast_path(router, message):
+    assert router.classify(message).intent == SCHEDULE_MEETING
+
+
+@pytest.mark.parametrize("message", [
+    "We need an app where patients can book an appointment",
+    "We want a calendar app with video call support",
+    "Our clinic wants a booking system that shows free slots to patients",
+    "Customers should be able to schedule a demo from our website",
+    "The app must send a reminder before each meeting on the calendar",
+    "I don't want to book a call yet",
+    "I need to reschedule my meeting",
+    "What services do you offer?",
+    "Let's talk about pricing",
+    "let's talk about your services",
+    "Can we talk about the budget first?",
+])
+def test_project_descriptions_go_to_the_llm(router, message):
+    assert router.classify(message) is None
+
+
+def test_weak_cues_alone_stay_below_the_threshold(router):
+    assert router.score("meeting call demo appointment schedule book calendar") < 0.8
@@ -0,0 +1,70 @@
+from lead_registry import LeadRegistry, normalize_company, normalize_email, normalize_phone
+
+
+def submission(name, email="", phone="", company="", slot=None):
+    return {"name": name, "email": email, "phone": phone, "company": company, "selected_slot": slot}
+
+
+def test_normalized_keys():
+    assert normalize_email("Jo.Ann+leads@GoogleMail.com") == "joann@gmail.com"
+    assert normalize_email("not an address") is None
+    assert normalize_phone("+1 (555) 010-0199") == normalize_phone("555.010.0199") == "5550100199"
+    assert normalize_company("The ACME Corporation") == normalize_company("Acme Corp.") == "acme"
+
+
+def test_same_email_in_another_form_is_merged():
+    registry = LeadRegistry()
+    first, existed = registry.record(submission("Jo Ann", "jo.ann@gmail.com", slot="2030-01-07 9:00 AM"))
+    assert not existed
+
+    lead, existed = registry.record(submission("Jo Ann Smith", "JoAnn+demo@gmail.com", "555 010 0199",
+                                               slot="2030-01-08 9:00 AM"))
+
+    assert existed and lead.id == first.id
+    assert (lead.name, lead.submissions) == ("Jo Ann Smith", 2)
+    assert [slot for slot, _rep in lead.bookings] == ["2030-01-07 9:00 AM", "2030-01-08 9:00 AM"]
+    assert registry.find(phone="+1 555-010-0199") == [lead]
+
+
+def test_known_phone_merges_only_when_the_name_agrees():
+    registry = LeadRegistry()
+    ada, _ = registry.record(submission("Ada Lovelace", "ada@example.com", "555 010 0100", "Engines Ltd"))
+
+    same, existed = registry.record(submission("ada  lovelace", "ada@newjob.example", "(555) 010-0100"))
+    assert existed and same.id == ada.id
+    assert registry.find(email="ada@newjob.example") == registry.find(email="ada@example.com") == [same]
+
+    # A colleague calling from the same switchboard is someone else
+    colleague, existed = registry.record(submission("Charles Babbage", "charles@example.com", "555 010 0100"))
+    assert not existed and colleague.id != ada.id
+    assert {lead.id for lead in registry.find(phone="5550100100")} == {ada.id, colleague.id}
+
+
+def test_phone_without_email_merges_on_a_similar_company():
+    registry = LeadRegistry()
+    lead, _ = registry.record(submission("Grace Hopper", "grace@navy.example", "555 010 0101", "Compiler Systems Inc."))
+
+    merged, existed = registry.record(submission("G. Hopper", phone="555-010-0101", company="Compiler Systems"))
+    other, other_existed = registry.record(submission("Front Desk", phone="555-010-0101", company="Unrelated Bakery"))
+
+    assert existed and merged.id == lead.id
+    assert not other_existed and other.id != lead.id
+
+
+def test_by_company_finds_exact_then_similar_names():
+    registry = LeadRegistry()
+    exact, _ = registry.record(submission("Nancy", "nancy@northwind.example", company="Northwind Traders Ltd."))
+    typo, _ = registry.record(submission("Andrew", "andrew@northwind.example", company="Nortwind Traders"))
+    registry.record(submission("Elmer Fudd", "elmer@example.com", company="Hunting Supplies"))
+
+    assert [lead.id for lead in registry.by_company("NORTHWIND TRADERS")] == [exact.id, typo.id]
+    assert registry.by_company("Nobody Ltd") == []
+
+
+def test_reloading_the_same_bookings_gives_the_same_ids():
+    bookings = [submission("Ada", "ada@example.com", "555 010 0100", slot="2030-01-07 9:00 AM"),
+                submission("Ada", "ada+2@example.com", slot="2030-01-08 9:00 AM")]
+    first, second = LeadRegistry(), LeadRegistry()
+
+    assert first.load(bookings) == second.load(bookings) == 1
+    assert first.find(email="ada@example.com") == second.find(email="ada@example.com")
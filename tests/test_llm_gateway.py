@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailableError
+
+
+class SlowClient:
+    """Chat model stand-in that answers after a delay, or raises the given error"""
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return "ok"
+
+    async def astream(self, prompt):
+        for chunk in ("o", "k"):
+            await asyncio.sleep(self.delay)
+            yield chunk
+
+    def invoke(self, prompt):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return "ok"
+
+
+def half_open_gateway(client) -> LLMGateway:
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return LLMGateway([client], breaker=breaker, hedge=False, max_retries=0, non_retryable=(ValueError,))
+
+
+def test_cancelled_probe_does_not_wedge_the_breaker():
+    gateway = half_open_gateway(SlowClient(delay=1.0))
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(gateway.ainvoke("hi"), 0.05)
+        gateway.clients = [SlowClient()]
+        return await gateway.ainvoke("hi")
+
+    assert asyncio.run(run()) == "ok"
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_error_probe_does_not_wedge_the_breaker():
+    gateway = half_open_gateway(SlowClient(error=ValueError("bad request")))
+    with pytest.raises(ValueError):
+        asyncio.run(gateway.ainvoke("hi"))
+    with pytest.raises(ValueError):
+        gateway.invoke("hi")
+    assert gateway.breaker.allow()
+
+
+def test_abandoned_stream_probe_does_not_wedge_the_breaker():
+    gateway = half_open_gateway(SlowClient(delay=0.01))
+
+    async def run():
+        stream = gateway.astream("hi")
+        await stream.__anext__()
+        # The SSE client went away after the first token
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert gateway.breaker.allow()
+
+
+def test_hung_probe_expires_after_recovery_seconds():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_only_the_probe_holder_releases_the_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=0.05)
+    ordinary = breaker.allow()
+    breaker.record_failure()
+    time.sleep(0.06)
+    probe = breaker.allow()
+    assert probe.probe and not ordinary.probe
+
+    # A call that started while the breaker was closed ends without a verdict
+    breaker.release(ordinary)
+    assert breaker.allow() is None
+
+    breaker.release(probe)
+    assert breaker.allow()
+
+
+def test_hung_sync_call_times_out():
+    gateway = LLMGateway([SlowClient(delay=1.0)], hedge=False, max_retries=0, timeout_seconds=0.05,
+                         non_retryable=(ValueError,))
+    start = time.perf_counter()
+    with pytest.raises(LLMUnavailableError):
+        gateway.invoke("hi")
+    assert time.perf_counter() - start < 0.5
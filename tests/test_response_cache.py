@@ -0,0 +1,42 @@
+import response_cache
+from response_cache import ResponseCache
+
+QUESTION = "What services does AorySoft offer to small businesses?"
+ANSWER = "Custom software, web and mobile apps."
+
+
+def test_same_question_after_normalization_is_an_exact_hit():
+    cache = ResponseCache()
+    cache.put(QUESTION, ANSWER)
+
+    assert cache.get("  what SERVICES does aorysoft offer to small businesses ") == ANSWER
+    assert cache.stats()["near_hits"] == 0
+
+
+def test_near_duplicate_is_a_hit_and_a_different_question_a_miss():
+    cache = ResponseCache()
+    cache.put(QUESTION, ANSWER)
+
+    assert cache.get("What services does AorySoft offer to small businesses, please?") == ANSWER
+    assert cache.get("What does AorySoft charge for a small mobile app?") is None
+    assert cache.get("What services does AorySoft not offer?") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["near_hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_entries_expire_and_least_recently_used_are_evicted(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.put("first question", "1")
+    cache.put("second question", "2")
+    assert cache.get("first question") == "1"
+
+    cache.put("third question", "3")
+    assert cache.get("second question") is None
+    assert cache.stats()["evictions"] == 1
+
+    now[0] += 61
+    assert cache.get("first question") is None
+    assert cache.get("third question") is None
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+import fakeredis
+import pytest
+
+from shared_state import InProcessState, RedisState
+from lead_scoring import LeadScorer
+from sessions import SessionStore, SharedSessionStore
+
+
+def redis_states(workers: int):
+    server = fakeredis.FakeServer()
+    return [RedisState(fakeredis.FakeRedis(server=server, decode_responses=True)) for _ in range(workers)]
+
+
+@pytest.mark.parametrize("states", [lambda: [InProcessState()] * 2, lambda: redis_states(2)], ids=["memory", "redis"])
+def test_concurrent_turns_of_one_thread_are_all_kept(states):
+    stores = [SharedSessionStore(state, token_budget=100_000) for state in states()]
+
+    def worker(store, name):
+        for i in range(25):
+            store.add_turn("thread-1", f"{name} question {i}", f"{name} answer {i}")
+
+    threads = [threading.Thread(target=worker, args=(store, f"w{n}")) for n, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stores[0].turn_count("thread-1") == 50
+
+
+def test_shared_stats_have_the_in_memory_keys():
+    local = SessionStore().stats()
+    shared = SharedSessionStore(redis_states(1)[0])
+    shared.add_turn("a", "hi", "hello")
+    shared.add_turn("b", "hi", "hello")
+
+    stats = shared.stats()
+
+    assert set(local) <= set(stats)
+    assert stats["sessions"] == 2
+    assert stats["memory_bytes"] is None
+
+
+@pytest.mark.parametrize("make_store", [lambda scorer: SessionStore(scorer=scorer),
+                                        lambda scorer: SharedSessionStore(redis_states(1)[0], scorer=scorer)],
+                         ids=["memory", "redis"])
+def test_bookings_are_marked_by_the_hook_not_the_reply(make_store):
+    store = make_store(LeadScorer())
+    store.add_turn("t1", "Can we book a call?", "SUCCESS: Meeting booked for Ada at 2030-01-07 9:00 AM.")
+    assert not store.lead_score("t1")["features"]["booked"]
+    before = store.lead_score("t1")["score"]
+
+    store.mark_booked("t1")
+    store.add_turn("t1", "Thanks!", "You're welcome.")
+
+    lead = store.lead_score("t1")
+    assert lead["features"]["booked"] and lead["score"] > before
+    store.rescore_leads()
+    assert store.lead_score("t1")["features"]["booked"]
+
+
+class NetworkState(InProcessState):
+    """In-process state that reports itself as shared, like Redis"""
+    distributed = True
+
+
+class RecordingSessionStore(SharedSessionStore):
+    """Notes the thread every session read and write ran on"""
+
+    def __init__(self, state):
+        super().__init__(state)
+        self.threads = set()
+
+    def get_history(self, thread_id):
+        self.threads.add(threading.get_ident())
+        return super().get_history(thread_id)
+
+    def turn_count(self, thread_id):
+        self.threads.add(threading.get_ident())
+        return super().turn_count(thread_id)
+
+    def add_turn(self, thread_id, user_message, bot_message):
+        self.threads.add(threading.get_ident())
+        super().add_turn(thread_id, user_message, bot_message)
+
+
+class AnswerLLM:
+    COMPLETION = "A general question.\nAction: no tool needed\nFinal Answer: Happy to help."
+
+    async def ainvoke(self, prompt, **kwargs):
+        return type("Message", (), {"content": self.COMPLETION})()
+
+    async def astream(self, prompt, **kwargs):
+        yield type("Chunk", (), {"content": self.COMPLETION})()
+
+
+@pytest.mark.parametrize("message", ["What do you build?", "Show me your available slots"], ids=["llm", "fast_path"])
+def test_shared_session_io_runs_off_the_event_loop(main, message):
+    store = RecordingSessionStore(NetworkState())
+    agent = main.PureReActAgent(AnswerLLM(), main.tools, "", sessions=store, router=main.intent_router,
+                                response_cache=main.ResponseCache())
+
+    async def chat():
+        loop_thread = threading.get_ident()
+        await agent.ainvoke({"input": message, "thread_id": "t1"})
+        async for _event in agent.astream({"input": message, "thread_id": "t1"}):
+            pass
+        return loop_thread
+
+    loop_thread = asyncio.run(chat())
+
+    threads = set(store.threads)
+    assert threads and loop_thread not in threads
+    assert store.turn_count("t1") == 2
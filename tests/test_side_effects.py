@@ -0,0 +1,32 @@
+from side_effects import build_invite
+
+
+def unfold(invite: str):
+    return invite.replace("\r\n ", "").split("\r\n")
+
+
+def test_invite_times_are_utc():
+    lines = unfold(build_invite("2026-10-19 9:00 AM|default", "2026-10-19 9:00 AM", "Meeting with AorySoft",
+                                "ada@example.com", tz="America/New_York"))
+    assert "DTSTART:20261019T130000Z" in lines
+    assert "DTEND:20261019T140000Z" in lines
+
+
+def test_visitor_text_is_escaped_and_cannot_inject_properties():
+    description = "Hi; we need, a portal\\app\r\nATTENDEE:mailto:attacker@example.com\nBye"
+    invite = build_invite("uid", "2026-10-19 9:00 AM", "Meeting with AorySoft", "ada@example.com\r\nX-EVIL:1",
+                          description=description)
+    lines = unfold(invite)
+
+    assert r"DESCRIPTION:Hi\; we need\, a portal\\app\nATTENDEE:mailto:attacker@example.com\nBye" in lines
+    assert [line for line in lines if line.startswith("ATTENDEE")] == ["ATTENDEE;RSVP=TRUE:mailto:ada@example.comX-EVIL1"]
+    assert not any(line.startswith("X-EVIL") for line in lines)
+
+
+def test_long_lines_are_folded_at_75_octets():
+    invite = build_invite("uid", "2026-10-19 9:00 AM", "Meeting with AorySoft", "ada@example.com",
+                          description="Zürich " * 40)
+    physical = invite.split("\r\n")
+    assert all(len(line.encode("utf-8")) <= 75 for line in physical)
+    assert "DESCRIPTION:" + "Zürich " * 40 in unfold(invite)
+    assert invite.endswith("END:VCALENDAR\r\n")
@@ -0,0 +1,83 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from availability import AvailabilityEngine, AvailabilityRule
+from booking_service import BookingNotSavedError, BookingService
+from slot_store import SlotStore
+from storage import BookingStorage, MemoryStorage, booking_record
+
+NOW = datetime(2026, 10, 17, 10, 0)
+SLOT = "2026-10-18 9:00 AM"
+
+
+class FixedClockEngine(AvailabilityEngine):
+    def __init__(self):
+        super().__init__([AvailabilityRule("FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR,SA,SU", "09:00", "12:00")])
+
+    def now(self) -> datetime:
+        return NOW
+
+
+class FlakyStorage(MemoryStorage):
+    """Fails the first `failures` commits, like a database that is locked for a moment"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        super().__init__()
+        self.retry_backoff = 0.001
+
+    def _commit(self, bookings, slots):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        super()._commit(bookings, slots)
+
+
+def test_commit_is_retried_until_it_succeeds():
+    storage = FlakyStorage(failures=2)
+    saved = storage.record_booking(booking_record("Ada", "ada@example.com", "5550100100", "Ada Co", SLOT, ""))
+    assert saved.result(timeout=5) is None
+    assert [b["name"] for b in storage.load_bookings()] == ["Ada"]
+    storage.close()
+
+
+def test_failed_commit_is_reported_to_the_caller():
+    storage = FlakyStorage(failures=1000)
+    saved = storage.save_slot(SLOT, "default", "Ada")
+    with pytest.raises(sqlite3.OperationalError):
+        saved.result(timeout=5)
+    assert storage.load_slots() == []
+    storage.close()
+
+
+def test_unsaved_booking_is_not_confirmed_and_frees_the_slot():
+    storage = FlakyStorage(failures=1000)
+    booked = []
+    service = BookingService(SlotStore(FixedClockEngine()), storage, horizon_days=14,
+                             on_booked=lambda result, details: booked.append(result))
+
+    with pytest.raises(BookingNotSavedError):
+        service.book_meeting("Ada", "ada@example.com", "5550100100", "Ada Co", SLOT, idempotency_key="k1")
+    assert booked == []
+    assert service.slot_store.is_free(SLOT)
+
+    # Once storage recovers the same request books the slot for real, not a replay
+    storage.failures = 0
+    result = service.book_meeting("Ada", "ada@example.com", "5550100100", "Ada Co", SLOT, idempotency_key="k1")
+    assert not result.replayed
+    assert [r.slot for r in booked] == [SLOT]
+    storage.close()
+
+
+def test_backend_missing_a_hook_fails_at_construction():
+    class NoCommitStorage(BookingStorage):
+        def load_slots(self):
+            return []
+
+        def load_bookings(self):
+            return []
+
+    with pytest.raises(TypeError, match="_commit"):
+        NoCommitStorage()
@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+import threading
+import time
+
+from transcripts import TRANSCRIPT_ENTRIES, TranscriptLog, read_transcripts
+
+
+def segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith("transcript-"))
+
+
+def test_segments_rotate_by_size_and_read_back_in_order(tmp_path):
+    log = TranscriptLog(str(tmp_path), max_bytes=200, max_age_seconds=0)
+    for i in range(6):
+        log.record({"thread_id": "t1", "user": f"question {i}", "bot": "x" * 50, "ts": 1000.0 + i})
+        log.flush()
+    log.close()
+
+    names = segments(tmp_path)
+    assert len(names) > 1 and all(name.endswith(".jsonl.gz") for name in names)
+    assert [entry["user"] for entry in read_transcripts(str(tmp_path))] == [f"question {i}" for i in range(6)]
+
+
+def test_segment_rotates_by_age_into_gzip(tmp_path):
+    log = TranscriptLog(str(tmp_path), max_age_seconds=0.05)
+    log.record({"thread_id": "t1", "user": "first"})
+    log.flush()
+    time.sleep(0.1)
+    log.record({"thread_id": "t2", "user": "second"})
+    log.flush()
+
+    [name] = segments(tmp_path)
+    assert name.endswith(".jsonl.gz")
+    with gzip.open(tmp_path / name, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["user"] for line in f] == ["first", "second"]
+    log.close()
+
+
+def test_read_filters_by_time_range_and_thread(tmp_path):
+    log = TranscriptLog(str(tmp_path), max_bytes=1)
+    for i, thread_id in enumerate(["a", "b", "a", "b"]):
+        log.record({"thread_id": thread_id, "user": f"m{i}", "ts": time.time()})
+        log.flush()
+        time.sleep(0.01)
+    log.close()
+    stamps = [entry["ts"] for entry in read_transcripts(str(tmp_path))]
+
+    assert [e["user"] for e in read_transcripts(str(tmp_path), thread_id="a")] == ["m0", "m2"]
+    assert [e["user"] for e in read_transcripts(str(tmp_path), start=stamps[1], end=stamps[3])] == ["m1", "m2"]
+
+
+def test_segments_of_several_workers_are_merged_by_time(tmp_path):
+    with gzip.open(tmp_path / "transcript-20261017T100000.000000-111.jsonl.gz", "wt", encoding="utf-8") as f:
+        f.writelines(json.dumps({"ts": ts, "pid": 111}) + "\n" for ts in (1.0, 3.0, 5.0))
+    with open(tmp_path / "transcript-20261017T100000.000001-222.jsonl", "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"ts": ts, "pid": 222}) + "\n" for ts in (2.0, 4.0))
+
+    merged = list(read_transcripts(str(tmp_path)))
+
+    assert [entry["ts"] for entry in merged] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert [entry["pid"] for entry in merged] == [111, 222, 111, 222, 111]
+
+
+def test_entries_are_dropped_when_the_queue_is_full(tmp_path):
+    log = TranscriptLog(str(tmp_path), max_pending=1)
+    writing, release = threading.Event(), threading.Event()
+    write = log._write
+
+    def slow_write(entries):
+        writing.set()
+        release.wait(5)
+        write(entries)
+
+    log._write = slow_write
+    dropped = TRANSCRIPT_ENTRIES.value(outcome="dropped")
+
+    log.record({"user": "being written"})
+    assert writing.wait(5)
+    log.record({"user": "queued"})
+    log.record({"user": "no room"})
+    release.set()
+    log.close()
+
+    assert TRANSCRIPT_ENTRIES.value(outcome="dropped") == dropped + 1
+    assert [entry["user"] for entry in read_transcripts(str(tmp_path))] == ["being written", "queued"]
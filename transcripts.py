@@ -0,0 +1,292 @@
+import gzip
+import heapq
+import io
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional
+
+from metrics import REGISTRY, log_event
+
+try:
+    import zstandard
+except ImportError:
+    # Optional: needed only for TRANSCRIPT_COMPRESSION=zstd
+    zstandard = None
+
+TRANSCRIPT_ENTRIES = REGISTRY.counter("chatbot_transcript_entries_total",
+                                      "Chat turns sent to the transcript log, by outcome (written, dropped)", ["outcome"])
+TRANSCRIPT_SEGMENTS = REGISTRY.counter("chatbot_transcript_segments_total", "Transcript segments rotated out")
+
+# transcript-<UTC start>-<pid>.jsonl[.gz|.zst]; each worker process writes its own segments
+_SEGMENT = re.compile(r"^transcript-(\d{8}T\d{6}\.\d{6})-(\d+)\.jsonl(\.gz|\.zst)?$")
+_STAMP = "%Y%m%dT%H%M%S.%f"
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _compress(path: str, compression: str) -> str:
+    """Compress a closed segment next to itself and remove the original; returns the new path"""
+    target = path + COMPRESSIONS[compression]
+    partial = target + ".tmp"
+    with open(path, "rb") as src:
+        if compression == "zstd":
+            with open(partial, "wb") as dst:
+                zstandard.ZstdCompressor(level=10).copy_stream(src, dst)
+        else:
+            with gzip.open(partial, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+    # Readers only ever see a complete compressed file or the uncompressed one
+    os.replace(partial, target)
+    os.remove(path)
+    return target
+
+
+class TranscriptLog:
+    """Append-only JSONL log of chat turns, written off the request path.
+
+    record() only puts the entry on a bounded queue and returns; one writer
+    thread appends whatever is waiting in a single write. When the queue is
+    full (the disk cannot keep up) entries are dropped and counted rather
+    than slowing down a chat. The active segment is rotated once it reaches
+    max_bytes or is max_age_seconds old, and rotated segments are compressed
+    (gzip, or zstd with the zstandard package).
+    """
+
+    def __init__(self, directory: str = "transcripts", max_bytes: int = 64 * 1024 * 1024,
+                 max_age_seconds: float = 86400.0, compression: str = "gzip", max_pending: int = 10000,
+                 max_batch: int = 512):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown transcript compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("TRANSCRIPT_COMPRESSION=zstd needs the zstandard package (pip install zstandard)")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.compression = compression
+        self.max_batch = max_batch
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._file = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._closed = False
+        self._writer = threading.Thread(target=self._run_writer, name="transcript-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, entry: Dict[str, Any]):
+        """Queue one turn for the log; never blocks"""
+        entry.setdefault("ts", round(time.time(), 3))
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            TRANSCRIPT_ENTRIES.inc(outcome="dropped")
+
+    def flush(self):
+        """Block until everything queued so far is written"""
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # Unlike record(), shutdown waits for room: the last entries are not dropped
+        self._queue.put(None)
+        self._writer.join()
+
+    def read(self, start: Optional[float] = None, end: Optional[float] = None,
+             thread_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        return read_transcripts(self.directory, start, end, thread_id)
+
+    def _compress_leftovers(self):
+        """Compress segments a previous run left uncompressed (it crashed, or rotated while stopping)"""
+        if self.compression == "none" or not self.max_age_seconds:
+            return
+        # A live worker rotates its segment within max_age_seconds, anything older is abandoned
+        cutoff = time.time() - self.max_age_seconds - 60
+        for name in os.listdir(self.directory):
+            match = _SEGMENT.match(name)
+            path = os.path.join(self.directory, name)
+            if match and not match.group(3) and os.stat(path).st_mtime < cutoff:
+                try:
+                    _compress(path, self.compression)
+                except OSError as e:
+                    log_event("transcript_compress_error", level=logging.ERROR, sample_rate=1.0, path=path, error=str(e))
+
+    def _open_segment(self):
+        now = time.time()
+        stamp = datetime.fromtimestamp(now, timezone.utc).strftime(_STAMP)
+        self._path = os.path.join(self.directory, f"transcript-{stamp}-{os.getpid()}.jsonl")
+        self._file = open(self._path, "ab")
+        self._opened_at = now
+        self._size = 0
+
+    def _rotate(self):
+        self._file.close()
+        path, self._file, self._path = self._path, None, None
+        TRANSCRIPT_SEGMENTS.inc()
+        if self.compression != "none":
+            try:
+                _compress(path, self.compression)
+            except OSError as e:
+                # The segment stays readable uncompressed; the next start retries
+                log_event("transcript_compress_error", level=logging.ERROR, sample_rate=1.0, path=path, error=str(e))
+
+    def _due(self) -> bool:
+        if self._file is None:
+            return False
+        if self._size >= self.max_bytes:
+            return True
+        return bool(self.max_age_seconds) and self._size > 0 and time.time() - self._opened_at >= self.max_age_seconds
+
+    def _write(self, entries: List[Dict[str, Any]]):
+        if self._file is None:
+            self._open_segment()
+        data = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries).encode("utf-8")
+        self._file.write(data)
+        # Flushed per batch so readers and a crash see every line the batch holds
+        self._file.flush()
+        self._size += len(data)
+        TRANSCRIPT_ENTRIES.inc(len(entries), outcome="written")
+
+    def _run_writer(self):
+        # Off the start-up path: this can mean compressing large files
+        self._compress_leftovers()
+        # Wake up now and then so an idle segment still rotates on time
+        idle_wait = min(max(self.max_age_seconds / 10, 1.0), 60.0) if self.max_age_seconds else None
+        while True:
+            try:
+                item = self._queue.get(timeout=idle_wait)
+            except queue.Empty:
+                if self._due():
+                    self._rotate()
+                continue
+            batch = [item]
+            while item is not None and len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            stop = batch[-1] is None
+            entries = [entry for entry in batch if entry is not None]
+            try:
+                if entries:
+                    self._write(entries)
+                if self._due() or (stop and self._file is not None):
+                    self._rotate()
+            except Exception as e:
+                log_event("transcript_write_error", level=logging.ERROR, sample_rate=1.0, error=str(e))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package (pip install zstandard)")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True),
+                                encoding="utf-8")
+    try:
+        return open(path, encoding="utf-8")
+    except FileNotFoundError:
+        # Rotated and compressed since the directory was listed
+        for extension in (".gz", ".zst"):
+            if os.path.exists(path + extension):
+                return _open_text(path + extension)
+        raise
+
+
+def _segment_entries(path: str, start: Optional[float], end: Optional[float],
+                     thread_id: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Entries of one segment in the range, read a line at a time"""
+    with _open_text(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The active segment can end in a line that is still being written
+                continue
+            ts = entry.get("ts", 0)
+            if start is not None and ts < start:
+                continue
+            if end is not None and ts >= end:
+                # Lines of a segment are in time order
+                return
+            if thread_id is not None and entry.get("thread_id") != thread_id:
+                continue
+            yield entry
+
+
+def read_transcripts(directory: str = "transcripts", start: Optional[float] = None, end: Optional[float] = None,
+                     thread_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream the logged turns with start <= ts < end (Unix times), oldest first, optionally of one thread.
+
+    Segments outside the range are skipped by their file name (start time)
+    and modification time (last write), and the rest are decompressed on the
+    fly a line at a time, so memory use does not depend on the range. The
+    segments of several worker processes are merged by timestamp.
+    """
+    segments: Dict[tuple, str] = {}
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        match = _SEGMENT.match(name)
+        # Mid-rotation a segment is briefly listed both plain and compressed, the compressed copy is complete
+        if match and (match.group(3) or match.group(1, 2) not in segments):
+            segments[match.group(1, 2)] = os.path.join(directory, name)
+    workers: Dict[str, List[tuple]] = {}
+    for (stamp, pid), path in segments.items():
+        opened = datetime.strptime(stamp, _STAMP).replace(tzinfo=timezone.utc).timestamp()
+        try:
+            last_write = os.stat(path).st_mtime
+        except FileNotFoundError:
+            # Compressed since the listing; it was written recently, so it cannot be skipped
+            last_write = time.time()
+        if (end is not None and opened >= end) or (start is not None and last_write < start):
+            continue
+        workers.setdefault(pid, []).append((opened, path))
+    # One worker's segments follow each other in time, so each worker is one sorted stream
+    streams = [
+        chain.from_iterable(_segment_entries(path, start, end, thread_id) for _opened, path in sorted(segments))
+        for segments in workers.values()
+    ]
+    yield from heapq.merge(*streams, key=lambda entry: entry.get("ts", 0))
+
+
+if __name__ == "__main__":
+    # Export a time range as JSONL, e.g.
+    #   python transcripts.py --since 2026-10-01 --until 2026-10-08 > week.jsonl
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Stream logged chat turns as JSONL")
+    parser.add_argument("--dir", default=os.getenv("TRANSCRIPT_LOG_DIR", "transcripts"))
+    parser.add_argument("--since", help="ISO date or datetime (UTC unless it has an offset)")
+    parser.add_argument("--until", help="ISO date or datetime, exclusive")
+    parser.add_argument("--thread-id")
+    args = parser.parse_args()
+
+    def timestamp(value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+        moment = datetime.fromisoformat(value)
+        return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
+
+    for turn in read_transcripts(args.dir, timestamp(args.since), timestamp(args.until), args.thread_id):
+        sys.stdout.write(json.dumps(turn, ensure_ascii=False) + "\n")